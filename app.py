@@ -1,44 +1,139 @@
 import sqlite3
-import requests
-from bs4 import BeautifulSoup
-from flask import Flask, render_template, request, redirect, url_for, jsonify, g, flash
-from urllib.parse import urlparse
+from flask import Flask, render_template, request, redirect, url_for, jsonify, g, flash, session, make_response, send_from_directory, abort
+from flask import before_render_template, template_rendered
 import os
-import uuid
-from werkzeug.utils import secure_filename
-
-# Ignorar advertencias de tipo para requests y bs4 si usas un linter estricto
-# type: ignore
+import queue
+import re
+import hashlib
+import mimetypes
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import time
+import click
+from metadata import get_metadata
+from importer import detect_format, parse_bookmarks, import_records, ImportInterrupted
+from images import THUMBNAILS_ENABLED, store_upload, store_thumbnail, load_image_bytes, collect_orphans
+from linkcheck import run_link_check, load_link_status, LINKCHECK_WORKERS, LINKCHECK_TIMEOUT
+from backup import (backup_database, prune_backups, open_ndjson, export_ndjson, import_ndjson,
+                    BACKUP_STEP_PAGES, BACKUP_STEP_SLEEP)
+import assets
+import metrics
+import migrations
 
 app = Flask(__name__)
-app.secret_key = os.urandom(24)
-DATABASE = os.path.join("database", "database.db")
+# Sin SECRET_KEY cada proceso genera la suya: con varios workers sin preload
+# los mensajes flash de uno no se leen en otro
+app.secret_key = os.environ.get('SECRET_KEY') or os.urandom(24)
+DATABASE = os.environ.get('LINKMANAGER_DATABASE', os.path.join("database", "database.db"))
+
+# Ajustes de SQLite: WAL permite lecturas concurrentes con una escritura y
+# busy_timeout hace que las escrituras esperen al bloqueo en lugar de fallar.
+DB_JOURNAL_MODE = os.environ.get('DB_JOURNAL_MODE', 'WAL')
+DB_BUSY_TIMEOUT_MS = int(os.environ.get('DB_BUSY_TIMEOUT_MS', 5000))
+DB_SYNCHRONOUS = os.environ.get('DB_SYNCHRONOUS', 'NORMAL')
+DB_MMAP_SIZE = int(os.environ.get('DB_MMAP_SIZE', 64 * 1024 * 1024))
+DB_CACHE_SIZE_KB = int(os.environ.get('DB_CACHE_SIZE_KB', 8 * 1024))
+DB_STATEMENT_CACHE = int(os.environ.get('DB_STATEMENT_CACHE', 256))
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 8))  # 0 desactiva el pool
+
+# Métricas: un fichero por proceso en METRICS_DIR que /metrics suma (vacío = sólo el proceso que responde)
+METRICS_DIR = os.environ.get('METRICS_DIR', os.path.join(os.path.dirname(DATABASE), 'metrics'))
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')  # si se indica, /metrics exige "Authorization: Bearer <token>"
+metrics.registry.directory = METRICS_DIR
 
 # Configuración de la carpeta de subidas
 UPLOAD_FOLDER = os.path.join(app.static_folder, 'uploads')
+THUMB_FOLDER = os.path.join(app.static_folder, 'thumbs')
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 
-if not os.path.exists(UPLOAD_FOLDER):
-    try:
-        os.makedirs(UPLOAD_FOLDER)
-    except OSError as e:
-        print(f"Error al crear la carpeta de subidas {UPLOAD_FOLDER}: {e}")
+# Pool de hilos para obtener los metadatos de las entradas en segundo plano
+METADATA_WORKERS = int(os.environ.get('METADATA_WORKERS', 4))
+metadata_executor = ThreadPoolExecutor(max_workers=METADATA_WORKERS, thread_name_prefix='metadata')
+
+# Pool para generar miniaturas (trabajo de CPU, pocos hilos)
+THUMBNAIL_WORKERS = int(os.environ.get('THUMBNAIL_WORKERS', 2))
+thumbnail_executor = ThreadPoolExecutor(max_workers=THUMBNAIL_WORKERS, thread_name_prefix='thumbnail')
+
+for folder in (UPLOAD_FOLDER, THUMB_FOLDER):
+    if not os.path.exists(folder):
+        try:
+            os.makedirs(folder)
+        except OSError as e:
+            print(f"Error al crear la carpeta de subidas {folder}: {e}")
 
 # --- Funciones de Base de Datos y Configuración ---
+def connect_db():
+    """Abre una conexión nueva, independiente del contexto de Flask (p. ej. para hilos)."""
+    db = sqlite3.connect(DATABASE, timeout=DB_BUSY_TIMEOUT_MS / 1000, check_same_thread=False,
+                         cached_statements=DB_STATEMENT_CACHE, factory=metrics.connection_factory())
+    db.row_factory = sqlite3.Row
+    db.execute(f"PRAGMA journal_mode = {DB_JOURNAL_MODE}")
+    db.execute(f"PRAGMA busy_timeout = {DB_BUSY_TIMEOUT_MS}")
+    db.execute(f"PRAGMA synchronous = {DB_SYNCHRONOUS}")
+    db.execute(f"PRAGMA mmap_size = {DB_MMAP_SIZE}")
+    db.execute(f"PRAGMA cache_size = -{DB_CACHE_SIZE_KB}")
+    db.execute("PRAGMA foreign_keys = ON")
+    return db
+
+class ConnectionPool:
+    """
+    Pool de conexiones por proceso. Cada conexión conserva su caché de
+    sentencias preparadas y de páginas entre peticiones. Si el proceso se
+    bifurca (workers de gunicorn) el hijo descarta las conexiones heredadas.
+    """
+
+    def __init__(self, factory, size):
+        self.factory = factory
+        self.size = size
+        self._pid = os.getpid()
+        self._idle = queue.LifoQueue()
+
+    def _check_fork(self):
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._idle = queue.LifoQueue()
+
+    def acquire(self):
+        self._check_fork()
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return self.factory()
+
+    def release(self, db):
+        self._check_fork()
+        try:
+            if db.in_transaction:
+                db.rollback()
+        except sqlite3.Error:
+            db.close()
+            return
+        if self._idle.qsize() < self.size:
+            self._idle.put(db)
+        else:
+            db.close()
+
+    def close_all(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+db_pool = ConnectionPool(connect_db, DB_POOL_SIZE)
+
 def get_db():
     db = getattr(g, '_database', None)
     if db is None:
-        db = g._database = sqlite3.connect(DATABASE)
-        db.row_factory = sqlite3.Row
-        db.execute("PRAGMA foreign_keys = ON")
+        db = g._database = db_pool.acquire()
     return db
 
 @app.teardown_appcontext
 def close_connection(exception):
     db = getattr(g, '_database', None)
     if db is not None:
-        db.close()
+        db_pool.release(db)
 
 def init_db():
     with app.app_context():
@@ -46,13 +141,14 @@ def init_db():
         try:
             with app.open_resource('schema.sql', mode='r') as f:
                 db.cursor().executescript(f.read())
+            migrations.set_schema_version(db, migrations.LATEST_VERSION)
             db.commit()
             print("Base de datos inicializada con el esquema.")
         except Exception as e:
             print(f"Error al inicializar la base de datos desde schema.sql: {e}")
 
-def get_app_settings():
-    db = get_db()
+def get_app_settings(db=None):
+    db = db or get_db()
     settings_rows = db.execute("SELECT setting_key, setting_value FROM settings").fetchall()
     settings = {row['setting_key']: row['setting_value'] for row in settings_rows}
     return {
@@ -65,67 +161,581 @@ def get_app_settings():
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def fetch_metadata(url_to_fetch):
-    metadata = {'title': url_to_fetch, 'description': '', 'image_url': ''}
+# --- Obtención de metadatos en segundo plano ---
+def update_entry_metadata(entry_id, url_to_fetch):
+    """Obtiene los metadatos de la URL y completa la entrada (imagen y descripción vacías)."""
+    db = db_pool.acquire()
+    try:
+        metadata = get_metadata(db, url_to_fetch)
+        status = 'error' if metadata.get('error') else 'done'
+        db.execute("""UPDATE link_entries
+                      SET image_url = COALESCE(NULLIF(image_url, ''), NULLIF(?, '')),
+                          description = CASE WHEN description IS NULL OR description = '' THEN ? ELSE description END,
+                          metadata_status = ?, metadata_error = ?, metadata_updated_at = CURRENT_TIMESTAMP
+                      WHERE id = ?""",
+                   (metadata.get('image_url'), metadata.get('description', ''), status, metadata.get('error'), entry_id))
+        bump_data_version(db)
+        db.commit()
+        row = db.execute("SELECT image_url, thumbnail_url FROM link_entries WHERE id = ?", (entry_id,)).fetchone()
+        if row and row['image_url'] and not row['thumbnail_url']:
+            schedule_thumbnail(entry_id, row['image_url'])
+    except sqlite3.Error as e:
+        print(f"Error al guardar metadatos de la entrada {entry_id}: {e}")
+    finally:
+        db_pool.release(db)
+
+def schedule_metadata_fetch(entry_id, url_to_fetch):
+    """Encola la obtención de metadatos sin bloquear la petición actual."""
+    try:
+        metadata_executor.submit(update_entry_metadata, entry_id, url_to_fetch)
+    except RuntimeError as e:
+        print(f"No se pudo encolar la obtención de metadatos para {url_to_fetch}: {e}")
+
+# --- Miniaturas e imágenes compartidas ---
+def update_entry_thumbnail(entry_id, image_url):
+    """Genera la miniatura WebP de la imagen de la entrada y la enlaza si la imagen no ha cambiado."""
     try:
-        processed_url = url_to_fetch
-        if not processed_url.startswith(('http://', 'https://')):
-            processed_url = 'http://' + processed_url
-        headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
-        response = requests.get(processed_url, headers=headers, timeout=10, allow_redirects=True)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.content, 'html.parser')
-        og_title = soup.find('meta', property='og:title')
-        metadata['title'] = og_title['content'].strip() if og_title and og_title.get('content') else (soup.find('title').string.strip() if soup.find('title') and soup.find('title').string else url_to_fetch)
-        og_description = soup.find('meta', property='og:description')
-        metadata['description'] = og_description['content'].strip() if og_description and og_description.get('content') else (soup.find('meta', attrs={'name': 'description'})['content'].strip() if soup.find('meta', attrs={'name': 'description'}) and soup.find('meta', attrs={'name': 'description'}).get('content') else '')
-        og_image = soup.find('meta', property='og:image')
-        img_url_meta = og_image['content'] if og_image and og_image.get('content') else None
-        if img_url_meta:
-            parsed_original_url = urlparse(processed_url)
-            if not urlparse(img_url_meta).scheme:
-                img_path = img_url_meta if img_url_meta.startswith('/') else ('/' + img_url_meta)
-                img_url_meta = f"{parsed_original_url.scheme}://{parsed_original_url.netloc}{img_path}"
-            metadata['image_url'] = img_url_meta
+        thumbnail_url = store_thumbnail(load_image_bytes(image_url, app.static_folder), app.static_folder)
     except Exception as e:
-        print(f"Error en fetch_metadata para {url_to_fetch}: {e}")
-    return metadata
+        print(f"Error al generar la miniatura de {image_url}: {e}")
+        return
+    db = db_pool.acquire()
+    try:
+        cur = db.execute("UPDATE link_entries SET thumbnail_url = ? WHERE id = ? AND image_url = ?",
+                         (thumbnail_url, entry_id, image_url))
+        if cur.rowcount:
+            bump_data_version(db)
+        db.commit()
+    except sqlite3.Error as e:
+        print(f"Error al guardar la miniatura de la entrada {entry_id}: {e}")
+    finally:
+        db_pool.release(db)
+
+def schedule_thumbnail(entry_id, image_url):
+    if not THUMBNAILS_ENABLED or not image_url or not image_url.startswith(('uploads/', 'http')):
+        return
+    try:
+        thumbnail_executor.submit(update_entry_thumbnail, entry_id, image_url)
+    except RuntimeError as e:
+        print(f"No se pudo encolar la miniatura de {image_url}: {e}")
+
+def release_images(db, paths):
+    """
+    Borra los ficheros locales que ya no referencia ninguna entrada. Como las
+    imágenes se comparten por contenido, nunca se borran sin comprobarlo.
+    """
+    for path in {p for p in paths if p and p.startswith(('uploads/', 'thumbs/'))}:
+        if db.execute("SELECT 1 FROM link_entries WHERE image_url = ? OR thumbnail_url = ? LIMIT 1", (path, path)).fetchone():
+            continue
+        try:
+            os.remove(os.path.join(app.static_folder, path))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Error al eliminar imagen {path}: {e}")
+
+@app.route('/thumbs/<path:filename>')
+def thumbnail(filename):
+    """Miniaturas con nombre por hash: su contenido nunca cambia."""
+    response = send_from_directory(THUMB_FOLDER, filename, max_age=365 * 24 * 3600)
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+# --- Recursos estáticos con huella ---
+# `flask build-assets` (o el entrypoint) genera static/build/. Con manifiesto,
+# url_for('static', ...) apunta a la versión con huella, que se sirve con caché
+# inmutable y precomprimida según Accept-Encoding; sin él todo sigue igual.
+STATIC_MANIFEST = assets.load_manifest(app.static_folder)
+# Las subidas antiguas pueden tener otro nombre; sólo las `<hash>.<ext>` son inmutables
+CONTENT_ADDRESSED_UPLOAD = re.compile(r'uploads/[0-9a-f]{32}\.[a-z0-9]+')
+
+@app.url_defaults
+def fingerprint_static(endpoint, values):
+    if endpoint == 'static' and values.get('filename') in STATIC_MANIFEST:
+        values['filename'] = STATIC_MANIFEST[values['filename']]
+
+def serve_static(filename):
+    if CONTENT_ADDRESSED_UPLOAD.fullmatch(filename):
+        # Subidas guardadas por hash (images.store_upload): el contenido de una URL nunca cambia
+        response = send_from_directory(app.static_folder, filename, max_age=31536000)
+        response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+        return response
+    if not filename.startswith(assets.BUILD_DIR + '/'):
+        return app.send_static_file(filename)
+    accepted = {encoding for encoding, quality in request.accept_encodings if quality > 0}
+    path, encoding = assets.pick_encoding(app.static_folder, filename, accepted)
+    response = send_from_directory(app.static_folder, path, mimetype=mimetypes.guess_type(filename)[0],
+                                   max_age=31536000)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    response.vary.add('Accept-Encoding')
+    return response
+
+app.view_functions['static'] = serve_static
+
+# --- Tareas periódicas ---
+# Cada worker tiene un hilo que comprueba cada pocos minutos si toca ejecutar
+# alguna tarea; sólo la ejecuta el que consigue reservar su turno en app_state
+# (clave '<tarea>_last_run'), así que corre una vez por intervalo en total.
+JOB_CHECK_INTERVAL = 300
+GC_INTERVAL = int(os.environ.get('GC_INTERVAL', 24 * 3600))  # 0 la desactiva
+GC_MIN_AGE = int(os.environ.get('GC_MIN_AGE', 3600))
+GC_QUARANTINE = os.environ.get('GC_QUARANTINE')  # si se indica, los huérfanos se mueven ahí en vez de borrarse
+LINKCHECK_INTERVAL = int(os.environ.get('LINKCHECK_INTERVAL', 6 * 3600))  # 0 la desactiva
+BACKUP_DIR = os.environ.get('BACKUP_DIR')  # si se indica, se guarda ahí una copia en caliente periódica
+BACKUP_INTERVAL = int(os.environ.get('BACKUP_INTERVAL', 24 * 3600)) if BACKUP_DIR else 0
+BACKUP_KEEP = int(os.environ.get('BACKUP_KEEP', 7))
+# La cola de metadatos vive en memoria: lo que siga 'pending' pasado
+# METADATA_PENDING_TIMEOUT (p. ej. tras reiniciar un worker) se vuelve a encolar
+METADATA_REQUEUE_INTERVAL = int(os.environ.get('METADATA_REQUEUE_INTERVAL', 600))  # 0 la desactiva
+METADATA_PENDING_TIMEOUT = int(os.environ.get('METADATA_PENDING_TIMEOUT', 900))
+_jobs_thread_pid = None
+
+def run_image_gc(db, quarantine_dir=GC_QUARANTINE, min_age=GC_MIN_AGE, batch_size=500, dry_run=False):
+    report = collect_orphans(db, app.static_folder, quarantine_dir=quarantine_dir, min_age=min_age,
+                             batch_size=batch_size, dry_run=dry_run)
+    print(f"Recolección de imágenes: {report['orphans']} huérfanas de {report['scanned']} ficheros, "
+          f"{report['bytes'] / 1024:.1f} KB liberados, {report['errors']} errores.")
+    return report
+
+def check_links(db, url_ids=None, **options):
+    """Comprueba los enlaces, guarda los resultados e invalida la caché del panel."""
+    report = run_link_check(db, get_app_settings(db), url_ids, **options)
+    bump_data_version(db)
+    db.commit()
+    print(f"Comprobación de enlaces: {report['targets']} URLs de {report['links']} enlaces en {report['seconds']:.2f}s, "
+          f"{report['failed']} con error.")
+    return report
+
+def requeue_pending_metadata(db, timeout=METADATA_PENDING_TIMEOUT, limit=500):
+    """
+    Vuelve a encolar las entradas que llevan más de `timeout` segundos en
+    'pending'. metadata_updated_at guarda cuándo se encolaron por última vez
+    para no repetirlas en cada pasada; las que ya no tienen enlace externo
+    pasan a 'none'. Devuelve las entradas encoladas.
+    """
+    rows = db.execute("""SELECT e.id,
+                                (SELECT u.value FROM entry_urls u
+                                 WHERE u.link_entry_id = e.id AND u.link_type = 'external_url'
+                                 ORDER BY u.id LIMIT 1) AS url
+                         FROM link_entries e
+                         WHERE e.metadata_status = 'pending'
+                           AND COALESCE(e.metadata_updated_at, e.created_at) < datetime('now', ?)
+                         LIMIT ?""", (f"-{int(timeout)} seconds", limit)).fetchall()
+    queued = [(row['id'], row['url']) for row in rows if row['url']]
+    without_url = [(row['id'],) for row in rows if not row['url']]
+    db.executemany("UPDATE link_entries SET metadata_updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+                   [(entry_id,) for entry_id, _ in queued])
+    if without_url:
+        db.executemany("UPDATE link_entries SET metadata_status = 'none' WHERE id = ?", without_url)
+        bump_data_version(db)
+    db.commit()
+    for entry_id, url in queued:
+        schedule_metadata_fetch(entry_id, url)
+    if rows:
+        print(f"Metadatos pendientes: {len(queued)} entradas encoladas de nuevo, {len(without_url)} sin enlace externo.")
+    return len(queued)
+
+def run_backup(db, directory=BACKUP_DIR, keep=BACKUP_KEEP):
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"database-{time.strftime('%Y%m%d-%H%M%S')}.db")
+    report = backup_database(db, path)
+    prune_backups(directory, 'database-', keep)
+    print(f"Copia de seguridad en {path}: {report['bytes'] / 1024 / 1024:.1f} MB en {report['seconds']:.2f}s "
+          f"({report['steps']} pasos).")
+    return report
+
+PERIODIC_JOBS = [
+    ('gc', GC_INTERVAL, run_image_gc),
+    ('linkcheck', LINKCHECK_INTERVAL, check_links),
+    ('tombstones', 24 * 3600, lambda db: prune_tombstones(db)),
+    ('backup', BACKUP_INTERVAL, run_backup),
+    ('metadata', METADATA_REQUEUE_INTERVAL, requeue_pending_metadata),
+]
+
+def _claim_turn(db, job, interval):
+    now = int(time.time())
+    db.execute("INSERT OR IGNORE INTO app_state (key, value) VALUES (?, 0)", (f"{job}_last_run",))
+    cur = db.execute("UPDATE app_state SET value = ? WHERE key = ? AND value <= ?", (now, f"{job}_last_run", now - interval))
+    db.commit()
+    return cur.rowcount == 1
+
+def _jobs_loop(jobs):
+    while True:
+        time.sleep(min([JOB_CHECK_INTERVAL] + [interval for _, interval, _ in jobs]))
+        for name, interval, job in jobs:
+            db = db_pool.acquire()
+            try:
+                if _claim_turn(db, name, interval):
+                    job(db)
+            except (sqlite3.Error, OSError) as e:
+                print(f"Error en la tarea periódica '{name}': {e}")
+            finally:
+                db_pool.release(db)
+        metrics.registry.flush()
+
+@app.before_request
+def start_background_jobs():
+    global _jobs_thread_pid
+    if _jobs_thread_pid != os.getpid():
+        _jobs_thread_pid = os.getpid()
+        jobs = [job for job in PERIODIC_JOBS if job[1]]
+        if jobs:
+            threading.Thread(target=_jobs_loop, args=(jobs,), name='periodic-jobs', daemon=True).start()
+
+# --- Métricas de rendimiento ---
+@app.before_request
+def start_request_timer():
+    g._request_start = time.perf_counter()
+    metrics.start_trace()
+
+@app.after_request
+def record_request_metrics(response):
+    start = g.pop('_request_start', None)
+    trace = metrics.end_trace()
+    if start is None:
+        return response
+    elapsed = time.perf_counter() - start
+    metrics.observe('linkmanager_http_request_duration_seconds', elapsed,
+                    endpoint=request.endpoint or 'unmatched', method=request.method, status=str(response.status_code))
+    if metrics.SLOW_REQUEST_MS and trace and elapsed * 1000 >= metrics.SLOW_REQUEST_MS:
+        print(metrics.format_slow_request(request.method, request.full_path.rstrip('?'), response.status_code, elapsed, trace))
+    metrics.registry.flush()
+    return response
+
+def _template_started(sender, template, context, **extra):
+    g.setdefault('_template_starts', []).append(time.perf_counter())
+
+def _template_finished(sender, template, context, **extra):
+    starts = g.get('_template_starts')
+    if starts:
+        metrics.observe('linkmanager_template_render_duration_seconds', time.perf_counter() - starts.pop(),
+                        'template', template=template.name or 'string')
+
+if metrics.METRICS_ENABLED:
+    before_render_template.connect(_template_started, app)
+    template_rendered.connect(_template_finished, app)
+
+@app.route('/metrics')
+def metrics_endpoint():
+    if METRICS_TOKEN and request.headers.get('Authorization') != f"Bearer {METRICS_TOKEN}":
+        abort(401)
+    response = make_response(metrics.registry.render())
+    response.headers['Content-Type'] = 'text/plain; version=0.0.4; charset=utf-8'
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+# --- Rutas CRUD y Principales ---
+
+# --- Modelo del panel en caché ---
+# Cada mutación incrementa `data_version` en la tabla app_state. Como el
+# contador vive en la BD, todos los workers de gunicorn ven la invalidación y
+# cada uno reconstruye su copia en memoria sólo cuando la versión cambia.
+_dashboard_cache = {}  # modo ('full' o 'lazy') → {'version', 'model', 'html'}
+_dashboard_lock = threading.Lock()
+
+# Con LAZY_DASHBOARD=1 la página sólo lleva las secciones y las tarjetas se
+# piden por páginas a /api/sections/<id>/entries (también con ?lazy=1).
+app.config['LAZY_DASHBOARD'] = os.environ.get('LAZY_DASHBOARD', '0') == '1'
+API_PAGE_SIZE = 30
+API_MAX_PAGE_SIZE = 200
+
+def _template_fingerprint():
+    digest = hashlib.sha1(repr(sorted(STATIC_MANIFEST.items())).encode())  # el HTML incluye las rutas con huella
+    for name in sorted(os.listdir(os.path.join(app.root_path, 'templates'))):
+        with app.open_resource(os.path.join('templates', name), mode='rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+TEMPLATE_FINGERPRINT = _template_fingerprint()
+
+def get_data_version(db):
+    row = db.execute("SELECT value FROM app_state WHERE key = 'data_version'").fetchone()
+    return row['value'] if row else 0
+
+def bump_data_version(db):
+    """
+    Marca los datos como modificados. Debe llamarse dentro de la transacción de
+    la mutación. Las filas que los triggers dejaron con version = -1 (y las
+    lápidas de lo borrado) reciben la nueva versión, que es la que sirve el
+    feed /changes. Devuelve la nueva versión.
+    """
+    db.execute("UPDATE app_state SET value = value + 1 WHERE key = 'data_version'")
+    version = get_data_version(db)
+    for table in ('sections', 'link_entries', 'tombstones'):
+        db.execute(f"UPDATE {table} SET version = ? WHERE version = -1", (version,))
+    db.execute("UPDATE app_state SET value = ? WHERE key = 'settings_version' AND value = -1", (version,))
+    return version
+
+def build_dashboard_model(db, lazy=False):
+    """Construye secciones → entradas → enlaces con una sola consulta (sólo secciones si `lazy`)."""
+    if lazy:
+        sections_with_data = [dict(s) for s in db.execute("SELECT * FROM sections ORDER BY order_index, name")]
+        return {
+            'sections_with_data': sections_with_data,
+            'all_sections': [{'id': s['id'], 'name': s['name']} for s in sections_with_data],
+            'app_domains': get_app_settings(),
+            'lazy': True,
+        }
+
+    rows = db.execute("""
+        SELECT s.id AS s_id, s.name AS s_name, s.order_index AS s_order_index, s.created_at AS s_created_at,
+               e.id AS e_id, e.title, e.description, e.image_url, e.thumbnail_url, e.order_index AS e_order_index,
+               e.created_at AS e_created_at, e.metadata_status,
+               u.id AS u_id, u.label, u.link_type, u.value
+        FROM sections s
+        LEFT JOIN link_entries e ON e.section_id = s.id
+        LEFT JOIN entry_urls u ON u.link_entry_id = e.id
+        ORDER BY s.order_index, s.name, e.order_index, e.id DESC, u.id
+    """).fetchall()
+
+    health = load_link_status(db)
+    sections, entries = {}, {}
+    for row in rows:
+        section = sections.get(row['s_id'])
+        if section is None:
+            section = sections[row['s_id']] = {
+                'id': row['s_id'], 'name': row['s_name'], 'order_index': row['s_order_index'],
+                'created_at': row['s_created_at'], 'link_entries': []}
+        if row['e_id'] is None:
+            continue
+        entry = entries.get(row['e_id'])
+        if entry is None:
+            entry = entries[row['e_id']] = {
+                'id': row['e_id'], 'section_id': row['s_id'], 'title': row['title'],
+                'description': row['description'], 'image_url': row['image_url'],
+                'thumbnail_url': row['thumbnail_url'], 'order_index': row['e_order_index'], 'created_at': row['e_created_at'],
+                'metadata_status': row['metadata_status'], 'urls': []}
+            section['link_entries'].append(entry)
+        if row['u_id'] is not None:
+            entry['urls'].append({'id': row['u_id'], 'link_entry_id': row['e_id'], 'label': row['label'],
+                                  'link_type': row['link_type'], 'value': row['value'], 'health': health.get(row['u_id'])})
+
+    sections_with_data = list(sections.values())
+    return {
+        'sections_with_data': sections_with_data,
+        'all_sections': [{'id': s['id'], 'name': s['name']} for s in sections_with_data],
+        'app_domains': get_app_settings(),
+        'lazy': False,
+    }
+
+def _cached(mode, version):
+    entry = _dashboard_cache.get(mode)
+    return entry if entry and entry['version'] == version else None
+
+def get_dashboard_model(db, version, lazy=False):
+    mode = 'lazy' if lazy else 'full'
+    with _dashboard_lock:
+        cached = _cached(mode, version)
+        if cached:
+            return cached['model']
+    model = build_dashboard_model(db, lazy)
+    with _dashboard_lock:
+        _dashboard_cache[mode] = {'version': version, 'model': model, 'html': None}
+    return model
 
 # --- Rutas CRUD y Principales ---
 
 @app.route('/')
 def index():
     db = get_db()
-    sections_query = "SELECT * FROM sections ORDER BY order_index, name"
-    sections_raw = db.execute(sections_query).fetchall()
-    
-    sections = {s['id']: dict(s) for s in sections_raw}
-    for s_id in sections:
-        sections[s_id]['link_entries'] = []
-
-    entries_query = "SELECT * FROM link_entries ORDER BY order_index, created_at DESC"
-    entries_raw = db.execute(entries_query).fetchall()
-    entries = {e['id']: dict(e) for e in entries_raw}
-    for e_id in entries:
-        entries[e_id]['urls'] = []
-        
-    urls_query = "SELECT * FROM entry_urls ORDER BY id"
-    urls_raw = db.execute(urls_query).fetchall()
-    
-    for url in urls_raw:
-        if url['link_entry_id'] in entries:
-            entries[url['link_entry_id']]['urls'].append(dict(url))
+    version = get_data_version(db)
+    lazy = request.args.get('lazy', '1' if app.config['LAZY_DASHBOARD'] else '0') == '1'
+    mode = 'lazy' if lazy else 'full'
+    etag = f"dashboard-{mode}-{version}-{TEMPLATE_FINGERPRINT}"
 
-    for entry in entries.values():
-        if entry['section_id'] in sections:
-            sections[entry['section_id']]['link_entries'].append(entry)
+    # Con mensajes flash pendientes la página es única: ni caché ni ETag
+    if session.get('_flashes'):
+        return render_template('index.html', data_version=version, **get_dashboard_model(db, version, lazy))
 
-    sections_with_data = list(sections.values())
-    all_sections_for_dropdown = [dict(s) for s in sections_raw]
+    if etag in request.if_none_match:
+        response = make_response('', 304)
+    else:
+        model = get_dashboard_model(db, version, lazy)
+        with _dashboard_lock:
+            cached = _cached(mode, version)
+            html = cached['html'] if cached else None
+        if html is None:
+            html = render_template('index.html', data_version=version, **model)
+            with _dashboard_lock:
+                cached = _cached(mode, version)
+                if cached:
+                    cached['html'] = html
+        response = make_response(html)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
-    app_domains = get_app_settings()
-    
-    return render_template('index.html', sections_with_data=sections_with_data, all_sections=all_sections_for_dropdown, app_domains=app_domains)
+# --- API JSON de secciones y entradas (paginación por cursor) ---
+
+def encode_cursor(entry):
+    return f"{entry['order_index']}:{entry['id']}"
+
+def decode_cursor(cursor):
+    order_index, entry_id = cursor.split(':', 1)
+    return int(order_index), int(entry_id)
+
+def fetch_entries_page(db, section_id, cursor, limit):
+    """
+    Devuelve una página de entradas de la sección ordenadas como en el panel
+    (order_index ascendente y, a igualdad, las más recientes primero) usando
+    paginación por clave sobre (order_index, id).
+    """
+    if cursor:
+        order_index, entry_id = decode_cursor(cursor)
+        rows = db.execute("""SELECT * FROM link_entries
+                             WHERE section_id = ? AND (order_index > ? OR (order_index = ? AND id < ?))
+                             ORDER BY order_index, id DESC LIMIT ?""",
+                          (section_id, order_index, order_index, entry_id, limit + 1)).fetchall()
+    else:
+        rows = db.execute("SELECT * FROM link_entries WHERE section_id = ? ORDER BY order_index, id DESC LIMIT ?",
+                          (section_id, limit + 1)).fetchall()
+
+    entries = attach_urls(db, [dict(row) for row in rows[:limit]])
+    next_cursor = encode_cursor(entries[-1]) if len(rows) > limit else None
+    return entries, next_cursor
+
+def attach_urls(db, entries):
+    """Añade a cada entrada su lista 'urls' (con el estado de salud de cada enlace)."""
+    by_id = {e['id']: e for e in entries}
+    for entry in entries:
+        entry['urls'] = []
+    if by_id:
+        placeholders = ','.join('?' * len(by_id))
+        urls = db.execute(f"SELECT * FROM entry_urls WHERE link_entry_id IN ({placeholders}) ORDER BY id",
+                          list(by_id)).fetchall()
+        health = load_link_status(db, [url['id'] for url in urls])
+        for url in urls:
+            by_id[url['link_entry_id']]['urls'].append(dict(url, health=health.get(url['id'])))
+    return entries
+
+@app.route('/api/sections', methods=['GET'])
+def api_sections():
+    db = get_db()
+    rows = db.execute("""SELECT s.id, s.name, s.order_index,
+                                (SELECT count(*) FROM link_entries e WHERE e.section_id = s.id) AS entry_count
+                         FROM sections s ORDER BY s.order_index, s.name""").fetchall()
+    return jsonify({'version': get_data_version(db), 'sections': [dict(row) for row in rows]})
+
+@app.route('/api/sections/<int:section_id>/entries', methods=['GET'])
+def api_section_entries(section_id):
+    db = get_db()
+    if not db.execute("SELECT 1 FROM sections WHERE id = ?", (section_id,)).fetchone():
+        return jsonify({'error': 'Sección no encontrada'}), 404
+    limit = min(max(request.args.get('limit', API_PAGE_SIZE, type=int), 1), API_MAX_PAGE_SIZE)
+    try:
+        entries, next_cursor = fetch_entries_page(db, section_id, request.args.get('cursor'), limit)
+    except ValueError:
+        return jsonify({'error': 'Cursor no válido'}), 400
+
+    payload = {'section_id': section_id, 'next_cursor': next_cursor}
+    if request.args.get('format') == 'html':
+        payload['html'] = ''.join(render_template('_link_entry_card.html', entry=e) for e in entries)
+        payload['count'] = len(entries)
+    else:
+        payload['entries'] = entries
+    return jsonify(payload)
+
+# --- Feed de cambios y respuestas de las mutaciones ---
+# Cada fila de sections y link_entries guarda la data_version en que cambió por
+# última vez y los borrados dejan una lápida (tabla tombstones), de modo que
+# /changes?since=N devuelve sólo lo modificado desde N, ya renderizado. Las
+# rutas de mutación responden lo mismo en JSON cuando el cliente lo pide
+# (Accept: application/json), en lugar de redirigir y volver a pintar el panel.
+CHANGES_MAX = int(os.environ.get('CHANGES_MAX', 200))  # por encima el cliente recarga la página
+TOMBSTONE_RETENTION = int(os.environ.get('TOMBSTONE_RETENTION', 7 * 24 * 3600))
+
+def _app_state(db, key):
+    row = db.execute("SELECT value FROM app_state WHERE key = ?", (key,)).fetchone()
+    return row['value'] if row else 0
+
+def load_entries(db, ids):
+    """Entradas completas (con sus enlaces) de los ids indicados."""
+    if not ids:
+        return []
+    placeholders = ','.join('?' * len(ids))
+    rows = db.execute(f"SELECT * FROM link_entries WHERE id IN ({placeholders})", list(ids)).fetchall()
+    return attach_urls(db, [dict(row) for row in rows])
+
+def collect_changes(db, since):
+    """
+    Cambios posteriores a la versión `since`: secciones y tarjetas renderizadas,
+    ids borrados y, si cambiaron, los dominios. Devuelve {'reset': True} cuando
+    no se puede responder de forma incremental (versión desconocida, lápidas
+    ya purgadas o demasiados cambios) y el cliente debe recargar.
+    """
+    version = get_data_version(db)
+    payload = {'version': version, 'sections': [], 'entries': [], 'deleted': {'sections': [], 'entries': []}}
+    if since == version:
+        return payload
+    if since > version or since < _app_state(db, 'changes_floor'):
+        return {'version': version, 'reset': True}
+
+    sections = db.execute("SELECT * FROM sections WHERE version > ? ORDER BY order_index, name LIMIT ?",
+                          (since, CHANGES_MAX + 1)).fetchall()
+    entry_ids = [row['id'] for row in db.execute("SELECT id FROM link_entries WHERE version > ? LIMIT ?",
+                                                 (since, CHANGES_MAX + 1))]
+    tombstones = db.execute("SELECT kind, item_id FROM tombstones WHERE version > ? LIMIT ?",
+                            (since, CHANGES_MAX + 1)).fetchall()
+    if len(sections) + len(entry_ids) + len(tombstones) > CHANGES_MAX:
+        return {'version': version, 'reset': True}
+
+    for row in sections:
+        section = dict(row, link_entries=[])
+        payload['sections'].append({
+            'id': section['id'], 'name': section['name'], 'order_index': section['order_index'],
+            'html': render_template('_section.html', section=section, lazy=False)})
+    for entry in load_entries(db, entry_ids):
+        payload['entries'].append({
+            'id': entry['id'], 'section_id': entry['section_id'], 'order_index': entry['order_index'],
+            'html': render_template('_link_entry_card.html', entry=entry)})
+    for row in tombstones:
+        payload['deleted']['sections' if row['kind'] == 'section' else 'entries'].append(row['item_id'])
+    if _app_state(db, 'settings_version') > since:
+        payload['app_domains'] = get_app_settings(db)
+    return payload
+
+def prune_tombstones(db, retention=TOMBSTONE_RETENTION):
+    """Purga las lápidas antiguas. Los clientes con una versión anterior a la purga recibirán 'reset'."""
+    cutoff = time.time() - retention
+    floor = db.execute("SELECT max(version) FROM tombstones WHERE deleted_at < ?", (cutoff,)).fetchone()[0]
+    if floor is None:
+        return 0
+    cur = db.execute("DELETE FROM tombstones WHERE version <= ?", (floor,))
+    db.execute("UPDATE app_state SET value = max(value, ?) WHERE key = 'changes_floor'", (floor,))
+    db.commit()
+    return cur.rowcount
+
+@app.route('/changes', methods=['GET'])
+def changes():
+    since = request.args.get('since', type=int)
+    if since is None:
+        return jsonify({'error': "Falta el parámetro 'since' o no es un número"}), 400
+    response = jsonify(collect_changes(get_db(), since))
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+def wants_json():
+    return request.accept_mimetypes.best == 'application/json'
+
+def mutation_response(message, category, status=200, version=None):
+    """
+    Respuesta de una ruta de mutación: JSON con el mensaje y los cambios desde
+    la versión que tenía el cliente (cabecera X-Data-Version) si lo pide, o
+    mensaje flash y redirección al panel.
+    """
+    if not wants_json():
+        flash(message, category)
+        return redirect(url_for('index'))
+    payload = {'status': 'success' if status < 400 else 'error', 'category': category, 'message': message}
+    if status < 400:
+        db = get_db()
+        since = request.headers.get('X-Data-Version', type=int)
+        if since is None:
+            since = (version or get_data_version(db)) - 1
+        payload.update(collect_changes(db, since))
+    return jsonify(payload), status
 
 @app.route('/update_settings', methods=['POST'])
 def update_settings():
@@ -144,89 +754,513 @@ def update_settings():
                    ('domain_lan', format_url(request.form.get('domain_lan', ''))))
         db.execute("INSERT OR REPLACE INTO settings (setting_key, setting_value) VALUES (?, ?)", 
                    ('domain_local', format_url(request.form.get('domain_local', ''))))
+        version = bump_data_version(db)
         db.commit()
-        flash("Configuración de entorno actualizada.", "success")
     except sqlite3.Error as e:
         db.rollback()
-        flash(f"Error al actualizar la configuración: {e}", "error")
-    return redirect(url_for('index'))
+        return mutation_response(f"Error al actualizar la configuración: {e}", "error", 500)
+    return mutation_response("Configuración de entorno actualizada.", "success", version=version)
+
+# --- Ordenación ---
+# Las claves order_index son dispersas (separadas ORDER_GAP) para que mover un
+# elemento sólo reescriba su fila: se le asigna una clave entre las de sus
+# nuevos vecinos. Cuando no queda hueco se renumera el ámbito con un único
+# executemany de las filas que cambian. Las altas ya nacen con clave dispersa
+# (migrations.NEW_ENTRY_ORDER_KEY / NEW_SECTION_ORDER_KEY).
+ORDER_GAP = migrations.ORDER_GAP
+
+ORDERING = {
+    # orden: order_index y, a igualdad, el desempate indicado
+    'sections': {'table': 'sections', 'tiebreak': 'name', 'desc': False, 'scope': None},
+    'entries': {'table': 'link_entries', 'tiebreak': 'id', 'desc': True, 'scope': 'section_id'},
+}
+
+def _order_by(cfg, reverse=False):
+    key_dir = 'DESC' if reverse else 'ASC'
+    tb_dir = 'DESC' if cfg['desc'] != reverse else 'ASC'
+    return f"order_index {key_dir}, {cfg['tiebreak']} {tb_dir}"
+
+def _ordering_queries(cfg):
+    """
+    SQL de la ordenación para una configuración de ORDERING. El ámbito es un
+    parámetro más (`1 = 1` sin ámbito). check-query-plans planifica estas
+    consultas ya construidas para cada configuración.
+    """
+    table, tb = cfg['table'], cfg['tiebreak']
+    scope_sql = '1 = 1' if cfg['scope'] is None else f"{cfg['scope']} = ?"
+    queries = {
+        'row': f"SELECT * FROM {table} WHERE id = ?",
+        'scope_rows': f"SELECT id, order_index FROM {table} WHERE {scope_sql} AND id != ? ORDER BY {_order_by(cfg)}",
+        'set_key': f"UPDATE {table} SET order_index = ? WHERE id = ?",
+        'set_key_if_changed': f"UPDATE {table} SET order_index = ? WHERE id = ? AND order_index != ?",
+    }
+    # Vecino inmediatamente posterior (next) o anterior (prev) a un ancla
+    for name, forward in (('next', True), ('prev', False)):
+        key_cmp = '>' if forward else '<'
+        tb_cmp = ('<' if cfg['desc'] else '>') if forward else ('>' if cfg['desc'] else '<')
+        queries[name] = f"""SELECT * FROM {table}
+            WHERE {scope_sql} AND id != ?
+              AND (order_index {key_cmp} ? OR (order_index = ? AND {tb} {tb_cmp} ?))
+            ORDER BY {_order_by(cfg, reverse=not forward)} LIMIT 1"""
+    return queries
+
+for _cfg in ORDERING.values():
+    _cfg['sql'] = _ordering_queries(_cfg)
+
+def _scope_params(cfg, scope_value):
+    return [] if cfg['scope'] is None else [scope_value]
+
+def _order_row(db, cfg, item_id):
+    return db.execute(cfg['sql']['row'], (item_id,)).fetchone()
+
+def _adjacent(db, cfg, scope_value, anchor, exclude_id, forward):
+    """Elemento inmediatamente posterior (forward) o anterior al ancla en el orden real."""
+    return db.execute(cfg['sql']['next' if forward else 'prev'],
+                      _scope_params(cfg, scope_value) + [exclude_id, anchor['order_index'], anchor['order_index'],
+                                                         anchor[cfg['tiebreak']]]).fetchone()
+
+def _rebalance(db, cfg, scope_value, item_id, prev, nxt):
+    """Renumera el ámbito con claves dispersas colocando el elemento entre prev y nxt."""
+    rows = db.execute(cfg['sql']['scope_rows'], _scope_params(cfg, scope_value) + [item_id]).fetchall()
+    ids = [row['id'] for row in rows]
+    current = {row['id']: row['order_index'] for row in rows}
+    position = ids.index(prev['id']) + 1 if prev else (ids.index(nxt['id']) if nxt else 0)
+    ids.insert(position, item_id)
+    changes = [((i + 1) * ORDER_GAP, row_id) for i, row_id in enumerate(ids) if current.get(row_id) != (i + 1) * ORDER_GAP]
+    db.executemany(cfg['sql']['set_key'], changes)
+    return len(changes)
+
+def move_item(db, order_type, item_id, after_id=None, before_id=None, section_id=None):
+    """
+    Coloca `item_id` justo después de `after_id` (o justo antes de `before_id`)
+    y, para entradas, en la sección `section_id`. Devuelve las filas escritas.
+    """
+    cfg = ORDERING[order_type]
+    item = _order_row(db, cfg, item_id)
+    if item is None:
+        raise LookupError("El elemento a mover no existe.")
+
+    scope_value = None
+    if cfg['scope']:
+        scope_value = item[cfg['scope']] if section_id is None else section_id
+        if section_id is not None and section_id != item[cfg['scope']]:
+            if not db.execute("SELECT 1 FROM sections WHERE id = ?", (section_id,)).fetchone():
+                raise LookupError("La sección de destino no existe.")
+            db.execute("UPDATE link_entries SET section_id = ? WHERE id = ?", (section_id, item_id))
+
+    prev = nxt = None
+    anchor_id = after_id if after_id is not None else before_id
+    if anchor_id is not None:
+        anchor = _order_row(db, cfg, anchor_id)
+        if anchor is None or anchor['id'] == item_id or (cfg['scope'] and anchor[cfg['scope']] != scope_value):
+            raise LookupError("El vecino indicado no es válido.")
+        if after_id is not None:
+            prev, nxt = anchor, _adjacent(db, cfg, scope_value, anchor, item_id, forward=True)
+        else:
+            prev, nxt = _adjacent(db, cfg, scope_value, anchor, item_id, forward=False), anchor
+
+    if prev is None and nxt is None:
+        return 1 if section_id is not None else 0
+    if prev is None:
+        key = nxt['order_index'] - ORDER_GAP
+    elif nxt is None:
+        key = prev['order_index'] + ORDER_GAP
+    elif nxt['order_index'] - prev['order_index'] >= 2:
+        key = (prev['order_index'] + nxt['order_index']) // 2
+    else:
+        return _rebalance(db, cfg, scope_value, item_id, prev, nxt)
+    db.execute(cfg['sql']['set_key'], (key, item_id))
+    return 1
+
+def apply_full_order(db, order_type, order_ids):
+    """Modo lista completa: sólo se reescriben las filas cuya posición cambia."""
+    cfg = ORDERING[order_type]
+    keys = [((index + 1) * ORDER_GAP, item_id, (index + 1) * ORDER_GAP) for index, item_id in enumerate(order_ids)]
+    return db.executemany(cfg['sql']['set_key_if_changed'], keys).rowcount
+
+def _optional_int(value):
+    return None if value in (None, '') else int(value)
 
 @app.route('/update_order', methods=['POST'])
 def update_order():
-    data = request.get_json()
+    """
+    Acepta un movimiento {type, item_id, after_id | before_id, section_id} o,
+    por compatibilidad, la lista completa {type, order, section_id, entry_id}.
+    """
+    data = request.get_json(silent=True) or {}
     order_type = data.get('type')
-    order_ids = data.get('order', [])
-    
-    if not order_type or not order_ids:
+    if order_type not in ORDERING:
+        return jsonify({'status': 'error', 'message': 'Tipo inválido'}), 400
+    if not data.get('item_id') and not data.get('order'):
         return jsonify({'status': 'error', 'message': 'Datos inválidos'}), 400
-        
+
     db = get_db()
     try:
-        table_name = ''
-        if order_type == 'sections':
-            table_name = 'sections'
-        elif order_type == 'entries':
-            table_name = 'link_entries'
-            if 'section_id' in data and 'entry_id' in data:
-                db.execute("UPDATE link_entries SET section_id = ? WHERE id = ?", (int(data['section_id']), int(data['entry_id'])))
+        section_id = _optional_int(data.get('section_id')) if order_type == 'entries' else None
+        if data.get('item_id'):
+            updated = move_item(db, order_type, int(data['item_id']), _optional_int(data.get('after_id')),
+                                _optional_int(data.get('before_id')), section_id)
         else:
-            return jsonify({'status': 'error', 'message': 'Tipo inválido'}), 400
+            order_ids = [int(item_id) for item_id in data['order']]
+            updated = 0
+            if section_id is not None and data.get('entry_id'):
+                updated += move_item(db, 'entries', int(data['entry_id']), section_id=section_id)
+            updated += apply_full_order(db, order_type, order_ids)
 
-        for index, item_id in enumerate(order_ids):
-            db.execute(f"UPDATE {table_name} SET order_index = ? WHERE id = ?", (index, int(item_id)))
-        
+        bump_data_version(db)
         db.commit()
-        return jsonify({'status': 'success'})
-        
-    except (sqlite3.Error, ValueError) as e:
+        return jsonify({'status': 'success', 'updated': updated})
+
+    except LookupError as e:
+        db.rollback()
+        return jsonify({'status': 'error', 'message': str(e)}), 404
+    except (sqlite3.Error, ValueError, TypeError) as e:
         db.rollback()
         print(f"Error al actualizar orden: {e}")
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+# --- API por lotes ---
+# POST /api/batch con {"operations": [{"op", "type", ...}, ...]} aplica en una
+# sola transacción altas (create), cambios (update), movimientos (move) y bajas
+# (delete) de secciones (section), entradas (entry) y enlaces (url). Todas las
+# operaciones se validan antes de escribir nada, con una consulta por tabla, y
+# se ejecutan agrupadas por fases en ese orden (altas, cambios, movimientos,
+# bajas) con un executemany por sentencia. Si alguna no es válida no se aplica
+# ninguna. Las altas admiten "ref" y el resto de operaciones puede usar "@ref"
+# en lugar de un id para referirse a lo creado en el mismo lote.
+BATCH_MAX_OPERATIONS = int(os.environ.get('BATCH_MAX_OPERATIONS', 1000))
+BATCH_TYPES = {'section': 'sections', 'entry': 'link_entries', 'url': 'entry_urls'}
+BATCH_OPS = ('create', 'update', 'move', 'delete')
+LINK_TYPES = ('external_url', 'internal_app', 'subdomain')
+
+def _batch_text(source, field, required=False, empty=True):
+    value = source.get(field)
+    if value is None:
+        if required:
+            raise ValueError(f"falta '{field}'")
+        return None
+    if not isinstance(value, str):
+        raise ValueError(f"'{field}' debe ser texto")
+    value = value.strip()
+    if not value and not empty:
+        raise ValueError(f"'{field}' no puede estar vacío")
+    return value
+
+def _batch_url_fields(source, required):
+    fields = {'label': _batch_text(source, 'label'),
+              'link_type': _batch_text(source, 'link_type', required),
+              'value': _batch_text(source, 'value', required, empty=False)}
+    if fields['link_type'] is not None and fields['link_type'] not in LINK_TYPES:
+        raise ValueError(f"'link_type' debe ser uno de: {', '.join(LINK_TYPES)}")
+    return fields
+
+def parse_batch_operation(raw, refs):
+    """
+    Valida la forma de una operación y la normaliza. `refs` ({ref: tipo}) tiene
+    las altas válidas anteriores. Devuelve la operación y los [(tipo, id)] que
+    deben existir en la BD. Lanza ValueError con el motivo si no es válida.
+    """
+    if not isinstance(raw, dict):
+        raise ValueError("la operación debe ser un objeto")
+    action, kind = raw.get('op'), raw.get('type')
+    if action not in BATCH_OPS:
+        raise ValueError(f"'op' debe ser uno de: {', '.join(BATCH_OPS)}")
+    if kind not in BATCH_TYPES:
+        raise ValueError(f"'type' debe ser uno de: {', '.join(BATCH_TYPES)}")
+    op, needed = {'op': action, 'type': kind}, []
+
+    def ref_or_id(field, target, required=True):
+        value = raw.get(field)
+        if value is None:
+            if required:
+                raise ValueError(f"falta '{field}'")
+            return None
+        if isinstance(value, str) and value.startswith('@'):
+            if refs.get(value[1:]) != target:
+                raise ValueError(f"'{field}': {value} no es un alta de tipo {target} anterior en el lote")
+            return value
+        if isinstance(value, bool) or not isinstance(value, (int, str)) or not str(value).isdigit():
+            raise ValueError(f"'{field}' no es un id válido")
+        needed.append((target, int(value)))
+        return int(value)
+
+    if action == 'create':
+        ref = raw.get('ref')
+        if ref is not None and (not isinstance(ref, str) or not ref or ref in refs):
+            raise ValueError("'ref' debe ser un texto no usado en otra alta del lote")
+        op['ref'] = ref
+    else:
+        op['id'] = ref_or_id('id', kind)
+
+    if kind == 'section':
+        if action in ('create', 'update'):
+            op['name'] = _batch_text(raw, 'name', required=True, empty=False)
+        elif action == 'move':
+            op['after_id'] = ref_or_id('after_id', 'section', required=False)
+            op['before_id'] = ref_or_id('before_id', 'section', required=False)
+            if (op['after_id'] is None) == (op['before_id'] is None):
+                raise ValueError("indica 'after_id' o 'before_id'")
+    elif kind == 'entry':
+        if action == 'create':
+            op['section_id'] = ref_or_id('section_id', 'section')
+            op['title'] = _batch_text(raw, 'title', required=True, empty=False)
+            op['description'] = _batch_text(raw, 'description') or ''
+            urls = raw.get('urls')
+            if not isinstance(urls, list) or not urls or not all(isinstance(url, dict) for url in urls):
+                raise ValueError("'urls' debe ser una lista con al menos un enlace")
+            op['urls'] = [_batch_url_fields(url, required=True) for url in urls]
+        elif action == 'update':
+            op['title'] = _batch_text(raw, 'title', empty=False)
+            op['description'] = _batch_text(raw, 'description')
+            if op['title'] is None and op['description'] is None:
+                raise ValueError("indica 'title' o 'description'")
+        elif action == 'move':
+            op['section_id'] = ref_or_id('section_id', 'section', required=False)
+            op['after_id'] = ref_or_id('after_id', 'entry', required=False)
+            op['before_id'] = ref_or_id('before_id', 'entry', required=False)
+            if op['after_id'] is not None and op['before_id'] is not None:
+                raise ValueError("indica sólo uno de 'after_id' y 'before_id'")
+            if op['section_id'] is None and op['after_id'] is None and op['before_id'] is None:
+                raise ValueError("indica 'section_id', 'after_id' o 'before_id'")
+    else:
+        if action in ('create', 'move'):
+            op['entry_id'] = ref_or_id('entry_id', 'entry')
+        if action in ('create', 'update'):
+            op.update(_batch_url_fields(raw, required=action == 'create'))
+            if action == 'update' and all(op[field] is None for field in ('label', 'link_type', 'value')):
+                raise ValueError("indica 'label', 'link_type' o 'value'")
+    return op, needed
+
+def validate_batch(db, operations):
+    """
+    Valida todas las operaciones. Devuelve (operaciones normalizadas,
+    {índice: motivo}) con una consulta por tabla para comprobar los ids.
+    """
+    ops, errors, needed, refs = [], {}, [], {}
+    for index, raw in enumerate(operations):
+        try:
+            op, ids = parse_batch_operation(raw, refs)
+        except ValueError as e:
+            ops.append(None)
+            errors[index] = str(e)
+            continue
+        if op.get('ref'):
+            refs[op['ref']] = op['type']
+        ops.append(op)
+        needed.extend((index, kind, item_id) for kind, item_id in ids)
+
+    existing = {}
+    for kind, table in BATCH_TYPES.items():
+        ids = list({item_id for _, k, item_id in needed if k == kind})
+        if ids:
+            placeholders = ','.join('?' * len(ids))
+            existing[kind] = {row['id'] for row in db.execute(f"SELECT id FROM {table} WHERE id IN ({placeholders})", ids)}
+    for index, kind, item_id in needed:
+        if item_id not in existing[kind] and index not in errors:
+            errors[index] = f"no existe {kind} con id {item_id}"
+    return ops, errors
+
+def apply_batch(db, ops):
+    """
+    Aplica operaciones ya validadas por fases, dentro de la transacción del
+    llamador. Devuelve (id de cada operación, imágenes a liberar tras el commit,
+    [(entry_id, url)] de las entradas nuevas cuyos metadatos hay que obtener).
+    """
+    ids = [op.get('id') for op in ops]
+    created = {}
+
+    def resolve(value):
+        return created[value[1:]] if isinstance(value, str) else value
+
+    def select(action, kind):
+        return [(i, op) for i, op in enumerate(ops) if op['op'] == action and op['type'] == kind]
+
+    def insert_many(sql, rows):
+        """executemany de un INSERT; devuelve los ids, consecutivos con AUTOINCREMENT y el bloqueo de escritura."""
+        if not rows:
+            return range(0)
+        db.executemany(sql, rows)
+        last_id = db.execute("SELECT last_insert_rowid()").fetchone()[0]
+        return range(last_id - len(rows) + 1, last_id + 1)
+
+    def register(selected, new_ids):
+        for (i, op), new_id in zip(selected, new_ids):
+            ids[i] = new_id
+            if op['ref']:
+                created[op['ref']] = new_id
+
+    # Altas: secciones, entradas con sus enlaces y enlaces sueltos
+    sections = select('create', 'section')
+    register(sections, insert_many(f"INSERT INTO sections (name, order_index) VALUES (?, {migrations.NEW_SECTION_ORDER_KEY})",
+                                   [(op['name'],) for _, op in sections]))
+
+    entries = select('create', 'entry')
+    first_external = [next((u['value'] for u in op['urls'] if u['link_type'] == 'external_url'), None) for _, op in entries]
+    entry_ids = insert_many(
+        f"""INSERT INTO link_entries (title, description, section_id, metadata_status, order_index)
+            VALUES (?, ?, ?, ?, {migrations.NEW_ENTRY_ORDER_KEY})""",
+        [(op['title'], op['description'], resolve(op['section_id']), 'pending' if url else 'none', resolve(op['section_id']))
+         for (_, op), url in zip(entries, first_external)])
+    register(entries, entry_ids)
+    insert_many("INSERT INTO entry_urls (link_entry_id, label, link_type, value) VALUES (?, ?, ?, ?)",
+                [(entry_id, url['label'] or '', url['link_type'], url['value'])
+                 for entry_id, (_, op) in zip(entry_ids, entries) for url in op['urls']])
+    fetches = [(entry_id, url) for entry_id, url in zip(entry_ids, first_external) if url]
+
+    urls = select('create', 'url')
+    register(urls, insert_many("INSERT INTO entry_urls (link_entry_id, label, link_type, value) VALUES (?, ?, ?, ?)",
+                               [(resolve(op['entry_id']), op['label'] or '', op['link_type'], op['value'])
+                                for _, op in urls]))
+
+    # Cambios
+    db.executemany("UPDATE sections SET name = ? WHERE id = ?",
+                   [(op['name'], resolve(op['id'])) for _, op in select('update', 'section')])
+    db.executemany("UPDATE link_entries SET title = coalesce(?, title), description = coalesce(?, description) WHERE id = ?",
+                   [(op['title'], op['description'], resolve(op['id'])) for _, op in select('update', 'entry')])
+    url_updates = [op for _, op in select('update', 'url')]
+    # El estado de salud deja de valer si cambia el destino del enlace
+    targets = [op['id'] for op in url_updates if isinstance(op['id'], int) and (op['link_type'] or op['value'])]
+    if targets:
+        placeholders = ','.join('?' * len(targets))
+        current = {row['id']: (row['link_type'], row['value']) for row in
+                   db.execute(f"SELECT id, link_type, value FROM entry_urls WHERE id IN ({placeholders})", targets)}
+        db.executemany("DELETE FROM link_status WHERE url_id = ?",
+                       [(op['id'],) for op in url_updates if op['id'] in current and
+                        (op['link_type'] or current[op['id']][0], op['value'] or current[op['id']][1]) != current[op['id']]])
+    db.executemany("UPDATE entry_urls SET label = coalesce(?, label), link_type = coalesce(?, link_type), "
+                   "value = coalesce(?, value) WHERE id = ?",
+                   [(op['label'], op['link_type'], op['value'], resolve(op['id'])) for op in url_updates])
+
+    # Movimientos: los cambios de sección sin vecino van juntos; los que
+    # indican vecino se colocan uno a uno, en el orden del lote
+    db.executemany("UPDATE entry_urls SET link_entry_id = ? WHERE id = ?",
+                   [(resolve(op['entry_id']), resolve(op['id'])) for _, op in select('move', 'url')])
+    entry_moves = select('move', 'entry')
+    positioned = [(i, op) for i, op in entry_moves if op['after_id'] is not None or op['before_id'] is not None]
+    db.executemany("UPDATE link_entries SET section_id = ? WHERE id = ?",
+                   [(resolve(op['section_id']), resolve(op['id'])) for _, op in entry_moves
+                    if op['after_id'] is None and op['before_id'] is None])
+    for order_type, moves in (('sections', select('move', 'section')), ('entries', positioned)):
+        for i, op in moves:
+            try:
+                move_item(db, order_type, resolve(op['id']), resolve(op['after_id']), resolve(op['before_id']),
+                          resolve(op.get('section_id')))
+            except LookupError as e:
+                raise LookupError(f"Operación {i}: {e}")
+
+    # Bajas: primero se recogen las imágenes de las entradas que desaparecen
+    deleted_entries = [resolve(op['id']) for _, op in select('delete', 'entry')]
+    deleted_sections = [resolve(op['id']) for _, op in select('delete', 'section')]
+    images = []
+    if deleted_entries or deleted_sections:
+        entry_marks, section_marks = ','.join('?' * len(deleted_entries)), ','.join('?' * len(deleted_sections))
+        images = [path for row in db.execute(
+            f"SELECT image_url, thumbnail_url FROM link_entries WHERE id IN ({entry_marks}) OR section_id IN ({section_marks})",
+            deleted_entries + deleted_sections) for path in row]
+    db.executemany("DELETE FROM entry_urls WHERE id = ?", [(resolve(op['id']),) for _, op in select('delete', 'url')])
+    db.executemany("DELETE FROM link_entries WHERE id = ?", [(entry_id,) for entry_id in deleted_entries])
+    db.executemany("DELETE FROM sections WHERE id = ?", [(section_id,) for section_id in deleted_sections])
+    return [resolve(item_id) for item_id in ids], images, fetches
+
+@app.route('/api/batch', methods=['POST'])
+def api_batch():
+    """
+    Aplica un lote de operaciones en una transacción. Responde con el
+    resultado de cada una ({index, status, id}) y, si se envía la cabecera
+    X-Data-Version, con los cambios desde esa versión como /changes.
+    """
+    data = request.get_json(silent=True)
+    operations = data.get('operations') if isinstance(data, dict) else None
+    if not isinstance(operations, list) or not operations:
+        return jsonify({'status': 'error', 'message': "Se esperaba {'operations': [...]} con al menos una operación."}), 400
+    if len(operations) > BATCH_MAX_OPERATIONS:
+        return jsonify({'status': 'error', 'message': f"Como máximo {BATCH_MAX_OPERATIONS} operaciones por lote."}), 413
+
+    db = get_db()
+    try:
+        db.execute("BEGIN IMMEDIATE")  # la validación y la escritura ven el mismo estado
+        ops, errors = validate_batch(db, operations)
+        if errors:
+            db.rollback()
+            results = [{'index': i, 'status': 'error', 'message': errors[i]} if i in errors else
+                       {'index': i, 'status': 'skipped'} for i in range(len(operations))]
+            return jsonify({'status': 'error', 'results': results,
+                            'message': f"{len(errors)} operaciones no válidas; no se ha aplicado ninguna."}), 400
+        ids, images, fetches = apply_batch(db, ops)
+        version = bump_data_version(db)
+        db.commit()
+    except LookupError as e:
+        db.rollback()
+        return jsonify({'status': 'error', 'message': str(e)}), 409
+    except sqlite3.IntegrityError as e:
+        db.rollback()
+        return jsonify({'status': 'error', 'message': f"El lote viola una restricción de la BD: {e}"}), 409
+    except sqlite3.Error as e:
+        db.rollback()
+        print(f"Error al aplicar el lote: {e}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+    release_images(db, images)
+    for entry_id, url in fetches:
+        schedule_metadata_fetch(entry_id, url)
+    payload = {'status': 'success', 'version': version,
+               'results': [{'index': i, 'status': 'ok', 'id': item_id} for i, item_id in enumerate(ids)]}
+    since = request.headers.get('X-Data-Version', type=int)
+    if since is not None:
+        payload.update(collect_changes(db, since))
+    return jsonify(payload)
+
 @app.route('/add_section', methods=['POST'])
 def add_section():
     name = request.form.get('section_name', '').strip()
-    if name:
-        db = get_db()
-        try:
-            db.execute("INSERT INTO sections (name) VALUES (?)", (name,))
-            db.commit()
-            flash(f"Sección '{name}' creada.", "success")
-        except sqlite3.IntegrityError:
-            flash(f"La sección '{name}' ya existe.", "warning")
-    else:
-        flash("El nombre de la sección no puede estar vacío.", "error")
-    return redirect(url_for('index'))
+    if not name:
+        return mutation_response("El nombre de la sección no puede estar vacío.", "error", 400)
+    db = get_db()
+    try:
+        db.execute(f"INSERT INTO sections (name, order_index) VALUES (?, {migrations.NEW_SECTION_ORDER_KEY})", (name,))
+        version = bump_data_version(db)
+        db.commit()
+    except sqlite3.IntegrityError:
+        db.rollback()
+        return mutation_response(f"La sección '{name}' ya existe.", "warning", 409)
+    return mutation_response(f"Sección '{name}' creada.", "success", version=version)
 
 @app.route('/edit_section/<int:section_id>', methods=['POST'])
 def edit_section(section_id):
     new_name = request.form.get('edit_section_name', '').strip()
     if not new_name:
-        flash("El nuevo nombre de la sección no puede estar vacío.", "error")
-        return redirect(url_for('index'))
+        return mutation_response("El nuevo nombre de la sección no puede estar vacío.", "error", 400)
     db = get_db()
     try:
         cur = db.cursor()
         cur.execute("UPDATE sections SET name = ? WHERE id = ?", (new_name, section_id))
+        if cur.rowcount == 0:
+            db.rollback()
+            return mutation_response("No se encontró la sección para editar.", "error", 404)
+        version = bump_data_version(db)
         db.commit()
-        if cur.rowcount == 0: flash("No se encontró la sección para editar.", "error")
-        else: flash(f"Sección actualizada a '{new_name}'.", "success")
     except sqlite3.IntegrityError:
-        flash(f"Ya existe una sección con el nombre '{new_name}'.", "warning")
+        db.rollback()
+        return mutation_response(f"Ya existe una sección con el nombre '{new_name}'.", "warning", 409)
     except sqlite3.Error as e:
-        flash(f"Error al actualizar la sección: {e}", "error")
-    return redirect(url_for('index'))
+        db.rollback()
+        return mutation_response(f"Error al actualizar la sección: {e}", "error", 500)
+    return mutation_response(f"Sección actualizada a '{new_name}'.", "success", version=version)
 
 @app.route('/delete_section/<int:section_id>', methods=['POST'])
 def delete_section(section_id):
     db = get_db()
+    images = [path for row in db.execute("SELECT image_url, thumbnail_url FROM link_entries WHERE section_id = ?", (section_id,))
+              for path in row]
     try:
         db.execute("DELETE FROM sections WHERE id = ?", (section_id,))
+        version = bump_data_version(db)
         db.commit()
-        flash("Sección eliminada.", "success")
     except sqlite3.Error as e:
-        flash(f"Error al eliminar la sección: {e}", "error")
-    return redirect(url_for('index'))
+        db.rollback()
+        return mutation_response(f"Error al eliminar la sección: {e}", "error", 500)
+    release_images(db, images)
+    return mutation_response("Sección eliminada.", "success", version=version)
 
 @app.route('/add_link_entry', methods=['POST'])
 def add_link_entry():
@@ -235,8 +1269,7 @@ def add_link_entry():
     section_id = request.form.get('section_id')
 
     if not title_from_form:
-        flash("El título de la entrada es obligatorio.", "error")
-        return redirect(url_for('index'))
+        return mutation_response("El título de la entrada es obligatorio.", "error", 400)
 
     urls_data = []
     i = 0
@@ -249,58 +1282,55 @@ def add_link_entry():
         i += 1
 
     if not section_id or not urls_data:
-        flash("Sección y al menos un enlace con valor son requeridos.", "error")
-        return redirect(url_for('index'))
+        return mutation_response("Sección y al menos un enlace con valor son requeridos.", "error", 400)
 
     image_url_to_save = None
     custom_image_file = request.files.get('custom_image_file')
     if custom_image_file and custom_image_file.filename != '' and allowed_file(custom_image_file.filename):
-        filename_base = secure_filename(custom_image_file.filename)
-        unique_filename = str(uuid.uuid4().hex[:8]) + "_" + filename_base
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
         try:
-            custom_image_file.save(filepath)
-            image_url_to_save = os.path.join('uploads', unique_filename).replace("\\", "/")
+            image_url_to_save = store_upload(custom_image_file, app.static_folder, custom_image_file.filename.rsplit('.', 1)[1])
         except Exception as e:
             print(f"Error al guardar imagen: {e}")
     
-    if not image_url_to_save:
-        first_external_url = next((u['value'] for u in urls_data if u['link_type'] == 'external_url'), None)
-        if first_external_url:
-            metadata = fetch_metadata(first_external_url)
-            image_url_to_save = metadata.get('image_url')
+    # Los metadatos (imagen y descripción) se obtienen en segundo plano
+    first_external_url = next((u['value'] for u in urls_data if u['link_type'] == 'external_url'), None)
+    needs_metadata = bool(first_external_url) and (not image_url_to_save or not description_from_form)
+    metadata_status = 'pending' if needs_metadata else 'none'
 
     db = get_db()
     cur = db.cursor()
     try:
-        cur.execute("INSERT INTO link_entries (title, description, image_url, section_id) VALUES (?, ?, ?, ?)",
-                    (title_from_form, description_from_form, image_url_to_save, section_id))
+        cur.execute(f"""INSERT INTO link_entries (title, description, image_url, section_id, metadata_status, order_index)
+                        VALUES (?, ?, ?, ?, ?, {migrations.NEW_ENTRY_ORDER_KEY})""",
+                    (title_from_form, description_from_form, image_url_to_save, section_id, metadata_status, section_id))
         link_entry_id = cur.lastrowid
         for url_item in urls_data:
             cur.execute("INSERT INTO entry_urls (link_entry_id, label, link_type, value) VALUES (?, ?, ?, ?)",
                         (link_entry_id, url_item['label'], url_item['link_type'], url_item['value']))
+        version = bump_data_version(db)
         db.commit()
-        flash("Nueva entrada añadida.", "success")
     except sqlite3.Error as e:
         db.rollback()
-        flash(f"Error de BD al añadir entrada: {e}", "error")
-    return redirect(url_for('index'))
+        return mutation_response(f"Error de BD al añadir entrada: {e}", "error", 500)
+
+    schedule_thumbnail(link_entry_id, image_url_to_save)
+    if needs_metadata:
+        schedule_metadata_fetch(link_entry_id, first_external_url)
+    return mutation_response("Nueva entrada añadida.", "success", version=version)
 
 @app.route('/edit_link_entry/<int:entry_id>', methods=['POST'])
 def edit_link_entry(entry_id):
     title = request.form.get('link_title', '').strip()
     
     if not title:
-        flash("El título no puede estar vacío.", "error")
-        return redirect(url_for('index'))
+        return mutation_response("El título no puede estar vacío.", "error", 400)
 
     db = get_db()
     cur = db.cursor()
-    cur.execute("SELECT image_url FROM link_entries WHERE id = ?", (entry_id,))
+    cur.execute("SELECT image_url, thumbnail_url FROM link_entries WHERE id = ?", (entry_id,))
     current_entry = cur.fetchone()
     if not current_entry:
-        flash("La entrada que intentas editar no existe.", "error")
-        return redirect(url_for('index'))
+        return mutation_response("La entrada que intentas editar no existe.", "error", 404)
     current_image_url = current_entry['image_url']
 
     description = request.form.get('link_description', '').strip()
@@ -308,29 +1338,17 @@ def edit_link_entry(entry_id):
     delete_image = request.form.get('delete_current_image') == 'on'
 
     image_url_to_save = current_image_url
+    thumbnail_url_to_save = current_entry['thumbnail_url']
     new_image_file = request.files.get('custom_image_file')
 
     if delete_image and not new_image_file:
-        if current_image_url and current_image_url.startswith('uploads/'):
-            try:
-                os.remove(os.path.join(app.static_folder, current_image_url))
-            except OSError as e:
-                print(f"Error al eliminar imagen marcada {current_image_url}: {e}")
-        image_url_to_save = None
+        image_url_to_save = thumbnail_url_to_save = None
 
     if new_image_file and new_image_file.filename != '' and allowed_file(new_image_file.filename):
-        if current_image_url and current_image_url.startswith('uploads/'):
-            try:
-                os.remove(os.path.join(app.static_folder, current_image_url))
-            except OSError as e:
-                print(f"Error al eliminar imagen anterior {current_image_url}: {e}")
-        
-        filename_base = secure_filename(new_image_file.filename)
-        unique_filename = str(uuid.uuid4().hex[:8]) + "_" + filename_base
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
         try:
-            new_image_file.save(filepath)
-            image_url_to_save = os.path.join('uploads', unique_filename).replace("\\", "/")
+            image_url_to_save = store_upload(new_image_file, app.static_folder, new_image_file.filename.rsplit('.', 1)[1])
+            if image_url_to_save != current_image_url:
+                thumbnail_url_to_save = None
         except Exception as e:
             print(f"Error al guardar nueva imagen: {e}")
 
@@ -346,11 +1364,12 @@ def edit_link_entry(entry_id):
         i += 1
 
     try:
-        cur.execute("UPDATE link_entries SET title = ?, description = ?, image_url = ?, section_id = ? WHERE id = ?",
-                    (title, description, image_url_to_save, section_id, entry_id))
+        cur.execute("UPDATE link_entries SET title = ?, description = ?, image_url = ?, thumbnail_url = ?, section_id = ? WHERE id = ?",
+                    (title, description, image_url_to_save, thumbnail_url_to_save, section_id, entry_id))
 
-        cur.execute("SELECT id FROM entry_urls WHERE link_entry_id = ?", (entry_id,))
-        existing_url_ids = {str(row['id']) for row in cur.fetchall()}
+        cur.execute("SELECT id, link_type, value FROM entry_urls WHERE link_entry_id = ?", (entry_id,))
+        existing_urls = {str(row['id']): (row['link_type'], row['value']) for row in cur.fetchall()}
+        existing_url_ids = set(existing_urls)
         submitted_url_ids = {u['id'] for u in submitted_urls if u['id'] != 'new'}
         
         urls_to_delete = existing_url_ids - submitted_url_ids
@@ -364,35 +1383,37 @@ def edit_link_entry(entry_id):
             else:
                 cur.execute("UPDATE entry_urls SET label = ?, link_type = ?, value = ? WHERE id = ?",
                             (url['label'], url['link_type'], url['value'], url['id']))
+                if existing_urls.get(url['id']) != (url['link_type'], url['value']):
+                    cur.execute("DELETE FROM link_status WHERE url_id = ?", (url['id'],))
 
+        version = bump_data_version(db)
         db.commit()
-        flash("Entrada actualizada correctamente.", "success")
     except sqlite3.Error as e:
         db.rollback()
-        flash(f"Error de base de datos al actualizar: {e}", "error")
+        return mutation_response(f"Error de base de datos al actualizar: {e}", "error", 500)
 
-    return redirect(url_for('index'))
+    if image_url_to_save != current_image_url:
+        release_images(db, [current_image_url, current_entry['thumbnail_url']])
+        if not thumbnail_url_to_save:
+            schedule_thumbnail(entry_id, image_url_to_save)
+    return mutation_response("Entrada actualizada correctamente.", "success", version=version)
 
 @app.route('/delete_link_entry/<int:entry_id>', methods=['POST'])
 def delete_link_entry(entry_id):
     db = get_db()
     cur = db.cursor()
-    cur.execute("SELECT image_url FROM link_entries WHERE id = ?", (entry_id,))
+    cur.execute("SELECT image_url, thumbnail_url FROM link_entries WHERE id = ?", (entry_id,))
     row = cur.fetchone()
-    if row and row['image_url'] and row['image_url'].startswith('uploads/'):
-        image_path = os.path.join(app.static_folder, row['image_url'])
-        if os.path.exists(image_path):
-            try:
-                os.remove(image_path)
-            except OSError as e:
-                print(f"Error al eliminar imagen {image_path}: {e}")
     try:
         db.execute("DELETE FROM link_entries WHERE id = ?", (entry_id,))
+        version = bump_data_version(db)
         db.commit()
-        flash("Entrada eliminada.", "success")
     except sqlite3.Error as e:
-        flash(f"Error al eliminar entrada: {e}", "error")
-    return redirect(url_for('index'))
+        db.rollback()
+        return mutation_response(f"Error al eliminar entrada: {e}", "error", 500)
+    if row:
+        release_images(db, [row['image_url'], row['thumbnail_url']])
+    return mutation_response("Entrada eliminada.", "success", version=version)
 
 @app.route('/get_entry_details/<int:entry_id>', methods=['GET'])
 def get_entry_details(entry_id):
@@ -415,13 +1436,322 @@ def get_entry_details(entry_id):
 
     return jsonify(entry_dict)
 
+# --- Búsqueda ---
+SEARCH_MAX_PER_PAGE = 100
+
+def build_search_query(q):
+    """Convierte el texto del usuario en una consulta FTS5 de prefijos (todas las palabras)."""
+    terms = re.findall(r'\w+', q, flags=re.UNICODE)
+    return ' '.join(f'"{term}"*' for term in terms)
+
+def search_entries(db, q, limit, offset):
+    match = build_search_query(q)
+    if not match:
+        return [], 0
+    total = db.execute("SELECT count(*) FROM link_search WHERE link_search MATCH ?", (match,)).fetchone()[0]
+    rows = db.execute("""
+        SELECT e.id, e.title, e.description, e.image_url, e.section_id, s.name AS section_name,
+               bm25(link_search, 10.0, 4.0, 1.0) AS rank
+        FROM link_search
+        JOIN link_entries e ON e.id = link_search.rowid
+        JOIN sections s ON s.id = e.section_id
+        WHERE link_search MATCH ?
+        ORDER BY rank
+        LIMIT ? OFFSET ?""", (match, limit, offset)).fetchall()
+    return [dict(row) for row in rows], total
+
+@app.route('/search', methods=['GET'])
+def search():
+    q = request.args.get('q', '').strip()
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 20, type=int), 1), SEARCH_MAX_PER_PAGE)
+    try:
+        results, total = search_entries(get_db(), q, per_page, (page - 1) * per_page)
+    except sqlite3.OperationalError as e:
+        return jsonify({'error': f'Consulta de búsqueda no válida: {e}'}), 400
+    return jsonify({'query': q, 'page': page, 'per_page': per_page, 'total': total,
+                    'has_more': page * per_page < total, 'results': results})
+
+# --- Salud de los enlaces ---
+_link_check_lock = threading.Lock()
+
+def _background_link_check():
+    if not _link_check_lock.acquire(blocking=False):
+        return
+    db = db_pool.acquire()
+    try:
+        check_links(db)
+    except sqlite3.Error as e:
+        print(f"Error al comprobar los enlaces: {e}")
+    finally:
+        db_pool.release(db)
+        _link_check_lock.release()
+
+@app.route('/api/links/check', methods=['POST'])
+def api_check_links():
+    """Lanza una comprobación completa en segundo plano."""
+    if _link_check_lock.locked():
+        return jsonify({'status': 'running'}), 409
+    threading.Thread(target=_background_link_check, name='linkcheck-run', daemon=True).start()
+    return jsonify({'status': 'queued'}), 202
+
+@app.route('/api/links/health', methods=['GET'])
+def api_links_health():
+    db = get_db()
+    return jsonify({'version': get_data_version(db), 'links': load_link_status(db)})
+
+@app.route('/import', methods=['POST'])
+def import_bookmarks():
+    """Importa un fichero de marcadores (HTML de Netscape, JSON o CSV)."""
+    upload = request.files.get('bookmarks_file')
+    if not upload or upload.filename == '':
+        flash("Selecciona un fichero de marcadores para importar.", "error")
+        return redirect(url_for('index'))
+
+    text = upload.read().decode('utf-8', errors='replace')
+    fmt = request.form.get('format') or detect_format(upload.filename, text)
+    section_override = request.form.get('section_name', '').strip() or None
+
+    start = time.perf_counter()
+    db = get_db()
+    try:
+        records = parse_bookmarks(text, fmt)
+        created = import_records(db, records, section_override, bump=bump_data_version)
+    except ValueError as e:
+        flash(f"Error al importar marcadores: {e}", "error")
+        return redirect(url_for('index'))
+    except ImportInterrupted as e:
+        # Los lotes anteriores al fallo ya están confirmados: también necesitan sus metadatos
+        for entry_id, url in e.created:
+            schedule_metadata_fetch(entry_id, url)
+        flash(f"Error al importar marcadores: {e}. Se importaron {len(e.created)} entradas antes del fallo.", "error")
+        return redirect(url_for('index'))
+    elapsed = time.perf_counter() - start
+
+    for entry_id, url in created:
+        schedule_metadata_fetch(entry_id, url)
+    rate = len(created) / elapsed if elapsed > 0 else len(created)
+    flash(f"{len(created)} entradas importadas ({rate:.0f} entradas/s). Los metadatos se completarán en segundo plano.", "success")
+    return redirect(url_for('index'))
+
+@app.cli.command('import-bookmarks')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['html', 'json', 'csv']), help="Formato del fichero (se detecta si se omite).")
+@click.option('--section', 'section_name', help="Importar todo en esta sección.")
+@click.option('--workers', default=METADATA_WORKERS * 4, show_default=True, help="Peticiones de metadatos simultáneas.")
+@click.option('--no-enrich', is_flag=True, help="No obtener metadatos tras la importación.")
+def import_bookmarks_command(path, fmt, section_name, workers, no_enrich):
+    """Importa marcadores desde PATH y obtiene sus metadatos."""
+    with open(path, encoding='utf-8', errors='replace') as fh:
+        text = fh.read()
+    fmt = fmt or detect_format(path, text)
+
+    start = time.perf_counter()
+    records = parse_bookmarks(text, fmt)
+    db = connect_db()
+    error = None
+    try:
+        created = import_records(db, records, section_name, bump=bump_data_version)
+    except ImportInterrupted as e:
+        created, error = e.created, e
+    finally:
+        db.close()
+    elapsed = time.perf_counter() - start
+    click.echo(f"Importadas {len(created)} entradas en {elapsed:.2f}s ({len(created) / max(elapsed, 1e-9):.0f} entradas/s).")
+
+    if not no_enrich and created:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='import') as executor:
+            list(executor.map(lambda item: update_entry_metadata(*item), created))
+        elapsed = time.perf_counter() - start
+        click.echo(f"Metadatos obtenidos en {elapsed:.2f}s ({len(created) / max(elapsed, 1e-9):.1f} entradas/s).")
+    if error is not None:
+        raise click.ClickException(f"La importación se interrumpió: {error}")
+
+@app.cli.command('backup-db')
+@click.argument('output', type=click.Path(dir_okay=False))
+@click.option('--pages', default=BACKUP_STEP_PAGES, show_default=True, help="Páginas copiadas por paso.")
+@click.option('--sleep', default=BACKUP_STEP_SLEEP, show_default=True, help="Pausa entre pasos (segundos).")
+def backup_db_command(output, pages, sleep):
+    """Copia la base de datos en caliente, sin detener la aplicación."""
+    db = connect_db()
+    try:
+        report = backup_database(db, output, pages, sleep)
+    except sqlite3.Error as e:
+        raise click.ClickException(f"Error al copiar la base de datos: {e}")
+    finally:
+        db.close()
+    click.echo(f"{report['pages']} páginas ({report['bytes'] / 1024 / 1024:.1f} MB) copiadas en "
+               f"{report['seconds']:.2f}s y {report['steps']} pasos a {output}.")
+
+@app.cli.command('export-ndjson')
+@click.argument('output', default='-')
+def export_ndjson_command(output):
+    """Vuelca secciones, entradas y enlaces en NDJSON ('-' para la salida estándar, '.gz' comprime)."""
+    db = connect_db()
+    start = time.perf_counter()
+    try:
+        with open_ndjson(output, 'w') as fh:
+            counts = export_ndjson(db, fh)
+    finally:
+        db.close()
+    click.echo(f"Exportadas {counts['section']} secciones, {counts['entry']} entradas y {counts['url']} enlaces "
+               f"en {time.perf_counter() - start:.2f}s.", err=True)
+
+@app.cli.command('import-ndjson')
+@click.argument('path')
+@click.option('--replace', is_flag=True, help="Sustituir las secciones, entradas y enlaces actuales.")
+def import_ndjson_command(path, replace):
+    """Restaura un volcado NDJSON ('-' para la entrada estándar)."""
+    db = connect_db()
+    start = time.perf_counter()
+    try:
+        with open_ndjson(path, 'r') as fh:
+            report = import_ndjson(db, fh, replace=replace)
+        version = bump_data_version(db)
+        if replace:
+            db.execute("UPDATE app_state SET value = ? WHERE key = 'changes_floor'", (version,))
+        db.commit()
+    except (ValueError, sqlite3.Error, OSError) as e:
+        db.rollback()
+        raise click.ClickException(f"Error al importar {path}: {e}")
+    finally:
+        db.close()
+    elapsed = time.perf_counter() - start
+    click.echo(f"Importadas {report['sections']} secciones, {report['entries']} entradas y {report['urls']} enlaces "
+               f"en {elapsed:.2f}s ({report['entries'] / max(elapsed, 1e-9):.0f} entradas/s, modo {report['mode']}).")
+
+@app.cli.command('migrate-db')
+def migrate_db_command():
+    """Aplica las migraciones de esquema pendientes."""
+    db = connect_db()
+    try:
+        applied = migrations.migrate(db)
+        version = migrations.get_schema_version(db)
+    finally:
+        db.close()
+    click.echo(f"Esquema en la versión {version} ({len(applied)} migraciones aplicadas).")
+
+@app.cli.command('generate-thumbnails')
+@click.option('--workers', default=THUMBNAIL_WORKERS, show_default=True, help="Miniaturas simultáneas.")
+def generate_thumbnails_command(workers):
+    """Genera las miniaturas WebP de las entradas que aún no la tienen."""
+    if not THUMBNAILS_ENABLED:
+        raise click.ClickException("Pillow no está instalado: pip install Pillow")
+    db = connect_db()
+    try:
+        rows = db.execute("""SELECT id, image_url FROM link_entries
+                             WHERE thumbnail_url IS NULL AND (image_url LIKE 'uploads/%' OR image_url LIKE 'http%')""").fetchall()
+    finally:
+        db.close()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='thumbnail') as pool:
+        list(pool.map(lambda row: update_entry_thumbnail(row['id'], row['image_url']), rows))
+    click.echo(f"Procesadas {len(rows)} imágenes en {time.perf_counter() - start:.2f}s.")
+
+@app.cli.command('check-links')
+@click.option('--workers', default=LINKCHECK_WORKERS, show_default=True, help="Comprobaciones simultáneas.")
+@click.option('--timeout', default=LINKCHECK_TIMEOUT, show_default=True, help="Tiempo máximo por petición (segundos).")
+def check_links_command(workers, timeout):
+    """Comprueba todos los enlaces y guarda su estado."""
+    db = connect_db()
+    try:
+        report = check_links(db, workers=workers, timeout=timeout)
+    finally:
+        db.close()
+    click.echo(f"{report['links']} enlaces, {report['targets']} URLs comprobadas en {report['seconds']:.2f}s "
+               f"({report['targets'] / max(report['seconds'], 1e-9):.0f} URLs/s): {report['ok']} correctas, {report['failed']} con error.")
+
+@app.cli.command('gc-images')
+@click.option('--dry-run', is_flag=True, help="Sólo informar, sin borrar ni mover nada.")
+@click.option('--quarantine', type=click.Path(file_okay=False), default=GC_QUARANTINE, help="Mover los huérfanos a esta carpeta en vez de borrarlos.")
+@click.option('--min-age', default=GC_MIN_AGE, show_default=True, help="Ignorar ficheros más recientes (segundos).")
+@click.option('--batch-size', default=500, show_default=True, help="Ficheros comprobados por consulta.")
+def gc_images_command(dry_run, quarantine, min_age, batch_size):
+    """Elimina las imágenes de uploads/ y thumbs/ que ninguna entrada usa."""
+    db = connect_db()
+    try:
+        start = time.perf_counter()
+        report = collect_orphans(db, app.static_folder, quarantine_dir=quarantine, min_age=min_age,
+                                 batch_size=batch_size, dry_run=dry_run)
+    finally:
+        db.close()
+    action = "se eliminarían" if dry_run else ("movidos a cuarentena" if quarantine else "eliminados")
+    click.echo(f"{report['scanned']} ficheros revisados en {time.perf_counter() - start:.2f}s: "
+               f"{report['orphans']} huérfanos {action} ({report['bytes'] / 1024 / 1024:.2f} MB), {report['errors']} errores.")
+
+@app.cli.command('build-assets')
+def build_assets_command():
+    """Genera los recursos estáticos con huella, precomprimidos y las imágenes WebP."""
+    manifest = assets.build_assets(app.static_folder)
+    extras = ' + gzip' + (' + brotli' if assets.HAS_BROTLI else '') + ('' if assets.HAS_PILLOW else ' (sin Pillow: imágenes sin WebP)')
+    click.echo(f"{len(manifest)} recursos en static/{assets.BUILD_DIR}/{extras}.")
+
+def audit_query_plans():
+    """
+    Planifica las consultas de la aplicación contra una BD vacía creada con
+    schema.sql. Las de la ordenación se comprueban ya construidas para cada
+    configuración de ORDERING. Devuelve (consultas, fallos, plantillas sin planificar).
+    """
+    db = sqlite3.connect(':memory:')
+    try:
+        with app.open_resource('schema.sql', mode='r') as f:
+            db.executescript(f.read())
+        sources = [os.path.join(app.root_path, name) for name in ('app.py', 'importer.py', 'metadata.py', 'images.py', 'linkcheck.py', 'backup.py')]
+        ordering = [sql for cfg in ORDERING.values() for sql in cfg['sql'].values()]
+        queries = migrations.collect_queries(sources, expansions={'_ordering_queries': ordering})
+        return (queries, *migrations.check_query_plans(db, queries))
+    finally:
+        db.close()
+
+@app.cli.command('check-query-plans')
+def check_query_plans_command():
+    """Falla si alguna consulta hace un recorrido completo con ordenación temporal."""
+    queries, failures, skipped = audit_query_plans()
+    for location, sql, plan in failures:
+        click.echo(f"✘ {location}\n  {' '.join(sql.split())}\n  " + "\n  ".join(plan))
+    for location, sql, error in skipped:
+        click.echo(f"- {location} (f-string sin planificar: {error})\n  {' '.join(sql.split())}")
+    click.echo(f"{len(queries)} consultas revisadas, {len(failures)} con recorrido completo + B-tree temporal, "
+               f"{len(skipped)} f-strings sin planificar.")
+    if failures:
+        raise SystemExit(1)
+
 def check_and_create_db():
-    """Comprueba si la base de datos existe, si no, la inicializa."""
+    """Comprueba si la base de datos existe; si no, la inicializa y si existe, la migra."""
     if not os.path.exists(DATABASE):
         print(f"Base de datos no encontrada en '{DATABASE}'. Creando una nueva...")
         init_db()
         print("Base de datos creada y lista.")
+        return
+    db = connect_db()
+    try:
+        migrations.migrate(db)
+    finally:
+        db.close()
 
-if __name__ == '__main__':
+def load_static_manifest():
+    """Vuelve a leer el manifiesto de recursos y recalcula la huella de las plantillas, que depende de él."""
+    global STATIC_MANIFEST, TEMPLATE_FINGERPRINT
+    STATIC_MANIFEST = assets.load_manifest(app.static_folder)
+    TEMPLATE_FINGERPRINT = _template_fingerprint()
+
+def create_app(build_static=False):
+    """
+    Prepara la aplicación para servirla y la devuelve: compila los recursos
+    estáticos si se pide, crea o migra la base de datos y compila las
+    plantillas. Con preload_app de gunicorn (gunicorn.conf.py) se ejecuta una
+    sola vez en el proceso maestro y los workers lo heredan ya hecho.
+    """
+    if build_static:
+        assets.build_assets(app.static_folder)
+        load_static_manifest()
     check_and_create_db()
+    db_pool.close_all()  # un worker no debe usar (ni cerrar) conexiones abiertas por el maestro
+    for name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(name)
+    return app
+
+if __name__ == '__main__':
+    create_app()
     app.run(debug=True, host='0.0.0.0')
\ No newline at end of file
@@ -0,0 +1,150 @@
+"""
+Recursos estáticos con huella de contenido y precomprimidos.
+
+`build_assets()` copia los CSS/JS/imágenes de static/ a static/build/ con el
+hash del contenido en el nombre (css/style.3f2a9c1d.css), guarda al lado las
+versiones .gz y .br (esta sólo si está instalado Brotli) de los ficheros de
+texto y recodifica las imágenes de IMAGE_VARIANTS a WebP del tamaño en que se
+muestran. El manifiesto static/build/manifest.json relaciona cada ruta
+original con la generada; la aplicación lo usa para que
+url_for('static', filename='css/style.css') apunte a la versión con huella,
+que se sirve con caché inmutable.
+"""
+
+import gzip
+import hashlib
+import io
+import json
+import mimetypes
+import os
+from importlib.util import find_spec
+
+# Brotli y Pillow sólo hacen falta al compilar: se importan en build_assets()
+HAS_BROTLI = find_spec('brotli') is not None
+HAS_PILLOW = find_spec('PIL') is not None
+
+BUILD_DIR = 'build'
+MANIFEST_NAME = 'manifest.json'
+SOURCE_DIRS = ('css', 'js', 'images')
+COMPRESSIBLE = {'.css', '.js', '.svg', '.json', '.txt', '.html', '.map'}
+MIN_COMPRESS_SIZE = 512  # por debajo la cabecera de compresión no compensa
+
+# Imágenes que se sirven en WebP: (alto máximo en px, calidad). El logo se
+# muestra a 32 px de alto y el icono como favicon y marcador de tarjeta; el
+# doble cubre pantallas HiDPI.
+IMAGE_VARIANTS = {
+    'images/linkmanager-logo.png': (64, 90),
+    'images/icon.png': (128, 90),
+}
+
+mimetypes.add_type('image/webp', '.webp')  # Python < 3.11 no lo conoce
+
+# Codificaciones que se negocian con Accept-Encoding, por orden de preferencia
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def _digest(data):
+    return hashlib.sha256(data).hexdigest()[:10]
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def _to_webp(data, max_height, quality):
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as img:
+        img = img.convert('RGBA' if img.mode in ('RGBA', 'LA', 'P') else 'RGB')
+        if img.height > max_height:
+            img = img.resize((round(img.width * max_height / img.height), max_height), Image.LANCZOS)
+        out = io.BytesIO()
+        img.save(out, 'WEBP', quality=quality, method=6)
+    return out.getvalue()
+
+
+def iter_sources(static_folder):
+    for directory in SOURCE_DIRS:
+        root = os.path.join(static_folder, directory)
+        for dirpath, _, filenames in os.walk(root):
+            for name in sorted(filenames):
+                path = os.path.join(dirpath, name)
+                yield os.path.relpath(path, static_folder).replace(os.sep, '/'), path
+
+
+def build_assets(static_folder):
+    """
+    Genera static/build/ y su manifiesto. Borra lo generado por compilaciones
+    anteriores que ya no se usa. Devuelve el manifiesto.
+    """
+    brotli = None
+    if HAS_BROTLI:
+        import brotli
+    build_root = os.path.join(static_folder, BUILD_DIR)
+    manifest = {}
+    generated = set()
+    for relative, path in iter_sources(static_folder):
+        with open(path, 'rb') as f:
+            data = f.read()
+        stat = os.stat(path)
+        stem, ext = os.path.splitext(relative)
+        if relative in IMAGE_VARIANTS and HAS_PILLOW:
+            data, ext = _to_webp(data, *IMAGE_VARIANTS[relative]), '.webp'
+        target = f"{BUILD_DIR}/{stem}.{_digest(data)}{ext}"
+        target_path = os.path.join(static_folder, target)
+        outputs = [(target_path, data)]
+        if ext in COMPRESSIBLE and len(data) >= MIN_COMPRESS_SIZE:
+            outputs.append((target_path + '.gz', gzip.compress(data, compresslevel=9, mtime=0)))
+            if brotli is not None:
+                outputs.append((target_path + '.br', brotli.compress(data, mode=brotli.MODE_TEXT)))
+        for output, content in outputs:
+            generated.add(os.path.normpath(output))
+            if not os.path.exists(output):  # mismo nombre = mismo contenido
+                _write(output, content)
+        manifest[relative] = {'path': target, 'mtime': stat.st_mtime, 'size': stat.st_size}
+
+    manifest_path = os.path.join(build_root, MANIFEST_NAME)
+    _write(manifest_path, json.dumps(manifest, indent=2, sort_keys=True).encode())
+    generated.add(os.path.normpath(manifest_path))
+    for dirpath, _, filenames in os.walk(build_root):
+        for name in filenames:
+            path = os.path.normpath(os.path.join(dirpath, name))
+            if path not in generated:
+                os.remove(path)
+    return manifest
+
+
+def load_manifest(static_folder):
+    """
+    Lee el manifiesto y devuelve {ruta original: ruta con huella}. Se descartan
+    las entradas cuyo original ha cambiado desde la compilación (se sirven sin
+    huella hasta que se vuelva a compilar).
+    """
+    path = os.path.join(static_folder, BUILD_DIR, MANIFEST_NAME)
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        print(f"Error al leer el manifiesto de recursos estáticos {path}: {e}")
+        return {}
+    resolved = {}
+    for relative, entry in manifest.items():
+        try:
+            stat = os.stat(os.path.join(static_folder, relative))
+        except OSError:
+            continue
+        if stat.st_mtime == entry['mtime'] and stat.st_size == entry['size']:
+            resolved[relative] = entry['path']
+    return resolved
+
+
+def pick_encoding(static_folder, filename, accepted):
+    """Devuelve (fichero a enviar, Content-Encoding o None) según las codificaciones `accepted` del cliente."""
+    for encoding, suffix in ENCODINGS:
+        if encoding in accepted and os.path.isfile(os.path.join(static_folder, filename + suffix)):
+            return filename + suffix, encoding
+    return filename, None
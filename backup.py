@@ -0,0 +1,304 @@
+"""
+Copias de seguridad de la base de datos.
+
+• backup_database(): copia en caliente con la API de backup incremental de
+  SQLite. Copia `pages` páginas por paso y cede el turno entre pasos, de modo
+  que los workers nunca esperan más de lo que dura un paso (salvo el último
+  recurso que describe backup_database). El resultado es un único fichero
+  (sin -wal) que se escribe aparte y se renombra al terminar.
+
+• export_ndjson() / import_ndjson(): volcado lógico en NDJSON, un objeto JSON
+  por línea: una cabecera 'meta', los 'setting', las 'section' y las 'entry'
+  (cada una con sus enlaces en 'urls'). Ambos recorren los datos en streaming,
+  con memoria constante. Si la base de datos está vacía (o con --replace) la
+  importación usa la vía rápida: una sola transacción, sin índices ni
+  triggers durante la carga y reconstrucción del índice de búsqueda al final.
+
+Las imágenes de static/uploads y static/thumbs no forman parte de la copia:
+se guardan aparte (son ficheros con nombre por contenido).
+"""
+
+import contextlib
+import gzip
+import json
+import os
+import sqlite3
+import sys
+import time
+
+NDJSON_FORMAT = 'linkmanager-ndjson'
+NDJSON_VERSION = 1
+
+BACKUP_STEP_PAGES = int(os.environ.get('BACKUP_STEP_PAGES', 1024))
+BACKUP_STEP_SLEEP = float(os.environ.get('BACKUP_STEP_SLEEP', 0.01))
+BACKUP_MAX_RESTARTS = 3  # después se copia el resto de una vez
+IMPORT_BATCH_SIZE = 1000
+
+# Tablas que la vía rápida carga sin índices secundarios ni triggers
+BULK_TABLES = ('sections', 'link_entries', 'entry_urls')
+
+
+# --------------------------------------------------------------------------- #
+# Copia en caliente
+# --------------------------------------------------------------------------- #
+class _BackupRestarted(Exception):
+    pass
+
+
+def backup_database(source, dest_path, pages=BACKUP_STEP_PAGES, sleep=BACKUP_STEP_SLEEP):
+    """
+    Copia la base de datos abierta en `source` a `dest_path`.
+
+    Si otra conexión escribe entre dos pasos, SQLite vuelve a empezar la copia.
+    Con escrituras frecuentes podría no terminar nunca, así que tras
+    BACKUP_MAX_RESTARTS reinicios se copia todo en un único paso: en WAL ese
+    paso lee de una instantánea y tampoco detiene a los escritores (con
+    journal rollback sí los retiene mientras dura). Devuelve {'pages',
+    'steps', 'restarts', 'bytes', 'seconds'}.
+    """
+    tmp_path = f"{dest_path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    report = {'pages': 0, 'steps': 0, 'restarts': 0}
+    last_remaining = [None]
+
+    def progress(status, remaining, total):
+        report['pages'], report['steps'] = total, report['steps'] + 1
+        if last_remaining[0] is not None and remaining >= last_remaining[0]:
+            report['restarts'] += 1
+            if report['restarts'] >= BACKUP_MAX_RESTARTS:
+                raise _BackupRestarted
+        last_remaining[0] = remaining
+        if remaining and sleep:
+            time.sleep(sleep)  # sin bloqueo sobre el origen entre pasos
+
+    start = time.perf_counter()
+    target = sqlite3.connect(tmp_path)
+    try:
+        try:
+            source.backup(target, pages=pages, progress=progress)
+        except _BackupRestarted:
+            source.backup(target)
+            report['steps'] += 1
+        target.execute("PRAGMA journal_mode = DELETE")  # fichero autocontenido, aunque el origen use WAL
+        check = target.execute("PRAGMA quick_check").fetchone()[0]
+    finally:
+        target.close()
+    if check != 'ok':
+        os.remove(tmp_path)
+        raise sqlite3.DatabaseError(f"La copia no supera quick_check: {check}")
+    os.replace(tmp_path, dest_path)
+    report['bytes'] = os.path.getsize(dest_path)
+    report['seconds'] = time.perf_counter() - start
+    return report
+
+
+def prune_backups(directory, prefix, keep):
+    """Borra las copias más antiguas de `directory` que empiezan por `prefix` y deja las `keep` últimas."""
+    names = sorted(name for name in os.listdir(directory) if name.startswith(prefix) and name.endswith('.db'))
+    for name in names[:-keep] if keep > 0 else []:
+        try:
+            os.remove(os.path.join(directory, name))
+        except OSError as e:
+            print(f"Error al borrar la copia antigua {name}: {e}")
+
+
+# --------------------------------------------------------------------------- #
+# NDJSON
+# --------------------------------------------------------------------------- #
+def open_ndjson(path, mode):
+    """Abre `path` en modo texto ('r' o 'w'); '-' es la entrada/salida estándar y '.gz' se comprime."""
+    if path == '-':
+        return contextlib.nullcontext(sys.stdin if mode == 'r' else sys.stdout)
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8', newline='\n')
+
+
+def iter_records(db):
+    """Genera los objetos del volcado: meta, ajustes, secciones y entradas con sus enlaces."""
+    cur = db.cursor()
+    cur.row_factory = sqlite3.Row
+    yield {'type': 'meta', 'format': NDJSON_FORMAT, 'version': NDJSON_VERSION,
+           'schema_version': db.execute("PRAGMA user_version").fetchone()[0],
+           'exported_at': time.strftime('%Y-%m-%dT%H:%M:%S%z')}
+    for row in cur.execute("SELECT setting_key, setting_value FROM settings ORDER BY setting_key"):
+        yield {'type': 'setting', 'key': row['setting_key'], 'value': row['setting_value']}
+    for row in cur.execute("SELECT id, name, order_index, created_at FROM sections ORDER BY id"):
+        yield dict(row, type='section')
+
+    entry = None
+    for row in cur.execute("""SELECT e.id, e.section_id, e.title, e.description, e.image_url, e.thumbnail_url,
+                                     e.order_index, e.created_at, e.metadata_status,
+                                     u.label, u.link_type, u.value
+                              FROM link_entries e LEFT JOIN entry_urls u ON u.link_entry_id = e.id
+                              ORDER BY e.id, u.id"""):
+        if entry is None or entry['id'] != row['id']:
+            if entry is not None:
+                yield entry
+            entry = {'type': 'entry', 'id': row['id'], 'section_id': row['section_id'], 'title': row['title'],
+                     'description': row['description'], 'image_url': row['image_url'],
+                     'thumbnail_url': row['thumbnail_url'], 'order_index': row['order_index'],
+                     'created_at': row['created_at'], 'metadata_status': row['metadata_status'], 'urls': []}
+        if row['link_type'] is not None:
+            entry['urls'].append({'label': row['label'], 'link_type': row['link_type'], 'value': row['value']})
+    if entry is not None:
+        yield entry
+
+
+def export_ndjson(db, fh):
+    """
+    Escribe el volcado en `fh`. Se lee dentro de una transacción de lectura
+    (en WAL no bloquea a los escritores) para que sea una foto consistente.
+    Devuelve el número de objetos de cada tipo.
+    """
+    counts = {'setting': 0, 'section': 0, 'entry': 0, 'url': 0}
+    encode = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+    db.execute("BEGIN")
+    try:
+        for record in iter_records(db):
+            fh.write(encode(record) + '\n')
+            if record['type'] in counts:
+                counts[record['type']] += 1
+            counts['url'] += len(record.get('urls', ()))
+    finally:
+        db.rollback()
+    return counts
+
+
+def _parse(lines):
+    """Decodifica y valida las líneas. Genera (número de línea, objeto)."""
+    required = {'meta': ('format', 'version'), 'setting': ('key', 'value'),
+                'section': ('id', 'name'), 'entry': ('id', 'section_id', 'title')}
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            raise ValueError(f"Línea {number}: JSON no válido ({e})") from None
+        kind = record.get('type') if isinstance(record, dict) else None
+        if kind not in required:
+            raise ValueError(f"Línea {number}: tipo de objeto desconocido {kind!r}")
+        missing = [key for key in required[kind] if record.get(key) is None]
+        if missing:
+            raise ValueError(f"Línea {number}: faltan los campos {', '.join(missing)}")
+        urls = record.get('urls')
+        if urls is not None and not (isinstance(urls, list) and all(isinstance(url, dict) for url in urls)):
+            raise ValueError(f"Línea {number}: 'urls' debe ser una lista de objetos")
+        yield number, record
+
+
+def _defer_schema(db):
+    """Quita índices secundarios y triggers de BULK_TABLES. Devuelve su SQL para recrearlos."""
+    placeholders = ','.join('?' * len(BULK_TABLES))
+    objects = db.execute(f"""SELECT type, name, sql FROM sqlite_master
+                             WHERE type IN ('index', 'trigger') AND tbl_name IN ({placeholders}) AND sql IS NOT NULL""",
+                         BULK_TABLES).fetchall()
+    for kind, name, _ in objects:
+        db.execute(f'DROP {kind.upper()} "{name}"')
+    # Primero los índices: los triggers y la reconstrucción de la búsqueda los usan
+    return [sql for kind, _, sql in objects if kind == 'index'] + [sql for kind, _, sql in objects if kind == 'trigger']
+
+
+def _entry_row(record, section_id):
+    return (record['id'], section_id, record['title'], record.get('description'), record.get('image_url'),
+            record.get('thumbnail_url'), record.get('order_index') or 0, record.get('metadata_status') or 'none',
+            record.get('created_at'))
+
+
+def _url_rows(record, entry_id):
+    return [(entry_id, url.get('label') or '', url['link_type'], url['value'])
+            for url in record.get('urls') or () if url.get('link_type') and url.get('value')]
+
+
+def import_ndjson(db, lines, replace=False, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Importa un volcado NDJSON en una sola transacción (que confirma quien
+    llama, después de bump_data_version). Con `replace`, o si no hay
+    secciones, se conservan los ids del volcado y se carga por la vía rápida;
+    si no, las secciones se fusionan por nombre y las entradas se añaden con
+    ids nuevos. Devuelve {'mode', 'settings', 'sections', 'entries', 'urls'}.
+    """
+    records = _parse(lines)
+    first = next(records, None)
+    if first is None or first[1]['type'] != 'meta' or first[1]['format'] != NDJSON_FORMAT:
+        raise ValueError("No es un volcado de LinkManager: falta la cabecera 'meta'")
+    if first[1]['version'] > NDJSON_VERSION:
+        raise ValueError(f"Versión de volcado {first[1]['version']} no soportada (máximo {NDJSON_VERSION})")
+
+    db.execute("BEGIN IMMEDIATE")
+    bulk = replace or db.execute("SELECT 1 FROM sections LIMIT 1").fetchone() is None
+    report = {'mode': 'bulk' if bulk else 'merge', 'settings': 0, 'sections': 0, 'entries': 0, 'urls': 0}
+    deferred = _defer_schema(db) if bulk else []
+    if replace:
+        # Sin triggers no quedan lápidas: quien llama sube changes_floor para que las pestañas recarguen
+        for table in ('entry_urls', 'link_entries', 'sections', 'link_search', 'tombstones'):
+            db.execute(f"DELETE FROM {table}")
+
+    section_ids = {}  # id del volcado → id en la BD (sólo al fusionar)
+    entries = []
+
+    def flush():
+        if bulk:
+            db.executemany("""INSERT INTO link_entries (id, section_id, title, description, image_url, thumbnail_url,
+                                                        order_index, metadata_status, created_at)
+                              VALUES (?, ?, ?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))""",
+                           [_entry_row(record, record['section_id']) for record in entries])
+            urls = [row for record in entries for row in _url_rows(record, record['id'])]
+        else:
+            urls = []
+            for record in entries:
+                cur = db.execute("""INSERT INTO link_entries (section_id, title, description, image_url, thumbnail_url,
+                                                              order_index, metadata_status, created_at)
+                                    VALUES (?, ?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))""",
+                                 _entry_row(record, section_ids[record['section_id']])[1:])
+                urls.extend(_url_rows(record, cur.lastrowid))
+        db.executemany("INSERT INTO entry_urls (link_entry_id, label, link_type, value) VALUES (?, ?, ?, ?)", urls)
+        report['entries'] += len(entries)
+        report['urls'] += len(urls)
+        entries.clear()
+
+    for number, record in records:
+        kind = record['type']
+        try:
+            if kind == 'setting':
+                db.execute(f"INSERT OR {'REPLACE' if bulk else 'IGNORE'} INTO settings (setting_key, setting_value) VALUES (?, ?)",
+                           (record['key'], record['value']))
+                report['settings'] += 1
+            elif kind == 'section':
+                if bulk:
+                    db.execute("""INSERT INTO sections (id, name, order_index, created_at)
+                                  VALUES (?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))""",
+                               (record['id'], record['name'], record.get('order_index') or 0, record.get('created_at')))
+                else:
+                    db.execute("INSERT OR IGNORE INTO sections (name, order_index) VALUES (?, ?)",
+                               (record['name'], record.get('order_index') or 0))
+                    section_ids[record['id']] = db.execute("SELECT id FROM sections WHERE name = ?",
+                                                           (record['name'],)).fetchone()[0]
+                report['sections'] += 1
+            elif kind == 'entry':
+                if not bulk and record['section_id'] not in section_ids:
+                    raise ValueError(f"la sección {record['section_id']} no aparece antes en el volcado")
+                entries.append(record)
+                if len(entries) >= batch_size:
+                    flush()
+            else:
+                raise ValueError("cabecera 'meta' repetida")
+        except (sqlite3.IntegrityError, ValueError) as e:
+            raise ValueError(f"Línea {number}: {e}") from None
+    try:
+        flush()
+    except sqlite3.IntegrityError as e:
+        raise ValueError(f"Entradas del final del volcado: {e}") from None
+
+    if bulk:
+        for sql in deferred:
+            db.execute(sql)
+        # Mismo contenido que dejan los triggers de búsqueda, en una sola pasada
+        db.execute("""INSERT INTO link_search (rowid, title, description, urls)
+                      SELECT e.id, e.title, COALESCE(e.description, ''),
+                             COALESCE((SELECT group_concat(u.label || ' ' || u.value, ' ')
+                                       FROM entry_urls u WHERE u.link_entry_id = e.id), '')
+                      FROM link_entries e""")
+    return report
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+Suite de rendimiento de las rutas de la aplicación con informe JSON.
+
+Crea una base de datos sintética con init_db() (por defecto 50 secciones ×
+200 entradas × 3 enlaces) cuyos enlaces apuntan a un servidor HTTP local, de
+modo que la obtención de metadatos en segundo plano nunca sale a Internet.
+Después mide cada escenario (latencia p50/p95/p99 y peticiones por segundo)
+de dos formas:
+
+    client    con el cliente de pruebas de Flask, en este proceso y en serie
+    gunicorn  contra gunicorn con varios workers y clientes concurrentes
+
+El informe se guarda con --output y se puede comparar con otro anterior
+(--baseline); si algún escenario empeora más de --tolerance el programa
+termina con código 1, así que sirve también en CI:
+
+    python benchmarks/bench_app.py --output benchmarks/baseline.json
+    python benchmarks/bench_app.py --baseline benchmarks/baseline.json --output actual.json
+    python benchmarks/bench_app.py --sections 50 --entries 10000 --urls 3 --modes client
+
+Los tiempos sólo son comparables entre informes de la misma máquina y con
+los mismos tamaños (quedan en "meta").
+"""
+
+import argparse
+import http.server
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from load_test import percentile, start_gunicorn  # noqa: E402
+
+MODES = ("client", "gunicorn")
+WORDS = ("jellyfin sonarr radarr grafana prometheus portainer nextcloud immich paperless homeassistant "
+         "router firewall backup media servidor vídeo música fotos documentos monitorización").split()
+
+PAGE = (b"<html><head><title>Stub</title><meta property=\"og:title\" content=\"Stub\">"
+        b"<meta property=\"og:description\" content=\"Descripci\xc3\xb3n de prueba\"></head><body></body></html>")
+
+
+def start_stub():
+    """Servidor local al que apuntan los enlaces (metadatos y comprobación de enlaces)."""
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(PAGE)))
+            self.end_headers()
+            if self.command == 'GET':
+                self.wfile.write(PAGE)
+
+        do_HEAD = do_GET
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}"
+
+
+def seed(appmod, stub, sections, entries, urls, rng, batch=5000):
+    """Llena la base de datos recién creada con init_db(). Devuelve {section_id: [entry_id, ...]}."""
+    appmod.init_db()
+    db = appmod.connect_db()
+    db.executemany("INSERT INTO sections (name, order_index) VALUES (?, ?)",
+                   [(f"Sección {i}", i * appmod.ORDER_GAP) for i in range(sections)])
+    section_ids = [row[0] for row in db.execute("SELECT id FROM sections ORDER BY id")]
+    for section_id in section_ids:
+        for start in range(0, entries, batch):
+            n = min(batch, entries - start)
+            db.executemany(
+                "INSERT INTO link_entries (section_id, title, description, order_index) VALUES (?, ?, ?, ?)",
+                [(section_id, f"{rng.choice(WORDS)} {section_id}-{i}", f"{' '.join(rng.sample(WORDS, 5))}",
+                  i * appmod.ORDER_GAP) for i in range(start, start + n)])
+            last_id = db.execute("SELECT last_insert_rowid()").fetchone()[0]
+            db.executemany(
+                "INSERT INTO entry_urls (link_entry_id, label, link_type, value) VALUES (?, ?, 'external_url', ?)",
+                [(entry_id, f"enlace {k}", f"{stub}/page/{entry_id}/{k}")
+                 for entry_id in range(last_id - n + 1, last_id + 1) for k in range(urls)])
+    appmod.bump_data_version(db)
+    db.commit()
+    ids = {}
+    for row in db.execute("SELECT section_id, id FROM link_entries ORDER BY section_id, order_index"):
+        ids.setdefault(row[0], []).append(row[1])
+    db.close()
+    return ids
+
+
+# Escenario: nombre → función (ctx, rng) que devuelve (método, ruta, argumentos de la
+# petición); ctx lleva 'ids' ({sección: [entradas]}) y 'stub' (URL del servidor local).
+# Los argumentos (json, data, headers) valen igual para el cliente de Flask y para requests.
+JSON = {'Accept': 'application/json'}
+
+
+def _section(ctx, rng):
+    return rng.choice(list(ctx['ids']))
+
+
+def _move(ctx, rng):
+    item_id, after_id = rng.sample(ctx['ids'][_section(ctx, rng)], 2)
+    return 'POST', '/update_order', {'json': {'type': 'entries', 'item_id': item_id, 'after_id': after_id}}
+
+
+def _add_entry(ctx, rng):
+    # Enlace externo sin descripción: programa la obtención de metadatos contra el servidor local
+    data = {'section_id': _section(ctx, rng), 'link_title': f"Nueva {rng.choice(WORDS)}",
+            'urls[0][label]': 'web', 'urls[0][type]': 'external_url',
+            'urls[0][value]': f"{ctx['stub']}/new/{rng.randrange(10 ** 9)}"}
+    return 'POST', '/add_link_entry', {'data': data, 'headers': JSON}
+
+
+def _rename_section(ctx, rng):
+    name = f"Sección {rng.randrange(10 ** 9)}"  # nombre nuevo y único: sin conflictos de UNIQUE
+    return 'POST', f"/edit_section/{_section(ctx, rng)}", {'data': {'edit_section_name': name}, 'headers': JSON}
+
+
+def _batch_move(ctx, rng):
+    # Reorganización masiva: 50 tarjetas a otra sección en una sola petición (/api/batch)
+    source, target = rng.sample(list(ctx['ids']), 2)
+    ops = [{'op': 'move', 'type': 'entry', 'id': entry_id, 'section_id': target} for entry_id in ctx['ids'][source][:50]]
+    return 'POST', '/api/batch', {'json': {'operations': ops}}
+
+
+SCENARIOS = {
+    'GET /': lambda ctx, rng: ('GET', '/', {}),
+    'GET / (reconstrucción)': lambda ctx, rng: ('GET', '/', {}),
+    'GET /?lazy=1': lambda ctx, rng: ('GET', '/?lazy=1', {}),
+    'GET /api/sections': lambda ctx, rng: ('GET', '/api/sections', {}),
+    'GET /api/sections/<id>/entries': lambda ctx, rng: (
+        'GET', f"/api/sections/{_section(ctx, rng)}/entries?format=html", {}),
+    'GET /search': lambda ctx, rng: ('GET', f"/search?q={rng.choice(WORDS)[:4]}", {}),
+    'POST /update_order': _move,
+    'POST /add_link_entry': _add_entry,
+    'POST /edit_section': _rename_section,
+    'POST /api/batch (mover 50)': _batch_move,
+}
+# Escenarios que necesitan preparar la BD antes de cada petición (sin medir)
+CLIENT_ONLY = {'GET / (reconstrucción)'}
+
+
+def summarize(latencies, errors, elapsed):
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': len(latencies) / elapsed if elapsed else 0.0,
+        'mean_ms': statistics.fmean(latencies) if latencies else None,
+        'p50_ms': statistics.median(latencies) if latencies else None,
+        'p95_ms': percentile(latencies, 95) if latencies else None,
+        'p99_ms': percentile(latencies, 99) if latencies else None,
+    }
+
+
+def run_client(appmod, ctx, names, requests_per_scenario, warmup, seed_value):
+    client = appmod.app.test_client()
+    invalidator = appmod.connect_db()
+    results = {}
+    for name in names:
+        rng = random.Random(seed_value)
+        latencies, errors = [], 0
+        for i in range(warmup + requests_per_scenario):
+            method, path, kwargs = SCENARIOS[name](ctx, rng)
+            if name in CLIENT_ONLY:
+                appmod.bump_data_version(invalidator)  # fuerza a reconstruir modelo y HTML
+                invalidator.commit()
+            t0 = time.perf_counter()
+            response = client.open(path, method=method, **kwargs)
+            elapsed = (time.perf_counter() - t0) * 1000
+            if i >= warmup:
+                latencies.append(elapsed)
+                errors += response.status_code >= 400
+        results[name] = summarize(latencies, errors, sum(latencies) / 1000)
+        print_row('client', name, results[name])
+    invalidator.close()
+    return results
+
+
+def run_gunicorn(db_path, ctx, names, workers, concurrency, duration, seed_value):
+    import requests
+
+    proc, url = start_gunicorn(db_path, workers, {})
+    results = {}
+    try:
+        for name in names:
+            latencies, errors = [], [0]
+            lock = threading.Lock()
+            stop = time.monotonic() + duration
+
+            def worker(n):
+                rng = random.Random(seed_value + n)
+                session = requests.Session()
+                while time.monotonic() < stop:
+                    method, path, kwargs = SCENARIOS[name](ctx, rng)
+                    t0 = time.perf_counter()
+                    response = session.request(method, url + path, **kwargs)
+                    elapsed = (time.perf_counter() - t0) * 1000
+                    with lock:
+                        latencies.append(elapsed)
+                        errors[0] += response.status_code >= 400
+
+            start = time.perf_counter()
+            threads = [threading.Thread(target=worker, args=(n,)) for n in range(concurrency)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            results[name] = summarize(latencies, errors[0], time.perf_counter() - start)
+            print_row('gunicorn', name, results[name])
+    finally:
+        proc.terminate()
+        proc.wait()
+    return results
+
+
+def print_row(mode, name, stats):
+    if not stats['requests']:
+        print(f"  {mode:8} {name:32} sin peticiones")
+        return
+    print(f"  {mode:8} {name:32} n={stats['requests']:6} {stats['rps']:8.1f} req/s  "
+          f"p50={stats['p50_ms']:8.2f} ms  p95={stats['p95_ms']:8.2f} ms  p99={stats['p99_ms']:8.2f} ms"
+          f"{'  errores=' + str(stats['errors']) if stats['errors'] else ''}")
+
+
+def compare(report, baseline, tolerance, min_delta_ms):
+    """Imprime la comparación con el informe de referencia y devuelve las regresiones."""
+    if baseline.get('meta', {}).get('sizes') != report['meta']['sizes']:
+        print("Aviso: el informe de referencia usa otros tamaños; la comparación es orientativa.")
+    regressions = []
+    print(f"\n{'modo':8} {'escenario':32} {'p50 ref':>9} {'p50':>9} {'p95 ref':>9} {'p95':>9}")
+    for mode, scenarios in report['results'].items():
+        for name, stats in scenarios.items():
+            old = baseline.get('results', {}).get(mode, {}).get(name)
+            if not old or stats['p50_ms'] is None or old.get('p50_ms') is None:
+                continue
+            flags = []
+            for metric in ('p50_ms', 'p95_ms'):
+                if (stats[metric] > old[metric] * (1 + tolerance)
+                        and stats[metric] - old[metric] > min_delta_ms):
+                    flags.append(metric)
+                    regressions.append((mode, name, metric, old[metric], stats[metric]))
+            print(f"{mode:8} {name:32} {old['p50_ms']:9.2f} {stats['p50_ms']:9.2f} "
+                  f"{old['p95_ms']:9.2f} {stats['p95_ms']:9.2f}{'  REGRESIÓN' if flags else ''}")
+    return regressions
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sections", type=int, default=50)
+    parser.add_argument("--entries", type=int, default=200, help="entradas por sección")
+    parser.add_argument("--urls", type=int, default=3, help="enlaces por entrada")
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--scenarios", help="lista separada por comas (por defecto, todos)")
+    parser.add_argument("--requests", type=int, default=200, help="peticiones por escenario (modo client)")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=4, help="workers de gunicorn")
+    parser.add_argument("--concurrency", type=int, default=8, help="clientes simultáneos (modo gunicorn)")
+    parser.add_argument("--duration", type=float, default=10, help="segundos por escenario (modo gunicorn)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="guarda el informe JSON en este fichero")
+    parser.add_argument("--baseline", help="informe JSON de referencia con el que comparar")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="empeoramiento relativo admitido (0.2 = 20%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=0.5, help="diferencia absoluta mínima para contar como regresión")
+    args = parser.parse_args()
+
+    modes = [m for m in args.modes.split(",") if m]
+    names = args.scenarios.split(",") if args.scenarios else list(SCENARIOS)
+    unknown = [n for n in names if n not in SCENARIOS] + [m for m in modes if m not in MODES]
+    if unknown:
+        parser.error(f"desconocidos: {', '.join(unknown)}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # La aplicación lee la ruta de la BD al importarse
+        db_path = os.path.join(tmp, "bench.db")
+        os.environ['LINKMANAGER_DATABASE'] = db_path
+        import app as appmod
+
+        stub = start_stub()
+        t0 = time.perf_counter()
+        ids = seed(appmod, stub, args.sections, args.entries, args.urls, random.Random(args.seed))
+        total = args.sections * args.entries
+        print(f"{total} entradas ({args.sections} secciones × {args.entries}, {args.urls} enlaces cada una) "
+              f"sembradas en {time.perf_counter() - t0:.1f}s\n")
+
+        # gunicorn trabaja sobre una copia intacta: el modo client escribe en la BD
+        gunicorn_db = os.path.join(tmp, "gunicorn.db")
+        if 'gunicorn' in modes:
+            with sqlite3.connect(db_path) as src, sqlite3.connect(gunicorn_db) as dst:
+                src.backup(dst)
+            shutil.rmtree(os.path.join(tmp, "metrics"), ignore_errors=True)
+
+        ctx = {'ids': ids, 'stub': stub}
+        results = {}
+        if 'client' in modes:
+            results['client'] = run_client(appmod, ctx, names, args.requests, args.warmup, args.seed)
+        if 'gunicorn' in modes:
+            results['gunicorn'] = run_gunicorn(gunicorn_db, ctx, [n for n in names if n not in CLIENT_ONLY],
+                                               args.workers, args.concurrency, args.duration, args.seed)
+
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'git': git_revision(),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'sizes': {'sections': args.sections, 'entries': args.entries, 'urls': args.urls},
+            'options': {'requests': args.requests, 'warmup': args.warmup, 'workers': args.workers,
+                        'concurrency': args.concurrency, 'duration': args.duration, 'seed': args.seed},
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\nInforme guardado en {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance, args.min_delta_ms)
+        if regressions:
+            print(f"\n{len(regressions)} regresiones (tolerancia {args.tolerance:.0%}):")
+            for mode, name, metric, old, new in regressions:
+                print(f"  {mode} {name} {metric}: {old:.2f} → {new:.2f} ms")
+            sys.exit(1)
+        print("\nSin regresiones.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Copia en caliente y volcado/restauración NDJSON con colecciones sintéticas.
+
+Crea una base de datos con schema.sql y N entradas de 3 enlaces (como
+bench_search.py) y mide:
+
+    export   volcado NDJSON completo (memoria pico con tracemalloc)
+    bulk     restauración en una BD vacía (vía rápida: sin índices ni triggers)
+    merge    la misma importación sobre una BD con datos (fila a fila, con triggers)
+    backup   copia con la API de backup mientras otro hilo escribe; se informa
+             de la espera máxima del escritor
+
+    python benchmarks/bench_backup.py --entries 100000
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import backup  # noqa: E402
+import migrations  # noqa: E402
+from bench_search import seed  # noqa: E402
+
+
+def new_database(path):
+    db = sqlite3.connect(path)
+    db.execute("PRAGMA journal_mode = WAL")
+    db.execute("PRAGMA foreign_keys = ON")
+    db.executescript((ROOT / "schema.sql").read_text(encoding="utf-8"))
+    migrations.set_schema_version(db, migrations.LATEST_VERSION)
+    db.commit()
+    return db
+
+
+def timed_import(path, dump, replace=False):
+    db = sqlite3.connect(path)
+    db.execute("PRAGMA foreign_keys = ON")
+    start = time.perf_counter()
+    with open(dump, encoding='utf-8') as fh:
+        report = backup.import_ndjson(db, fh, replace=replace)
+    db.commit()
+    elapsed = time.perf_counter() - start
+    hits = db.execute("SELECT count(*) FROM link_search WHERE link_search MATCH 'github'").fetchone()[0]
+    db.close()
+    return report, elapsed, hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=100_000)
+    parser.add_argument("--pages", type=int, default=backup.BACKUP_STEP_PAGES)
+    parser.add_argument("--sleep", type=float, default=backup.BACKUP_STEP_SLEEP)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source_path = os.path.join(tmp, "source.db")
+        db = new_database(source_path)
+        start = time.perf_counter()
+        seed(db, args.entries, rng=random.Random(42))
+        print(f"{args.entries} entradas sembradas en {time.perf_counter() - start:.1f}s "
+              f"({os.path.getsize(source_path) / 1024 / 1024:.1f} MB)\n")
+
+        dump = os.path.join(tmp, "dump.ndjson")
+        start = time.perf_counter()
+        with open(dump, 'w', encoding='utf-8') as fh:
+            counts = backup.export_ndjson(db, fh)
+        elapsed = time.perf_counter() - start
+        # La memoria se mide en otra pasada: tracemalloc ralentiza mucho el volcado
+        tracemalloc.start()
+        with open(os.devnull, 'w', encoding='utf-8') as fh:
+            backup.export_ndjson(db, fh)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"  export  {elapsed:7.2f}s  {counts['entry'] / elapsed:9.0f} entradas/s  "
+              f"{os.path.getsize(dump) / 1024 / 1024:6.1f} MB  memoria pico {peak / 1024 / 1024:.1f} MB")
+
+        bulk_path = os.path.join(tmp, "bulk.db")
+        new_database(bulk_path).close()
+        report, elapsed, hits = timed_import(bulk_path, dump)
+        print(f"  {report['mode']:6}  {elapsed:7.2f}s  {report['entries'] / elapsed:9.0f} entradas/s  "
+              f"({hits} resultados de búsqueda)")
+
+        merge_path = os.path.join(tmp, "merge.db")
+        merge_db = new_database(merge_path)
+        merge_db.execute("INSERT INTO sections (name) VALUES ('Existente')")
+        merge_db.commit()
+        merge_db.close()
+        report, elapsed, hits = timed_import(merge_path, dump)
+        print(f"  {report['mode']:6}  {elapsed:7.2f}s  {report['entries'] / elapsed:9.0f} entradas/s  "
+              f"({hits} resultados de búsqueda)")
+
+        # Copia en caliente con un escritor concurrente (como un worker de gunicorn)
+        stop = threading.Event()
+        waits = []
+
+        def writer():
+            conn = sqlite3.connect(source_path, timeout=30)
+            while not stop.is_set():
+                t0 = time.perf_counter()
+                conn.execute("UPDATE sections SET order_index = order_index + 1 WHERE id = 1")
+                conn.commit()
+                waits.append(time.perf_counter() - t0)
+                time.sleep(0.005)
+            conn.close()
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        try:
+            report = backup.backup_database(db, os.path.join(tmp, "copy.db"), args.pages, args.sleep)
+        finally:
+            stop.set()
+            thread.join()
+        print(f"  backup  {report['seconds']:7.2f}s  {report['pages']} páginas en {report['steps']} pasos "
+              f"({report['restarts']} reinicios); "
+              f"escritor: {len(waits)} escrituras, espera máxima {max(waits, default=0) * 1000:.1f} ms")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
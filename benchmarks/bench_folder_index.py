@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Índice SQLite/FTS5 de folderToPDF frente al volcado CSV sobre un árbol sintético.
+
+Genera N ficheros de texto (como bench_folder_pdf.py) y mide:
+
+    csv       exportación completa y búsqueda recorriendo el CSV línea a línea
+    sqlite    creación del índice, consultas MATCH (mediana de --queries; las
+              50 primeras y las 50 más relevantes, que puntúa todas las
+              coincidencias) y actualización en el sitio sin cambios y con
+              --changed ficheros modificados o borrados
+
+El vocabulario sintético es muy pequeño, así que casi todas las consultas
+coinciden con miles de líneas; la última busca un término que sólo está en
+los ficheros modificados.
+
+    python benchmarks/bench_folder_index.py --files 5000 --lines 40 --changed 20
+"""
+
+import argparse
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import folderToPDF  # noqa: E402
+from bench_folder_pdf import make_tree  # noqa: E402
+
+QUERIES = ("índice", '"config ruta"', "valu*", "páginas NOT None")
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def run_query(index, query, repeat):
+    db = sqlite3.connect(index)
+    medians = []
+    for order in ("", "ORDER BY rank"):
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            db.execute(f"SELECT path, line_no FROM search WHERE content MATCH ? {order} LIMIT 50", (query,)).fetchall()
+            times.append(time.perf_counter() - start)
+        medians.append(statistics.median(times) * 1000)
+    total = db.execute("SELECT count(*) FROM lines WHERE lines MATCH ?", (query,)).fetchone()[0]
+    db.close()
+    print(f"  sqlite  {query!r:22} primeras {medians[0]:7.2f} ms  relevantes {medians[1]:7.2f} ms  "
+          f"({total} coincidencias)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=5000)
+    parser.add_argument("--lines", type=int, default=40)
+    parser.add_argument("--changed", type=int, default=20, help="ficheros modificados (y otros tantos borrados)")
+    parser.add_argument("--queries", type=int, default=20, help="repeticiones de cada consulta")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        src, out = Path(tmp) / "src", Path(tmp) / "out"
+        src.mkdir()
+        out.mkdir()
+        make_tree(src, args.files, args.lines)
+        rules = folderToPDF.IgnoreRules.for_project(src)
+
+        csv_path = out / "dump.csv"
+        _, elapsed = timed(folderToPDF.export, src, csv_path, "csv")
+        print(f"  csv     exportación {elapsed:6.2f}s  {csv_path.stat().st_size / 1024 / 1024:6.1f} MB")
+
+        def grep_csv(term):
+            with csv_path.open(encoding="utf-8") as fh:
+                return sum(term in line for line in fh)
+        hits, elapsed = timed(grep_csv, "índice")
+        print(f"  csv     búsqueda de 'índice' recorriendo el fichero: {elapsed * 1000:8.1f} ms ({hits} líneas)")
+
+        index = out / "dump.sqlite"
+        stats, elapsed = timed(folderToPDF.export_sqlite, src, index, rules)
+        print(f"  sqlite  creación    {elapsed:6.2f}s  {index.stat().st_size / 1024 / 1024:6.1f} MB")
+        for query in QUERIES:
+            run_query(index, query, args.queries)
+
+        stats, elapsed = timed(folderToPDF.export_sqlite, src, index, rules)
+        print(f"  sqlite  sin cambios {elapsed:6.2f}s  {stats}")
+
+        files = sorted(src.rglob("*.py"))
+        picked = random.Random(7).sample(files, min(len(files), args.changed * 2))
+        for path in picked[:args.changed]:
+            with path.open("a", encoding="utf-8") as fh:
+                fh.write("marcador_de_cambio\n")
+        for path in picked[args.changed:]:
+            path.unlink()
+        stats, elapsed = timed(folderToPDF.export_sqlite, src, index, rules)
+        print(f"  sqlite  {args.changed} cambios + {args.changed} borrados {elapsed:6.2f}s  {stats}")
+
+        run_query(index, "marcador_de_cambio", args.queries)
+        db = sqlite3.connect(index)
+        expected = db.execute("SELECT sum(line_count) FROM files").fetchone()[0]
+        stored = db.execute("SELECT count(*) FROM lines").fetchone()[0]
+        db.close()
+        print(f"  sqlite  {stored} líneas indexadas (esperadas {expected})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Tiempo y memoria de la exportación PDF de folderToPDF sobre un árbol sintético.
+
+Genera N ficheros de texto (por defecto 5000) en un directorio temporal y
+exporta el PDF con tres variantes, cada una en un proceso aparte para medir
+su pico de memoria (ru_maxrss del proceso y de sus hijos):
+
+    legacy  una llamada a multi_cell por línea, un solo proceso (versión anterior)
+    single  líneas cortadas por ancho (fuente monoespaciada) y escritas con text(), un proceso
+    pool    igual que single, por lotes renderizados en paralelo y unidos con pypdf
+
+    python benchmarks/bench_folder_pdf.py --files 5000 --lines 40 --font /ruta/DejaVuSansMono.ttf
+"""
+
+import argparse
+import json
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import folderToPDF  # noqa: E402
+
+VARIANTS = ("legacy", "single", "pool")
+
+WORDS = ("def", "return", "self", "value", "items", "for", "in", "if", "else", "None",
+         "config", "ruta", "índice", "línea", "páginas", "→", "€", "✓")
+
+
+def make_tree(root: Path, files: int, lines: int, seed: int = 1):
+    rnd = random.Random(seed)
+    for i in range(files):
+        path = root / f"pkg{i % 25}" / f"mod{i % 7}" / f"file{i}.py"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        body = []
+        for _ in range(rnd.randint(lines // 2, lines * 3 // 2)):
+            body.append("    " * rnd.randint(0, 3) + " ".join(rnd.choices(WORDS, k=rnd.randint(3, 14))))
+        path.write_text("\n".join(body) + "\n", encoding="utf-8")
+
+
+def export_pdf_legacy(base: Path, output: Path, arbol: dict, files):
+    """Copia de la exportación anterior: una llamada a multi_cell por línea."""
+    pdf = folderToPDF.FPDF()
+    pdf.set_auto_page_break(auto=True, margin=15)
+    pdf.add_page()
+    pdf.set_font("Courier", style="B", size=12)
+    pdf.multi_cell(0, 8, f"Resumen de archivos en:\n{base}\n", new_x="LMARGIN", new_y="NEXT")
+    pdf.set_font("Courier", size=10)
+    for text, _ in folderToPDF.arbol_entries(arbol):
+        pdf.multi_cell(0, 5, text, new_x="LMARGIN", new_y="NEXT")
+    for rel_path, lines in files:
+        pdf.add_page()
+        pdf.set_font("Courier", style="B", size=11)
+        pdf.multi_cell(0, 7, f"{rel_path}\n", new_x="LMARGIN", new_y="NEXT")
+        pdf.set_font("Courier", size=9)
+        for ln in lines:
+            pdf.multi_cell(0, 5, ln.encode("latin-1", "replace").decode("latin-1"), new_x="LMARGIN", new_y="NEXT")
+    pdf.output(str(output))
+
+
+def run_variant(variant: str, tree: Path, output: Path, font: str, processes: int):
+    start = time.perf_counter()
+    arbol, files = folderToPDF.scan_project(tree)
+    if variant == "legacy":
+        export_pdf_legacy(tree, output, arbol, files)
+    else:
+        folderToPDF.export_pdf(tree, output, arbol, files, font, 1 if variant == "single" else processes)
+    elapsed = time.perf_counter() - start
+    # ru_maxrss está en KiB en Linux; para los hijos es el máximo de uno de ellos
+    rss = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+              resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    print(json.dumps({"variant": variant, "seconds": elapsed, "max_rss_mb": rss / 1024,
+                      "bytes": output.stat().st_size}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=5000)
+    parser.add_argument("--lines", type=int, default=40, help="líneas medias por fichero")
+    parser.add_argument("--font", help="TTF monoespaciada (por defecto la que encuentre folderToPDF)")
+    parser.add_argument("-p", "--processes", type=int, default=folderToPDF.PDF_PROCESSES)
+    parser.add_argument("--variants", default=",".join(VARIANTS))
+    parser.add_argument("--run", choices=VARIANTS, help=argparse.SUPPRESS)
+    parser.add_argument("--tree", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_variant(args.run, Path(args.tree), Path(args.tree).parent / f"{args.run}.pdf", args.font, args.processes)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tree = Path(tmp) / "tree"
+        make_tree(tree, args.files, args.lines)
+        print(f"{args.files} ficheros, ~{args.lines} líneas, {args.processes} procesos\n")
+        print(f"{'variante':8} {'tiempo':>9} {'memoria':>10} {'tamaño':>10}")
+        for variant in args.variants.split(","):
+            command = [sys.executable, __file__, "--run", variant, "--tree", str(tree), "-p", str(args.processes)]
+            if args.font:
+                command += ["--font", args.font]
+            result = subprocess.run(command, capture_output=True, text=True)
+            if result.returncode:
+                print(f"{variant:8} falló:\n{result.stderr[-2000:]}")
+                continue
+            report = json.loads(result.stdout.strip().splitlines()[-1])
+            print(f"{variant:8} {report['seconds']:8.2f}s {report['max_rss_mb']:8.1f}MB "
+                  f"{report['bytes'] / 1e6:8.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
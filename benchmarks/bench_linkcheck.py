@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Rendimiento del comprobador de enlaces contra servidores HTTP locales.
+
+Arranca un servidor de prueba por "host" (127.0.0.2, 127.0.0.3, ...) que
+responde con un retardo fijo y comprueba N URLs repartidas entre ellos,
+primero una a una (como fetch_metadata) y luego con check_urls().
+
+    python benchmarks/bench_linkcheck.py --urls 2000 --hosts 8 --delay-ms 20
+"""
+
+import argparse
+import http.server
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from linkcheck import check_urls  # noqa: E402
+
+
+def start_stub(host, delay):
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_HEAD(self):
+            time.sleep(delay)
+            self.send_response(404 if self.path.startswith('/dead') else 200)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+        do_GET = do_HEAD
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer((host, 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--urls", type=int, default=2000)
+    parser.add_argument("--hosts", type=int, default=8)
+    parser.add_argument("--delay-ms", type=float, default=20)
+    parser.add_argument("--workers", type=int, default=64)
+    parser.add_argument("--host-concurrency", type=int, default=8)
+    parser.add_argument("--sequential-sample", type=int, default=200,
+                        help="URLs medidas en modo secuencial (se extrapola al total)")
+    args = parser.parse_args()
+
+    servers = [start_stub(f"127.0.0.{i + 2}", args.delay_ms / 1000) for i in range(args.hosts)]
+    urls = [f"http://{s.server_address[0]}:{s.server_address[1]}/{'dead' if i % 50 == 0 else 'ok'}/{i}"
+            for i, s in ((i, servers[i % len(servers)]) for i in range(args.urls))]
+
+    sample = urls[:args.sequential_sample]
+    start = time.perf_counter()
+    check_urls(sample, workers=1, host_concurrency=1)
+    sequential = (time.perf_counter() - start) / len(sample) * len(urls)
+    print(f"secuencial (estimado): {sequential:7.2f}s  {len(urls) / sequential:8.0f} URLs/s")
+
+    start = time.perf_counter()
+    results = check_urls(urls, workers=args.workers, host_concurrency=args.host_concurrency)
+    elapsed = time.perf_counter() - start
+    failed = sum(1 for r in results.values() if not r['ok'])
+    print(f"concurrente:           {elapsed:7.2f}s  {len(urls) / elapsed:8.0f} URLs/s  "
+          f"({failed} con error, x{sequential / elapsed:.1f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark del extractor de metadatos en streaming frente al parseo
+completo con BeautifulSoup que usaba antes fetch_metadata().
+
+Usa las páginas guardadas en benchmarks/fixtures/ tal cual y rellenadas con
+un <body> grande (por defecto 2 MB) para simular páginas pesadas.
+
+    pip install beautifulsoup4        # sólo para la implementación antigua
+    python benchmarks/bench_metadata_parser.py --padding-kb 2048 --repeat 20
+"""
+
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from urllib.parse import urlparse
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from metadata import extract_metadata, METADATA_CHUNK_SIZE  # noqa: E402
+
+try:
+    from bs4 import BeautifulSoup
+except ImportError:
+    BeautifulSoup = None
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+PAGE_URL = "https://example.org/some/page"
+
+
+def legacy_parse(content, processed_url, url_to_fetch):
+    """Implementación anterior: árbol completo + soup.find repetidos."""
+    metadata = {'title': url_to_fetch, 'description': '', 'image_url': ''}
+    soup = BeautifulSoup(content, 'html.parser')
+    og_title = soup.find('meta', property='og:title')
+    metadata['title'] = og_title['content'].strip() if og_title and og_title.get('content') else (soup.find('title').string.strip() if soup.find('title') and soup.find('title').string else url_to_fetch)
+    og_description = soup.find('meta', property='og:description')
+    metadata['description'] = og_description['content'].strip() if og_description and og_description.get('content') else (soup.find('meta', attrs={'name': 'description'})['content'].strip() if soup.find('meta', attrs={'name': 'description'}) and soup.find('meta', attrs={'name': 'description'}).get('content') else '')
+    og_image = soup.find('meta', property='og:image')
+    img_url_meta = og_image['content'] if og_image and og_image.get('content') else None
+    if img_url_meta:
+        parsed_original_url = urlparse(processed_url)
+        if not urlparse(img_url_meta).scheme:
+            img_path = img_url_meta if img_url_meta.startswith('/') else ('/' + img_url_meta)
+            img_url_meta = f"{parsed_original_url.scheme}://{parsed_original_url.netloc}{img_path}"
+        metadata['image_url'] = img_url_meta
+    return metadata
+
+
+def streaming_parse(content, processed_url, url_to_fetch):
+    chunks = (content[i:i + METADATA_CHUNK_SIZE] for i in range(0, len(content), METADATA_CHUNK_SIZE))
+    return extract_metadata(chunks, processed_url, url_to_fetch)
+
+
+def build_corpus(padding_kb):
+    corpus = []
+    filler = b"<p>" + b"Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 16 + b"</p>\n"
+    for path in sorted(FIXTURES.glob("*.html")):
+        raw = path.read_bytes()
+        corpus.append((path.name, raw))
+        if padding_kb:
+            body = filler * (padding_kb * 1024 // len(filler) + 1)
+            padded = raw.replace(b"</body>", body + b"</body>") if b"</body>" in raw else raw + body
+            corpus.append((f"{path.name} (+{padding_kb} KB)", padded))
+    return corpus
+
+
+def measure(func, content, repeat):
+    tracemalloc.start()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func(content, PAGE_URL, PAGE_URL)
+    elapsed = (time.perf_counter() - start) / repeat
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--padding-kb", type=int, default=2048, help="tamaño del <body> de relleno")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    if BeautifulSoup is None:
+        print("❗  Instala beautifulsoup4 para comparar con la implementación antigua.")
+        return 1
+
+    print(f"{'fixture':40} {'bs4 ms':>9} {'stream ms':>10} {'bs4 KB':>9} {'stream KB':>10}  ok")
+    for name, content in build_corpus(args.padding_kb):
+        old, old_t, old_mem = measure(legacy_parse, content, args.repeat)
+        new, new_t, new_mem = measure(streaming_parse, content, args.repeat)
+        same = "✔" if old == new else f"✘ {old} != {new}"
+        print(f"{name:40} {old_t * 1000:9.2f} {new_t * 1000:10.2f} {old_mem / 1024:9.0f} {new_mem / 1024:10.0f}  {same}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Latencia de /search (índice FTS5 link_search) con colecciones sintéticas.
+
+Crea una base de datos temporal con schema.sql, la llena con N entradas de
+3 enlaces cada una (los triggers mantienen el índice) y mide las consultas
+de search_entries() con prefijos de distinta selectividad.
+
+    python benchmarks/bench_search.py --sizes 10000 100000
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from app import search_entries  # noqa: E402
+
+WORDS = ("jellyfin sonarr radarr grafana prometheus portainer nextcloud immich paperless homeassistant "
+         "router firewall backup media servidor vídeo música fotos documentos monitorización descargas "
+         "proxy dns nas docker kubernetes wiki notas calendario correo domótica cámaras").split()
+# Vocabulario de relleno para que la selectividad se parezca a una colección real
+FILLER = [f"{a}{b}{c}" for a in "bcdfglmnprstv" for b in ("a", "e", "i", "o", "u", "ar", "en", "is")
+          for c in ("x", "lo", "ne", "ta", "rum", "don", "vik")]
+QUERIES = ["jelly", "graf", "servidor vid", "dock kube", "zzz", "b", "https github"]
+
+
+def seed(db, entries, sections=50, urls_per_entry=3, rng=None):
+    rng = rng or random.Random(42)
+    db.executemany("INSERT INTO sections (name) VALUES (?)", [(f"Sección {i}",) for i in range(sections)])
+    batch = 5000
+    for start in range(0, entries, batch):
+        n = min(batch, entries - start)
+        db.executemany(
+            "INSERT INTO link_entries (section_id, title, description) VALUES (?, ?, ?)",
+            [(rng.randint(1, sections), f"{rng.choice(WORDS)} {' '.join(rng.sample(FILLER, 2))}",
+              f"{rng.choice(WORDS)} {' '.join(rng.sample(FILLER, 10))}")
+             for _ in range(n)])
+        last_id = db.execute("SELECT last_insert_rowid()").fetchone()[0]
+        db.executemany(
+            "INSERT INTO entry_urls (link_entry_id, label, link_type, value) VALUES (?, ?, 'external_url', ?)",
+            [(entry_id, rng.choice(FILLER), f"https://github.com/{rng.choice(WORDS)}/{entry_id}")
+             for entry_id in range(last_id - n + 1, last_id + 1) for _ in range(urls_per_entry)])
+        db.commit()
+
+
+def bench(size, repeat):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = sqlite3.connect(os.path.join(tmp, "bench.db"))
+        db.row_factory = sqlite3.Row
+        db.executescript((ROOT / "schema.sql").read_text(encoding="utf-8"))
+        start = time.perf_counter()
+        seed(db, size)
+        print(f"\n{size} entradas sembradas en {time.perf_counter() - start:.1f}s")
+        print(f"  {'consulta':16} {'total':>7} {'p50 ms':>8} {'p95 ms':>8}")
+        for q in QUERIES:
+            timings = []
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                _, total = search_entries(db, q, 20, 0)
+                timings.append((time.perf_counter() - t0) * 1000)
+            timings.sort()
+            p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+            print(f"  {q:16} {total:7} {statistics.median(timings):8.2f} {p95:8.2f}")
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    for size in args.sizes:
+        bench(size, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
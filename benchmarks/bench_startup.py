@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Coste de arranque: tiempo de importación y memoria por worker de gunicorn.
+
+Mide sobre una copia del árbol actual y, con --ref, sobre otra revisión de git
+(extraída con `git archive`) para comparar antes y después:
+
+    import   `python -X importtime -c "import app"`: tiempo acumulado de app
+             (mediana de --runs) y los imports directos más caros
+    gunicorn arranque hasta la primera respuesta y RSS/PSS/USS del maestro y
+             de cada worker tras unas peticiones de calentamiento. Con el
+             árbol actual se mide con gunicorn.conf.py con y sin preload; la
+             revisión de --ref se arranca como entonces (-w N app:app)
+
+El PSS reparte las páginas compartidas entre los procesos que las usan y el
+USS cuenta sólo las privadas: es lo que de verdad cuesta cada worker más.
+
+    python benchmarks/bench_startup.py --ref HEAD~1 --workers 4
+"""
+
+import argparse
+import os
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import requests
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+from load_test import free_port  # noqa: E402
+
+HEAVY_MODULES = ('requests', 'PIL', 'brotli', 'bs4')
+WARMUP_PATHS = ('/', '/?lazy=1', '/api/sections', '/search?q=demo')
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def copy_tree(destination):
+    ignore = shutil.ignore_patterns('.git', '__pycache__', 'database', 'build', 'thumbs', 'uploads')
+    shutil.copytree(ROOT, destination, ignore=ignore)
+
+
+def export_ref(ref, destination):
+    os.makedirs(destination)
+    archive = subprocess.run(["git", "archive", ref], cwd=ROOT, check=True, capture_output=True).stdout
+    subprocess.run(["tar", "-x", "-C", destination], input=archive, check=True)
+
+
+def tree_env(tree, tmp, **extra):
+    data = os.path.join(tmp, os.path.basename(tree) + "-data")
+    os.makedirs(data, exist_ok=True)
+    return dict(os.environ, LINKMANAGER_DATABASE=os.path.join(data, "database.db"),
+                METRICS_DIR=os.path.join(data, "metrics"), **extra)
+
+
+def measure_imports(tree, env, runs):
+    totals, children = [], {}
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app"],
+                                cwd=tree, env=env, capture_output=True, text=True, check=True)
+        depth_of_app = None
+        for line in reversed(result.stderr.splitlines()):
+            match = IMPORTTIME_LINE.match(line)
+            if not match:
+                continue
+            cumulative, depth, name = int(match[2]), len(match[3]), match[4]
+            if depth_of_app is None:
+                if name == 'app':
+                    depth_of_app = depth
+                    totals.append(cumulative / 1000)
+                continue
+            if depth <= depth_of_app:
+                break
+            if depth == depth_of_app + 2:  # imports directos de app
+                children.setdefault(name, []).append(cumulative / 1000)
+    loaded = subprocess.run(
+        [sys.executable, "-c", f"import app, sys; print(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"],
+        cwd=tree, env=env, capture_output=True, text=True, check=True).stdout.split()
+    top = sorted(((statistics.median(v), k) for k, v in children.items()), reverse=True)[:6]
+    return statistics.median(totals), top, loaded
+
+
+def memory(pid):
+    """Devuelve {'rss', 'pss', 'uss'} en MB a partir de /proc/<pid>/smaps_rollup."""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1]) / 1024
+    return {'rss': fields['Rss'], 'pss': fields['Pss'],
+            'uss': fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)}
+
+
+def children_of(pid):
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return [int(child) for child in f.read().split()]
+
+
+def measure_gunicorn(tree, env, argv, workers, warmup):
+    port = free_port()
+    env = dict(env, GUNICORN_BIND=f"127.0.0.1:{port}", GUNICORN_WORKERS=str(workers))
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-m", "gunicorn", *argv, "-b", f"127.0.0.1:{port}"],
+                            cwd=tree, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    try:
+        for _ in range(600):
+            try:
+                requests.get(url + "/api/sections", timeout=1)
+                break
+            except requests.ConnectionError:
+                time.sleep(0.05)
+        else:
+            raise RuntimeError("gunicorn no arrancó")
+        ready = time.perf_counter() - start
+        while len(children_of(proc.pid)) < workers:
+            time.sleep(0.05)
+        session = requests.Session()
+        for i in range(warmup):
+            session.get(url + WARMUP_PATHS[i % len(WARMUP_PATHS)], timeout=10)
+        time.sleep(0.5)
+        master = memory(proc.pid)
+        worker_stats = [memory(pid) for pid in children_of(proc.pid)]
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+    return ready, master, worker_stats
+
+
+def prepare_database(tree, env):
+    subprocess.run([sys.executable, "-c", "from app import check_and_create_db; check_and_create_db()"],
+                   cwd=tree, env=env, check=True, stdout=subprocess.DEVNULL)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ref", help="revisión de git con la que comparar (p. ej. HEAD~1)")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--runs", type=int, default=5, help="repeticiones de -X importtime")
+    parser.add_argument("--warmup", type=int, default=100, help="peticiones de calentamiento antes de medir")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        current = os.path.join(tmp, "actual")
+        copy_tree(current)
+        # (etiqueta, árbol, argumentos de gunicorn, variables de entorno extra)
+        variants = [("actual, preload", current, ["-c", "gunicorn.conf.py"], {}),
+                    ("actual, sin preload", current, ["-c", "gunicorn.conf.py"], {'GUNICORN_PRELOAD': '0'})]
+        trees = [("actual", current)]
+        if args.ref:
+            previous = os.path.join(tmp, "ref")
+            export_ref(args.ref, previous)
+            trees.insert(0, (args.ref, previous))
+            variants.insert(0, (args.ref, previous, ["-w", str(args.workers), "app:app"], {}))
+
+        print("Importación de app (-X importtime, mediana de {} ejecuciones)".format(args.runs))
+        for label, tree in trees:
+            env = tree_env(tree, tmp)
+            prepare_database(tree, env)
+            total, top, loaded = measure_imports(tree, env, args.runs)
+            print(f"  {label:20} {total:7.1f} ms  cargados: {', '.join(loaded) or 'ninguno pesado'}")
+            print("  " + " " * 20 + "  ".join(f"{name} {ms:.0f}" for ms, name in top))
+
+        print(f"\nGunicorn con {args.workers} workers (MB tras {args.warmup} peticiones)")
+        print(f"  {'':20} {'listo':>7}  {'maestro RSS':>11}  {'worker RSS':>10}  {'PSS':>6}  {'USS':>6}  {'total PSS':>9}")
+        for label, tree, argv, extra in variants:
+            env = tree_env(tree, tmp, **extra)
+            ready, master, workers = measure_gunicorn(tree, env, argv, args.workers, args.warmup)
+            mean = {key: statistics.mean(w[key] for w in workers) for key in ('rss', 'pss', 'uss')}
+            total_pss = master['pss'] + sum(w['pss'] for w in workers)
+            print(f"  {label:20} {ready:6.2f}s  {master['rss']:11.1f}  {mean['rss']:10.1f}  "
+                  f"{mean['pss']:6.1f}  {mean['uss']:6.1f}  {total_pss:9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Prueba de carga: latencia de GET / mientras otros clientes reordenan
+tarjetas con POST /update_order, contra gunicorn con varios workers.
+
+Por defecto compara dos configuraciones sobre bases de datos recién creadas:
+    • antes    – journal rollback, sin pool (DB_JOURNAL_MODE=DELETE, DB_POOL_SIZE=0)
+    • después  – WAL + pool de conexiones (valores por defecto)
+
+    python benchmarks/load_test.py --duration 20 --readers 16 --writers 4
+    python benchmarks/load_test.py --url http://localhost:5000   # servidor ya arrancado
+"""
+
+import argparse
+import os
+import random
+import socket
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import requests
+
+ROOT = Path(__file__).resolve().parent.parent
+
+CONFIGS = {
+    'antes': {'DB_JOURNAL_MODE': 'DELETE', 'DB_POOL_SIZE': '0', 'DB_SYNCHRONOUS': 'FULL'},
+    'después': {},
+}
+
+
+def seed_database(path, sections, entries_per_section):
+    sys.path.insert(0, str(ROOT))
+    import migrations
+
+    db = sqlite3.connect(path)
+    db.executescript((ROOT / "schema.sql").read_text(encoding="utf-8"))
+    migrations.set_schema_version(db, migrations.LATEST_VERSION)
+    db.executemany("INSERT INTO sections (name, order_index) VALUES (?, ?)",
+                   [(f"Sección {i}", i) for i in range(sections)])
+    for section_id in range(1, sections + 1):
+        db.executemany("INSERT INTO link_entries (section_id, title, description, order_index) VALUES (?, ?, ?, ?)",
+                       [(section_id, f"Entrada {section_id}-{i}", "Descripción de prueba", i)
+                        for i in range(entries_per_section)])
+    db.execute("INSERT INTO entry_urls (link_entry_id, label, link_type, value) "
+               "SELECT id, 'web', 'external_url', 'https://example.org/' || id FROM link_entries")
+    db.commit()
+    ids = {}
+    for row in db.execute("SELECT section_id, id FROM link_entries ORDER BY section_id, order_index"):
+        ids.setdefault(row[0], []).append(row[1])
+    db.close()
+    return ids
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_gunicorn(db_path, workers, extra_env):
+    port = free_port()
+    env = dict(os.environ, LINKMANAGER_DATABASE=db_path, **extra_env)
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-w", str(workers), "-b", f"127.0.0.1:{port}", "app:app"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            requests.get(url + "/api/sections", timeout=1)
+            return proc, url
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    proc.terminate()
+    raise RuntimeError("gunicorn no arrancó")
+
+
+def run_load(url, entry_ids, duration, readers, writers):
+    stop = time.monotonic() + duration
+    results = {'read': [], 'write': [], 'errors': 0}
+    lock = threading.Lock()
+
+    def reader():
+        session = requests.Session()
+        while time.monotonic() < stop:
+            t0 = time.perf_counter()
+            r = session.get(url + "/")
+            elapsed = (time.perf_counter() - t0) * 1000
+            with lock:
+                results['read'].append(elapsed)
+                results['errors'] += r.status_code != 200
+
+    def writer(seed):
+        rng = random.Random(seed)
+        session = requests.Session()
+        while time.monotonic() < stop:
+            section_id = rng.choice(list(entry_ids))
+            item_id, after_id = rng.sample(entry_ids[section_id], 2)
+            t0 = time.perf_counter()
+            r = session.post(url + "/update_order", json={'type': 'entries', 'item_id': item_id, 'after_id': after_id})
+            elapsed = (time.perf_counter() - t0) * 1000
+            with lock:
+                results['write'].append(elapsed)
+                results['errors'] += r.status_code != 200
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    threads += [threading.Thread(target=writer, args=(n,)) for n in range(writers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def percentile(values, p):
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def report(name, results, duration):
+    print(f"\n== {name} ==")
+    for kind in ('read', 'write'):
+        values = results[kind]
+        label = "GET /" if kind == 'read' else "POST /update_order"
+        if not values:
+            print(f"  {label:20} sin peticiones")
+            continue
+        print(f"  {label:20} n={len(values):6}  {len(values) / duration:7.1f} req/s  "
+              f"p50={statistics.median(values):7.1f} ms  p99={percentile(values, 99):7.1f} ms")
+    print(f"  errores (status != 200): {results['errors']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="servidor ya arrancado (no se lanza gunicorn)")
+    parser.add_argument("--duration", type=float, default=15)
+    parser.add_argument("--readers", type=int, default=16)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=4, help="workers de gunicorn")
+    parser.add_argument("--sections", type=int, default=20)
+    parser.add_argument("--entries", type=int, default=200, help="entradas por sección")
+    args = parser.parse_args()
+
+    if args.url:
+        ids = {}
+        for section in requests.get(args.url + "/api/sections").json()['sections']:
+            page = requests.get(f"{args.url}/api/sections/{section['id']}/entries", params={'limit': 200}).json()
+            ids[section['id']] = [e['id'] for e in page['entries']]
+        ids = {k: v for k, v in ids.items() if v}
+        report(args.url, run_load(args.url, ids, args.duration, args.readers, args.writers), args.duration)
+        return
+
+    for name, extra_env in CONFIGS.items():
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "load.db")
+            ids = seed_database(db_path, args.sections, args.entries)
+            proc, url = start_gunicorn(db_path, args.workers, extra_env)
+            try:
+                results = run_load(url, ids, args.duration, args.readers, args.writers)
+            finally:
+                proc.terminate()
+                proc.wait()
+            report(name, results, args.duration)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,10 @@
 #!/bin/sh
 
-# Si no existe la base de datos, la crea
-if [ ! -f /app/database/database.db ]; then
-  echo "Inicializando base de datos..."
-  python3 -c "from app import init_db; init_db()"
-fi
+# Las métricas de la ejecución anterior no se suman a las de esta
+rm -rf "${METRICS_DIR:-database/metrics}"
 
-# Ejecutar Gunicorn como servidor WSGI
-exec gunicorn -w 4 -b 0.0.0.0:5000 app:app
+# Ejecutar Gunicorn como servidor WSGI. El proceso maestro precarga la
+# aplicación: compila los recursos estáticos, crea la base de datos si no
+# existe o aplica las migraciones pendientes y después arranca los workers
+# (ver gunicorn.conf.py)
+exec gunicorn -c gunicorn.conf.py
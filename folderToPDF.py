@@ -5,13 +5,37 @@ Convierte TODO el contenido de un directorio (sin filtrar por extensión) a:
     • PDF  – índice + contenido por archivo
     • TXT  – índice + contenido
     • CSV  – columnas: ruta, nº línea, contenido
+    • SQLite – tabla de ficheros + índice FTS5 por línea, actualizable en el sitio
 
-Requisito opcional:
+Los ficheros se leen en paralelo y se exportan según se leen, sin cargar el
+proyecto entero en memoria. Se omiten los binarios (por extensión o por
+contener bytes NUL) y lo que excluyan el .gitignore del proyecto y
+DEFAULT_EXCLUDES.
+
+Uso:
+    python folderToPDF.py                          # modo interactivo
+    python folderToPDF.py src -o listado.pdf
+    python folderToPDF.py . -o dump.csv -i '*.py' -e 'tests/' --max-size 1M -j 16
+    python folderToPDF.py . -o dump.txt --incremental   # sólo relee lo que ha cambiado
+    python folderToPDF.py . -o dump.sqlite             # índice de búsqueda; se actualiza si ya existe
+
+Requisitos opcionales:
     pip install fpdf2        # sólo si vas a generar PDF
+    pip install pypdf        # PDF renderizado en paralelo (varios procesos)
 """
 
-import os
+import argparse
 import csv
+import hashlib
+import io
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
 
 try:
@@ -19,125 +43,819 @@ try:
 except ImportError:
     FPDF = None                    # permitimos TXT/CSV aunque no esté fpdf2
 
+try:
+    from pypdf import PdfReader, PdfWriter     # unir fragmentos renderizados en paralelo
+    from pypdf.annotations import Link
+except ImportError:
+    PdfWriter = None               # sin pypdf el PDF se genera en un solo proceso
+
+
+# Carpetas y ficheros que nunca interesan en el volcado
+DEFAULT_EXCLUDES = [".git/", "__pycache__/", "node_modules/", ".venv/", "venv/",
+                    ".mypy_cache/", ".pytest_cache/", ".tox/", "*.pyc"]
+
+# Extensiones que se tratan como binarias sin abrir el fichero
+BINARY_EXTENSIONS = {
+    ".png", ".jpg", ".jpeg", ".gif", ".bmp", ".ico", ".webp", ".tiff", ".psd",
+    ".pdf", ".zip", ".gz", ".tgz", ".bz2", ".xz", ".7z", ".rar", ".tar", ".jar",
+    ".exe", ".dll", ".so", ".dylib", ".o", ".a", ".pyc", ".pyo", ".class", ".wasm",
+    ".db", ".sqlite", ".sqlite3", ".woff", ".woff2", ".ttf", ".otf", ".eot",
+    ".mp3", ".mp4", ".wav", ".ogg", ".flac", ".avi", ".mov", ".mkv", ".webm",
+}
+SNIFF_BYTES = 8192                 # bytes que se miran buscando un NUL
+READ_JOBS = min(32, (os.cpu_count() or 1) * 4)
+
 
 # --------------------------------------------------------------------------- #
-# Escaneo de proyecto (¡sin filtro de extensiones!)
+# Patrones de exclusión estilo .gitignore
 # --------------------------------------------------------------------------- #
-def scan_project(base: Path):
+def _glob_to_regex(pattern: str) -> str:
+    i, out = 0, []
+    while i < len(pattern):
+        c = pattern[i]
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+            continue
+        if pattern.startswith("/**", i) and i + 3 == len(pattern):
+            out.append("/.*")
+            i += 3
+            continue
+        if c == "*":
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            j = pattern.find("]", i + 1)
+            if j == -1:
+                out.append(re.escape(c))
+            else:
+                clase = pattern[i + 1:j].replace("\\", "\\\\")
+                out.append("[" + ("^" + clase[1:] if clase.startswith("!") else clase) + "]")
+                i = j
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return "".join(out)
+
+
+class IgnoreRules:
+    """
+    Subconjunto de la sintaxis de .gitignore: comodines (*, ?, **, [...]),
+    negación con «!», «/» final para sólo carpetas y «/» inicial o interior
+    para anclar el patrón a la raíz. Gana el último patrón que coincide.
     """
+
+    def __init__(self, patterns=()):
+        self.rules = []
+        for raw in patterns:
+            self.add(raw)
+
+    def add(self, raw: str):
+        pattern = raw.rstrip("\n").rstrip()
+        if not pattern or pattern.startswith("#"):
+            return
+        negated = pattern.startswith("!")
+        if negated:
+            pattern = pattern[1:]
+        dir_only = pattern.endswith("/")
+        pattern = pattern.rstrip("/")
+        anchored = "/" in pattern
+        pattern = pattern.lstrip("/")
+        regex = _glob_to_regex(pattern)
+        if not anchored:
+            regex = "(?:.*/)?" + regex
+        self.rules.append((re.compile(regex + "$"), negated, dir_only))
+
+    def add_path(self, rel_path: str):
+        """Excluye una ruta concreta (relativa a la raíz), sin interpretar comodines."""
+        self.rules.append((re.compile(re.escape(rel_path) + "$"), False, False))
+
+    @classmethod
+    def for_project(cls, base: Path, extra=()):
+        rules = cls(DEFAULT_EXCLUDES)
+        gitignore = base / ".gitignore"
+        if gitignore.is_file():
+            for line in gitignore.read_text(encoding="utf-8", errors="ignore").splitlines():
+                rules.add(line)
+        for pattern in extra:
+            rules.add(pattern)
+        return rules
+
+    def matches(self, rel_path: str, is_dir: bool = False) -> bool:
+        result = False
+        for regex, negated, dir_only in self.rules:
+            if dir_only and not is_dir:
+                continue
+            if regex.match(rel_path):
+                result = not negated
+        return result
+
+
+# --------------------------------------------------------------------------- #
+# Escaneo de proyecto en streaming
+# --------------------------------------------------------------------------- #
+def walk_project(base: Path, rules: IgnoreRules, include: IgnoreRules = None):
+    """
+    Recorre el árbol en orden alfabético sin leer ningún fichero. Si se pasa
+    `include` sólo se quedan los ficheros que coinciden con alguno de sus patrones
+    o que están dentro de una carpeta que coincide (p. ej. `-i 'src/'`).
     Devuelve:
       1) arbol:  { carpeta: { … "__files__": [nombres] } }
-      2) files:  [(ruta_relativa, [líneas de texto]), …]
+      2) paths:  [ruta_relativa, …]
     """
-    arbol, files = {}, []
-
-    for root, _, filenames in os.walk(base):
+    arbol, paths = {}, []
+    # Carpetas incluidas enteras por un patrón de `include` (ellas o un antecesor)
+    included_dirs = set()
+    for root, dirnames, filenames in os.walk(base):
         rel_root = Path(root).relative_to(base)
-        nodo = arbol
-        if rel_root != Path("."):
-            for parte in rel_root.parts:
-                nodo = nodo.setdefault(parte, {})
+        prefix = "" if rel_root == Path(".") else rel_root.as_posix() + "/"
+        dirnames[:] = sorted(d for d in dirnames if not rules.matches(prefix + d, is_dir=True))
+        dir_included = include is None or prefix in included_dirs
+        if include is not None:
+            included_dirs.update(prefix + d + "/" for d in dirnames
+                                 if dir_included or include.matches(prefix + d, is_dir=True))
 
-        for name in filenames:                       # ← ¡ya no filtramos!
+        nodo = arbol
+        for parte in rel_root.parts:
+            nodo = nodo.setdefault(parte, {})
+        for name in sorted(filenames):
+            if rules.matches(prefix + name) or not (dir_included or include.matches(prefix + name)):
+                continue
             nodo.setdefault("__files__", []).append(name)
-            ruta = Path(root) / name
-            try:
-                with ruta.open("r", encoding="utf-8", errors="ignore") as fh:
-                    files.append((ruta.relative_to(base), fh.readlines()))
-            except Exception as e:
-                print(f"⚠️  No se pudo leer {ruta}: {e}")
+            paths.append(rel_root / name)
+    return arbol, paths
+
+
+def is_binary(path: Path, head: bytes) -> bool:
+    return path.suffix.lower() in BINARY_EXTENSIONS or b"\0" in head
+
+
+def read_file_bytes(base: Path, rel_path: Path, max_size: int = None):
+    """Contenido de un fichero de texto, o None si es binario, supera `max_size` o no se puede leer."""
+    ruta = base / rel_path
+    if rel_path.suffix.lower() in BINARY_EXTENSIONS:
+        return None
+    try:
+        with ruta.open("rb") as fh:
+            if max_size is not None and os.fstat(fh.fileno()).st_size > max_size:
+                return None
+            head = fh.read(SNIFF_BYTES)
+            if is_binary(rel_path, head):
+                return None
+            return head + fh.read()
+    except OSError as e:
+        print(f"⚠️  No se pudo leer {ruta}: {e}")
+        return None
+
 
-    return arbol, files
+def decode_lines(data: bytes):
+    return data.decode("utf-8", errors="ignore").splitlines(keepends=True)
+
+
+def read_text_file(base: Path, rel_path: Path, max_size: int = None):
+    """Lee un fichero de texto. Devuelve (ruta_relativa, líneas) o None si se omite."""
+    data = read_file_bytes(base, rel_path, max_size)
+    return None if data is None else (rel_path, decode_lines(data))
+
+
+def _ordered_map(fn, items, jobs: int, window: int):
+    """Como executor.map pero con un máximo de `window` resultados en memoria."""
+    with ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="lector") as pool:
+        pending = deque()
+        for item in items:
+            pending.append(pool.submit(fn, item))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def iter_files(base: Path, paths, jobs: int = READ_JOBS, max_size: int = None):
+    """Genera (ruta_relativa, [líneas]) de los ficheros de texto, leídos en paralelo y en orden."""
+    for result in _ordered_map(lambda rel: read_text_file(base, rel, max_size), paths, jobs, jobs * 4):
+        if result is not None:
+            yield result
+
+
+def scan_project(base: Path, excludes=(), jobs: int = READ_JOBS, includes=(), max_size: int = None):
+    """
+    Devuelve:
+      1) arbol:  { carpeta: { … "__files__": [nombres] } }
+      2) files:  generador de (ruta_relativa, [líneas de texto]); los binarios se omiten
+    """
+    include = IgnoreRules(includes) if includes else None
+    arbol, paths = walk_project(base, IgnoreRules.for_project(base, excludes), include)
+    return arbol, iter_files(base, paths, jobs, max_size)
 
 
 # --------------------------------------------------------------------------- #
 # Exportar PDF
 # --------------------------------------------------------------------------- #
-def dibujar_arbol(pdf: "FPDF", nodo: dict, indent: int = 0):
+PDF_BATCH_FILES = 64               # ficheros por fragmento que renderiza cada proceso
+PDF_PROCESSES = os.cpu_count() or 1
+
+# Fuentes monoespaciadas TrueType habituales; con una de ellas no hace falta
+# degradar el texto a latin-1. FOLDERTOPDF_FONT o --font tienen prioridad.
+FONT_CANDIDATES = [
+    "/usr/share/fonts/truetype/dejavu/DejaVuSansMono.ttf",
+    "/usr/share/fonts/TTF/DejaVuSansMono.ttf",
+    "/usr/share/fonts/dejavu/DejaVuSansMono.ttf",
+    "/usr/share/fonts/truetype/liberation/LiberationMono-Regular.ttf",
+    "/Library/Fonts/DejaVuSansMono.ttf",
+    "C:/Windows/Fonts/consola.ttf",
+    "C:/Windows/Fonts/cour.ttf",
+]
+
+
+def find_unicode_font(explicit: str = None):
+    for candidate in [explicit, os.environ.get("FOLDERTOPDF_FONT")] + FONT_CANDIDATES:
+        if candidate and Path(candidate).is_file():
+            return candidate
+    return None
+
+
+def _new_pdf(font_path: str = None):
+    pdf = FPDF()
+    pdf.set_auto_page_break(auto=True, margin=15)
+    if font_path:
+        pdf.add_font("Mono", "", font_path)
+        pdf.add_font("Mono", "B", font_path)
+        return pdf, "Mono"
+    return pdf, "Courier"
+
+
+def _pdf_text(text: str, unicode_font: bool) -> str:
+    text = text.replace("\r\n", "\n").replace("\r", "\n").replace("\t", "    ")
+    return text if unicode_font else text.encode("latin-1", "replace").decode("latin-1")
+
+
+def arbol_entries(nodo: dict, prefix: str = "", indent: int = 0):
+    """Líneas del árbol como (texto, ruta_relativa del fichero o None)."""
     for k, v in sorted(nodo.items()):
         if k == "__files__":
             for f in sorted(v):
-                pdf.multi_cell(0, 5, " " * indent + f"- {f}",
-                               new_x="LMARGIN", new_y="NEXT")
+                yield " " * indent + f"- {f}", prefix + f
         else:
-            pdf.multi_cell(0, 5, " " * indent + f"[{k}]/",
-                           new_x="LMARGIN", new_y="NEXT")
-            dibujar_arbol(pdf, v, indent + 4)
+            yield " " * indent + f"[{k}]/", None
+            yield from arbol_entries(v, prefix + k + "/", indent + 4)
 
 
-def export_pdf(base: Path, output: Path, arbol: dict, files: list):
-    if FPDF is None:
-        raise RuntimeError("❗  Instala primero fpdf2 →  pip install fpdf2")
+def dibujar_arbol(pdf: "FPDF", base: Path, arbol: dict, family: str, links: dict):
+    """
+    Portada con el árbol, desde la página actual. Cada fichero con contenido
+    enlaza a su página (`links`: ruta → id de enlace de fpdf; None para sólo
+    medir). Devuelve [(ruta, página, x, y, ancho, alto)] de cada línea enlazable.
+    """
+    pdf.set_font(family, style="B", size=12)
+    pdf.multi_cell(0, 8, _pdf_text(f"Resumen de archivos en:\n{base}\n", family == "Mono"),
+                   new_x="LMARGIN", new_y="NEXT")
+    pdf.set_font(family, size=10)
+    areas = []
+    for text, rel in arbol_entries(arbol):
+        link = links.get(rel, "") if rel else ""
+        if rel in links:
+            areas.append((rel, pdf.page_no(), pdf.l_margin, pdf.get_y(), pdf.epw, 5))
+        pdf.cell(0, 5, _pdf_text(text, family == "Mono"), link=link or "", new_x="LMARGIN", new_y="NEXT")
+    return areas
 
-    pdf = FPDF()
-    pdf.set_auto_page_break(auto=True, margin=15)
-    pdf.set_font("Courier", size=10)
 
-    # Portada con árbol
-    pdf.add_page()
-    pdf.set_font("Courier", style="B", size=12)
-    pdf.multi_cell(0, 8, f"Resumen de archivos en:\n{base}\n",
-                   new_x="LMARGIN", new_y="NEXT")
-    pdf.set_font("Courier", size=10)
-    dibujar_arbol(pdf, arbol)
+def _draw_file(pdf: "FPDF", family: str, rel_path: str, text: str, new_page: bool = True):
+    if new_page:
+        pdf.add_page()
+    pdf.set_font(family, style="B", size=11)
+    pdf.multi_cell(0, 7, _pdf_text(f"{rel_path}\n", family == "Mono"), new_x="LMARGIN", new_y="NEXT")
+    pdf.set_font(family, size=9)
+    # La fuente es monoespaciada: el corte de líneas se calcula por número de
+    # caracteres y cada línea se escribe con text(), sin el motor de multi_cell,
+    # que mide carácter a carácter y domina el tiempo de exportación.
+    width = max(1, int(pdf.epw / pdf.get_string_width("M")))
+    line_h, bottom = 5, pdf.h - pdf.b_margin
+    baseline = line_h / 2 + 0.3 * pdf.font_size
+    y = pdf.get_y()
+    for line in _pdf_text(text.rstrip("\r\n"), family == "Mono").split("\n"):
+        for start in range(0, max(len(line), 1), width):
+            if y + line_h > bottom:
+                pdf.add_page()
+                y = pdf.t_margin
+            if line:
+                pdf.text(pdf.l_margin, y + baseline, line[start:start + width])
+            y += line_h
+    pdf.set_y(y)
 
-    # Contenido
+
+def render_pdf_fragment(batch, font_path: str = None):
+    """Renderiza un lote [(ruta, texto)] en un PDF aparte. Devuelve (bytes, [páginas por fichero])."""
+    pdf, family = _new_pdf(font_path)
+    pages = []
+    for rel_path, text in batch:
+        first = pdf.page_no() + 1
+        _draw_file(pdf, family, rel_path, text)
+        pages.append(pdf.page_no() - first + 1)
+    return bytes(pdf.output()), pages
+
+
+def _batches(files, size: int):
+    batch = []
     for rel_path, lines in files:
-        pdf.add_page()
-        pdf.set_font("Courier", style="B", size=11)
-        pdf.multi_cell(0, 7, f"{rel_path}\n", new_x="LMARGIN", new_y="NEXT")
-        pdf.set_font("Courier", size=9)
-        for ln in lines:
-            pdf.multi_cell(0, 5,
-                           ln.encode("latin-1", "replace").decode("latin-1"),
-                           new_x="LMARGIN", new_y="NEXT")
-
-    pdf.output(output)
+        batch.append((Path(rel_path).as_posix(), "".join(lines)))
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _outline_levels(rel_path: str, previous: str):
+    """Secciones (nombre, nivel) que abre `rel_path` respecto al fichero anterior."""
+    parts, prev_parts = rel_path.split("/"), previous.split("/")[:-1] if previous else []
+    common = 0
+    while common < min(len(parts) - 1, len(prev_parts)) and parts[common] == prev_parts[common]:
+        common += 1
+    return [(parts[i] + "/", i) for i in range(common, len(parts) - 1)] + [(parts[-1], len(parts) - 1)]
+
+
+def _export_pdf_single(base: Path, output: Path, arbol: dict, files, font_path):
+    # fpdf sólo enlaza a páginas ya asignadas: se mide la portada, se reserva
+    # su espacio y se dibuja al final, cuando se conoce la página de cada fichero.
+    probe, family = _new_pdf(font_path)
+    probe.add_page()
+    dibujar_arbol(probe, base, arbol, family, {})
+    cover_pages = probe.page_no()
+
+    pdf, family = _new_pdf(font_path)
+    starts = {}
+
+    def render_cover(pdf, outline):
+        links = {rel: pdf.add_link(page=page) for rel, page in starts.items()}
+        dibujar_arbol(pdf, base, arbol, family, links)
+
+    pdf.add_page()
+    pdf.insert_toc_placeholder(render_cover, pages=cover_pages, reset_page_indices=False)
+    previous = ""              # el marcador deja abierta una página vacía para el primer fichero
+    for rel_path, text in (item for batch in _batches(files, PDF_BATCH_FILES) for item in batch):
+        new_page = bool(previous)
+        starts[rel_path] = pdf.page_no() + new_page
+        for name, level in _outline_levels(rel_path, previous):
+            pdf.start_section(_pdf_text(name, family == "Mono"), level=level, strict=False)
+        _draw_file(pdf, family, rel_path, text, new_page)
+        previous = rel_path
+    pdf.output(str(output))
+
+
+def _export_pdf_parallel(base: Path, output: Path, arbol: dict, files, font_path, processes: int):
+    pdf, family = _new_pdf(font_path)
+    pdf.add_page()
+    areas = dibujar_arbol(pdf, base, arbol, family, {rel: None for _, rel in arbol_entries(arbol) if rel})
+    page_h = pdf.h
+    writer = PdfWriter()
+    writer.append(PdfReader(io.BytesIO(bytes(pdf.output()))))
+
+    starts = {}
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        pending = deque()
+
+        def collect():
+            batch, future = pending.popleft()
+            data, pages = future.result()
+            page = len(writer.pages)
+            writer.append(PdfReader(io.BytesIO(data)))
+            for (rel_path, _), count in zip(batch, pages):
+                starts[rel_path] = page
+                page += count
+
+        for batch in _batches(files, PDF_BATCH_FILES):
+            pending.append((batch, pool.submit(render_pdf_fragment, batch, font_path)))
+            if len(pending) >= processes * 2:
+                collect()
+        while pending:
+            collect()
+
+    # Índice de la portada: enlaces a la primera página de cada fichero
+    k = 72 / 25.4
+    for rel_path, page, x, y, w, h in areas:
+        if rel_path in starts:
+            writer.add_annotation(page - 1, Link(rect=(x * k, (page_h - y - h) * k, (x + w) * k, (page_h - y) * k),
+                                                 target_page_index=starts[rel_path]))
+
+    # Marcadores con la jerarquía de carpetas
+    parents, previous = {}, ""
+    for rel_path in sorted(starts, key=starts.get):
+        for name, level in _outline_levels(rel_path, previous):
+            parents[level] = writer.add_outline_item(name, starts[rel_path], parent=parents.get(level - 1))
+        previous = rel_path
+
+    with output.open("wb") as fh:
+        writer.write(fh)
+
+
+def export_pdf(base: Path, output: Path, arbol: dict, files, font: str = None, processes: int = PDF_PROCESSES):
+    """
+    PDF con portada (árbol enlazado a cada fichero), marcadores por carpeta y
+    el contenido de cada fichero. Con pypdf y más de un proceso, los ficheros
+    se renderizan por lotes en paralelo y se unen al final.
+    """
+    if FPDF is None:
+        raise RuntimeError("❗  Instala primero fpdf2 →  pip install fpdf2")
+
+    font_path = find_unicode_font(font)
+    if not font_path:
+        print("⚠️  Sin fuente TrueType monoespaciada: se usa Courier (sólo latin-1). Usa --font o FOLDERTOPDF_FONT.")
+    if processes > 1 and PdfWriter is not None:
+        _export_pdf_parallel(base, output, arbol, files, font_path, processes)
+    else:
+        _export_pdf_single(base, output, arbol, files, font_path)
     print(f"✅ PDF generado en {output}")
 
 
 # --------------------------------------------------------------------------- #
 # Exportar TXT
 # --------------------------------------------------------------------------- #
-def export_txt(output: Path, arbol: dict, files: list):
-    def arbol_txt(nodo, indent=0):
-        for k, v in sorted(nodo.items()):
-            if k == "__files__":
-                for f in sorted(v):
-                    yield " " * indent + f"- {f}"
-            else:
-                yield " " * indent + f"[{k}]/"
-                yield from arbol_txt(v, indent + 4)
+def arbol_txt(nodo: dict):
+    return (text for text, _ in arbol_entries(nodo))
+
+
+def txt_header(arbol: dict) -> str:
+    return "# Árbol de archivos\n" + "\n".join(arbol_txt(arbol)) + "\n\n# Contenido de archivos\n\n"
+
+
+def txt_chunk(rel_path, lines) -> str:
+    return f"## {rel_path}\n" + "".join(lines) + "\n"
 
+
+def export_txt(output: Path, arbol: dict, files):
     with output.open("w", encoding="utf-8") as fh:
-        fh.write("# Árbol de archivos\n")
-        fh.write("\n".join(arbol_txt(arbol)))
-        fh.write("\n\n# Contenido de archivos\n\n")
+        fh.write(txt_header(arbol))
         for rel_path, lines in files:
-            fh.write(f"## {rel_path}\n")
-            fh.writelines(lines)
-            fh.write("\n")
+            fh.write(txt_chunk(rel_path, lines))
     print(f"✅ TXT generado en {output}")
 
 
 # --------------------------------------------------------------------------- #
 # Exportar CSV
 # --------------------------------------------------------------------------- #
-def export_csv(output: Path, files: list):
+def _csv_text(rows) -> str:
+    buf = io.StringIO()
+    csv.writer(buf).writerows(rows)
+    return buf.getvalue()
+
+
+def csv_header(arbol: dict = None) -> str:
+    return _csv_text([["path", "line_no", "content"]])
+
+
+def csv_chunk(rel_path, lines) -> str:
+    return _csv_text([str(rel_path), i, ln.rstrip("\n")] for i, ln in enumerate(lines, 1))
+
+
+def export_csv(output: Path, files):
     with output.open("w", newline="", encoding="utf-8") as fh:
-        writer = csv.writer(fh)
-        writer.writerow(["path", "line_no", "content"])
+        fh.write(csv_header())
         for rel_path, lines in files:
-            for i, ln in enumerate(lines, 1):
-                writer.writerow([str(rel_path), i, ln.rstrip("\n")])
+            fh.write(csv_chunk(rel_path, lines))
     print(f"✅ CSV generado en {output}")
 
 
+# --------------------------------------------------------------------------- #
+# Exportación incremental (TXT / CSV)
+# --------------------------------------------------------------------------- #
+MANIFEST_VERSION = 1
+INCREMENTAL_FORMATS = {"txt": (txt_header, txt_chunk), "csv": (csv_header, csv_chunk)}
+
+
+def _load_manifest(manifest_path: Path, output: Path, fmt: str, max_size):
+    """Entradas del manifiesto anterior si sigue siendo válido para esta salida."""
+    try:
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+        valid = ((manifest["version"], manifest["format"], manifest["max_size"]) == (MANIFEST_VERSION, fmt, max_size)
+                 and output.stat().st_size == manifest["output_size"])
+        return manifest["files"] if valid else {}
+    except (OSError, ValueError, KeyError):
+        return {}
+
+
+def export_incremental(base: Path, output: Path, fmt: str, rules: IgnoreRules, include: IgnoreRules = None,
+                       jobs: int = READ_JOBS, max_size: int = None):
+    """
+    Exporta TXT o CSV reutilizando, de la salida anterior, el fragmento de
+    cada fichero que no ha cambiado. <salida>.manifest.json guarda por ruta
+    (tamaño, mtime, hash) y la posición de su fragmento en la salida. Un
+    fichero sólo se vuelve a leer si cambian su tamaño o su mtime, y sólo se
+    vuelve a generar su fragmento si además cambia su hash.
+    Devuelve {'reused', 'rendered', 'skipped'}.
+    """
+    header, render = INCREMENTAL_FORMATS[fmt]
+    # La salida TXT se escribía en modo texto: se respeta el fin de línea del sistema
+    linesep = os.linesep if fmt == "txt" else "\n"
+    manifest_path = output.with_name(output.name + ".manifest.json")
+    previous = _load_manifest(manifest_path, output, fmt, max_size)
+    prev_output = output.with_name(output.name + ".prev")
+    if previous:
+        os.replace(output, prev_output)
+
+    arbol, paths = walk_project(base, rules, include)
+
+    def encode(text: str) -> bytes:
+        return (text if linesep == "\n" else text.replace("\n", linesep)).encode("utf-8")
+
+    def prepare(rel_path: Path):
+        key = rel_path.as_posix()
+        try:
+            st = (base / rel_path).stat()
+        except OSError as e:
+            print(f"⚠️  No se pudo leer {base / rel_path}: {e}")
+            return key, None, None
+        prev = previous.get(key)
+        if prev and (prev["size"], prev["mtime_ns"]) == (st.st_size, st.st_mtime_ns):
+            return key, prev, None
+
+        entry = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "hash": None}
+        data = read_file_bytes(base, rel_path, max_size)
+        if data is None:
+            return key, entry, None
+        entry["hash"] = hashlib.sha1(data).hexdigest()
+        if prev and prev["hash"] == entry["hash"]:
+            return key, dict(prev, size=st.st_size, mtime_ns=st.st_mtime_ns), None
+        return key, entry, encode(render(rel_path, decode_lines(data)))
+
+    stats = {"reused": 0, "rendered": 0, "skipped": 0}
+    files = {}
+    try:
+        with output.open("wb") as fh, (prev_output.open("rb") if previous else io.BytesIO()) as old:
+            fh.write(encode(header(arbol)))
+            for key, entry, chunk in _ordered_map(prepare, paths, jobs, jobs * 4):
+                if entry is None:
+                    stats["skipped"] += 1
+                    continue
+                if entry["hash"] is None:
+                    stats["skipped"] += 1
+                elif chunk is None:
+                    old.seek(entry["offset"])
+                    chunk = old.read(entry["length"])
+                    stats["reused"] += 1
+                else:
+                    stats["rendered"] += 1
+                if chunk is not None:
+                    entry = dict(entry, offset=fh.tell(), length=len(chunk))
+                    fh.write(chunk)
+                files[key] = entry
+            output_size = fh.tell()
+    except BaseException:
+        if previous:
+            os.replace(prev_output, output)
+        raise
+    if previous:
+        prev_output.unlink()
+
+    tmp = manifest_path.with_name(manifest_path.name + ".tmp")
+    tmp.write_text(json.dumps({"version": MANIFEST_VERSION, "format": fmt, "max_size": max_size,
+                               "output_size": output_size, "files": files}), encoding="utf-8")
+    os.replace(tmp, manifest_path)
+    print(f"✅ {fmt.upper()} generado en {output} (incremental: {stats['reused']} reutilizados, "
+          f"{stats['rendered']} regenerados, {stats['skipped']} omitidos)")
+    return stats
+
+
+# --------------------------------------------------------------------------- #
+# Exportar SQLite (índice de búsqueda)
+# --------------------------------------------------------------------------- #
+SQLITE_VERSION = 1
+SQLITE_BATCH_LINES = 5000          # líneas por executemany
+LINE_BITS = 32                     # rowid de cada línea = id del fichero << 32 | nº de línea
+
+SQLITE_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value
+);
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    hash TEXT,                     -- NULL: omitido (binario, demasiado grande o ilegible)
+    line_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS lines USING fts5(
+    content,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+CREATE VIEW IF NOT EXISTS search AS
+    SELECT f.path, l.rowid & {(1 << LINE_BITS) - 1} AS line_no, l.content, l.rank
+    FROM lines l JOIN files f ON f.id = l.rowid >> {LINE_BITS};
+"""
+
+
+def _open_index(output: Path, max_size):
+    """Abre el índice existente si es de esta versión y con el mismo --max-size; si no, lo crea de cero."""
+    if output.exists():
+        try:
+            db = sqlite3.connect(output)
+            meta = dict(db.execute("SELECT key, value FROM meta"))
+            if (meta.get("version"), meta.get("max_size")) == (SQLITE_VERSION, max_size):
+                return db
+            db.close()
+        except sqlite3.DatabaseError:
+            db.close()
+        output.unlink()
+    db = sqlite3.connect(output)
+    db.executescript(SQLITE_SCHEMA)
+    db.executemany("INSERT INTO meta (key, value) VALUES (?, ?)",
+                   [("version", SQLITE_VERSION), ("max_size", max_size)])
+    db.commit()
+    return db
+
+
+def _delete_lines(db, file_id: int):
+    db.execute("DELETE FROM lines WHERE rowid BETWEEN ? AND ?",
+               (file_id << LINE_BITS, ((file_id + 1) << LINE_BITS) - 1))
+
+
+def export_sqlite(base: Path, output: Path, rules: IgnoreRules, include: IgnoreRules = None,
+                  jobs: int = READ_JOBS, max_size: int = None):
+    """
+    Vuelca el proyecto a una base SQLite: `files` (ruta, tamaño, mtime, hash)
+    y el índice FTS5 `lines` con una fila por línea. Si la salida ya existe se
+    actualiza en el sitio: sólo se leen los ficheros con otro tamaño o mtime,
+    sólo se reindexan los que además cambian de hash y se borran los que ya
+    no están. Se consulta con la vista `search`:
+
+        SELECT path, line_no, content FROM search WHERE content MATCH 'término';
+
+    Devuelve {'unchanged', 'indexed', 'skipped', 'removed'}.
+    """
+    db = _open_index(output, max_size)
+    previous = {path: (file_id, size, mtime_ns, digest) for file_id, path, size, mtime_ns, digest
+                in db.execute("SELECT id, path, size, mtime_ns, hash FROM files")}
+    _, paths = walk_project(base, rules, include)
+
+    def prepare(rel_path: Path):
+        key = rel_path.as_posix()
+        try:
+            st = (base / rel_path).stat()
+        except OSError as e:
+            print(f"⚠️  No se pudo leer {base / rel_path}: {e}")
+            return key, None, None, None
+        prev = previous.get(key)
+        if prev and prev[1:3] == (st.st_size, st.st_mtime_ns):
+            return key, st, prev[3], None
+        data = read_file_bytes(base, rel_path, max_size)
+        if data is None:
+            return key, st, None, None
+        digest = hashlib.sha1(data).hexdigest()
+        if prev and prev[3] == digest:
+            return key, st, digest, None
+        return key, st, digest, decode_lines(data)
+
+    stats = {"unchanged": 0, "indexed": 0, "skipped": 0, "removed": 0}
+    batch = []
+
+    def flush():
+        db.executemany("INSERT INTO lines (rowid, content) VALUES (?, ?)", batch)
+        batch.clear()
+
+    try:
+        db.execute("BEGIN")
+        for key, st, digest, lines in _ordered_map(prepare, paths, jobs, jobs * 4):
+            prev = previous.pop(key, None)
+            if st is None:
+                stats["skipped"] += 1
+                if prev:
+                    _delete_lines(db, prev[0])
+                    db.execute("DELETE FROM files WHERE id = ?", (prev[0],))
+                continue
+            if lines is None:
+                stats["unchanged" if digest and prev and prev[3] == digest else "skipped"] += 1
+                if prev and prev[3] != digest:  # antes se indexaba y ahora se omite
+                    _delete_lines(db, prev[0])
+                    db.execute("UPDATE files SET size = ?, mtime_ns = ?, hash = NULL, line_count = 0 WHERE id = ?",
+                               (st.st_size, st.st_mtime_ns, prev[0]))
+                elif prev:
+                    db.execute("UPDATE files SET size = ?, mtime_ns = ? WHERE id = ?",
+                               (st.st_size, st.st_mtime_ns, prev[0]))
+                else:
+                    db.execute("INSERT INTO files (path, size, mtime_ns, hash) VALUES (?, ?, ?, NULL)",
+                               (key, st.st_size, st.st_mtime_ns))
+                continue
+
+            stats["indexed"] += 1
+            if prev:
+                file_id = prev[0]
+                _delete_lines(db, file_id)
+                db.execute("UPDATE files SET size = ?, mtime_ns = ?, hash = ?, line_count = ? WHERE id = ?",
+                           (st.st_size, st.st_mtime_ns, digest, len(lines), file_id))
+            else:
+                file_id = db.execute("INSERT INTO files (path, size, mtime_ns, hash, line_count) VALUES (?, ?, ?, ?, ?)",
+                                     (key, st.st_size, st.st_mtime_ns, digest, len(lines))).lastrowid
+            first = file_id << LINE_BITS
+            batch.extend((first + i, line.rstrip("\r\n")) for i, line in enumerate(lines, 1))
+            if len(batch) >= SQLITE_BATCH_LINES:
+                flush()
+        flush()
+
+        for file_id, *_ in previous.values():  # ficheros que ya no existen o ya no se incluyen
+            _delete_lines(db, file_id)
+            db.execute("DELETE FROM files WHERE id = ?", (file_id,))
+            stats["removed"] += 1
+        db.commit()
+    except BaseException:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    print(f"✅ SQLite generado en {output} ({stats['indexed']} indexados, {stats['unchanged']} sin cambios, "
+          f"{stats['skipped']} omitidos, {stats['removed']} eliminados)")
+    return stats
+
+
+def search_index(output: Path, query: str, limit: int = 50):
+    """Busca en un índice generado por export_sqlite. Devuelve [(ruta, nº línea, línea)] por relevancia."""
+    db = sqlite3.connect(output)
+    try:
+        return db.execute("SELECT path, line_no, content FROM search WHERE content MATCH ? ORDER BY rank LIMIT ?",
+                          (query, limit)).fetchall()
+    finally:
+        db.close()
+
+
 # --------------------------------------------------------------------------- #
 # Programa principal
 # --------------------------------------------------------------------------- #
-def main():
-    print("📦 Convertidor universal  (PDF / TXT / CSV)\n")
+FORMATS = ("pdf", "txt", "csv", "sqlite")
+
+
+def parse_size(value: str) -> int:
+    """Tamaño en bytes con sufijo opcional K, M o G (p. ej. 512K, 2M)."""
+    value = value.strip().upper()
+    factor = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}.get(value[-1:], 1)
+    try:
+        return int(float(value.rstrip("KMGB") or 0) * factor)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"tamaño no válido: {value}")
+
+
+# Ficheros que se escriben junto a la salida: manifiesto y copia anterior del
+# modo incremental y diarios de SQLite
+OUTPUT_SIDECARS = (".manifest.json", ".manifest.json.tmp", ".prev", "-journal", "-wal", "-shm")
+
+
+def exclude_output(rules: IgnoreRules, base: Path, output: Path):
+    """Si la salida está dentro de la carpeta, la excluye (con sus ficheros auxiliares) del volcado."""
+    try:
+        rel = output.resolve().relative_to(base.resolve()).as_posix()
+    except ValueError:
+        return
+    for suffix in ("",) + OUTPUT_SIDECARS:
+        rules.add_path(rel + suffix)
+
+
+def export(base: Path, output: Path, fmt: str, includes=(), excludes=(), max_size: int = None,
+           jobs: int = READ_JOBS, incremental: bool = False, font: str = None, processes: int = PDF_PROCESSES):
+    rules = IgnoreRules.for_project(base, excludes)
+    exclude_output(rules, base, output)
+    include = IgnoreRules(includes) if includes else None
+    if fmt == "sqlite":
+        return export_sqlite(base, output, rules, include, jobs, max_size)
+    if incremental:
+        if fmt in INCREMENTAL_FORMATS:
+            return export_incremental(base, output, fmt, rules, include, jobs, max_size)
+        print("⚠️  El modo incremental sólo admite txt y csv; se exporta completo.")
+
+    arbol, paths = walk_project(base, rules, include)
+    files = iter_files(base, paths, jobs, max_size)
+    if fmt == "pdf":
+        export_pdf(base, output, arbol, files, font, processes)
+    elif fmt == "txt":
+        export_txt(output, arbol, files)
+    else:
+        export_csv(output, files)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Vuelca el contenido de una carpeta a PDF, TXT, CSV o SQLite. Sin argumentos pregunta los datos.")
+    parser.add_argument("path", help="carpeta del proyecto")
+    parser.add_argument("-o", "--output", help="fichero de salida (por defecto <carpeta>.<formato>)")
+    parser.add_argument("-f", "--format", choices=FORMATS,
+                        help="formato de salida (por defecto, el de la extensión de --output o txt)")
+    parser.add_argument("-i", "--include", action="append", default=[], metavar="PATRÓN",
+                        help="incluir sólo los ficheros que coinciden (estilo .gitignore, repetible)")
+    parser.add_argument("-e", "--exclude", action="append", default=[], metavar="PATRÓN",
+                        help="excluir además estos patrones (estilo .gitignore, repetible)")
+    parser.add_argument("--max-size", type=parse_size, metavar="TAMAÑO",
+                        help="omitir ficheros más grandes (admite K, M, G)")
+    parser.add_argument("-j", "--jobs", type=int, default=READ_JOBS, help=f"hilos de lectura (por defecto {READ_JOBS})")
+    parser.add_argument("--incremental", action="store_true",
+                        help="reutilizar lo generado en la ejecución anterior para los ficheros sin cambios (txt/csv; sqlite siempre se actualiza)")
+    parser.add_argument("--font", metavar="TTF",
+                        help="fuente TrueType monoespaciada para el PDF (por defecto FOLDERTOPDF_FONT o DejaVu Sans Mono)")
+    parser.add_argument("-p", "--processes", type=int, default=PDF_PROCESSES,
+                        help=f"procesos que renderizan el PDF (por defecto {PDF_PROCESSES}; 1 = sin pypdf)")
+    return parser
+
+
+def interactive():
+    print("📦 Convertidor universal  (PDF / TXT / CSV / SQLite)\n")
 
     # ── Ejemplo visible ────────────────────────────────────────────────────
     print("Ejemplo rápido:")
@@ -150,26 +868,48 @@ def main():
     base = Path(ruta).expanduser().resolve()
     if not base.is_dir():
         print("❌  Ruta no válida.")
-        return
+        return 1
 
     out_name = input("💾 Nombre de salida (sin extensión): ").strip()
-    fmt = input("📄 Formato (pdf / txt / csv): ").lower().strip()
+    fmt = input("📄 Formato (pdf / txt / csv / sqlite): ").lower().strip()
+    if fmt not in FORMATS:
+        print("⚠️  Formato no reconocido. Elige pdf, txt, csv o sqlite.")
+        return 1
 
-    arbol, files = scan_project(base)
-    output = Path.cwd() / f"{out_name}.{fmt}"
+    try:
+        export(base, Path.cwd() / f"{out_name}.{fmt}", fmt)
+    except Exception as e:
+        print(f"❌  Error generando salida: {e}")
+        return 1
+    return 0
 
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        return interactive()
+
+    args = build_parser().parse_args(argv)
+    base = Path(args.path).expanduser().resolve()
+    if not base.is_dir():
+        print(f"❌  Ruta no válida: {base}")
+        return 1
+    fmt = args.format or (Path(args.output).suffix.lstrip(".").lower() if args.output else "txt")
+    if fmt not in FORMATS:
+        print(f"⚠️  Formato no reconocido: {fmt}. Elige pdf, txt, csv o sqlite.")
+        return 1
+    output = Path(args.output) if args.output else Path.cwd() / f"{base.name}.{fmt}"
+
+    start = time.perf_counter()
     try:
-        if fmt == "pdf":
-            export_pdf(base, output, arbol, files)
-        elif fmt == "txt":
-            export_txt(output, arbol, files)
-        elif fmt == "csv":
-            export_csv(output, files)
-        else:
-            print("⚠️  Formato no reconocido. Elige pdf, txt o csv.")
+        export(base, output, fmt, args.include, args.exclude, args.max_size, args.jobs, args.incremental,
+               args.font, args.processes)
     except Exception as e:
         print(f"❌  Error generando salida: {e}")
+        return 1
+    print(f"⏱️  {time.perf_counter() - start:.2f}s")
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,49 @@
+"""
+Configuración de gunicorn: gunicorn -c gunicorn.conf.py
+
+Con preload_app el proceso maestro importa la aplicación y ejecuta
+create_app() una sola vez (recursos estáticos, creación o migración de la BD,
+plantillas) antes de bifurcar los workers, que comparten esas páginas de
+memoria copy-on-write en lugar de repetir cada uno la importación.
+
+Sin preload (GUNICORN_PRELOAD=0) cada worker importa `app:app` por su cuenta
+y la BD y los recursos tienen que estar preparados de antemano
+(`flask migrate-db`, `flask build-assets`).
+"""
+
+import gc
+import importlib
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('GUNICORN_WORKERS', 4))
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+wsgi_app = 'app:create_app(build_static=True)' if preload_app else 'app:app'
+
+# La aplicación importa estos módulos de forma diferida (sólo los usan las
+# descargas de metadatos, las miniaturas y la comprobación de enlaces). Con
+# preload se cargan en el maestro para que los workers no tengan cada uno su copia.
+PRELOAD_MODULES = ('requests', 'PIL.Image', 'PIL.ImageOps')
+
+# El mismo directorio de métricas que usa app.py (sin preload el maestro no importa la aplicación)
+METRICS_DIR = os.environ.get('METRICS_DIR', os.path.join(
+    os.path.dirname(os.environ.get('LINKMANAGER_DATABASE', os.path.join('database', 'database.db'))), 'metrics'))
+
+
+def when_ready(server):
+    if not server.cfg.preload_app:
+        return
+    for module in PRELOAD_MODULES:
+        try:
+            importlib.import_module(module)
+        except ImportError:
+            pass
+    # Los objetos del maestro quedan fuera del recolector de ciclos: al
+    # recorrerlos los workers escribirían en sus páginas y las copiarían
+    gc.freeze()
+
+
+def child_exit(server, worker):
+    # Las métricas del worker terminado pasan a retired.json y se borra su fichero
+    import metrics
+    metrics.Registry(METRICS_DIR).retire(worker.pid)
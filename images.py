@@ -0,0 +1,191 @@
+"""
+Almacenamiento de imágenes direccionado por contenido y miniaturas WebP.
+
+Las imágenes subidas se guardan como `uploads/<sha256>.<ext>` y las
+miniaturas como `thumbs/<sha256>.webp`, de modo que dos entradas con la misma
+imagen comparten el fichero y, como el nombre cambia si cambia el contenido,
+pueden servirse con caché inmutable.
+
+Las miniaturas necesitan Pillow; si no está instalado no se generan y las
+tarjetas siguen usando la imagen original.
+"""
+
+import hashlib
+import io
+import os
+import shutil
+import time
+from importlib.util import find_spec
+from urllib.parse import urlparse
+
+from metadata import USER_AGENT, host_limiter
+from metrics import observe_fetch
+
+# Pillow se importa al generar la primera miniatura, no al arrancar
+THUMBNAILS_ENABLED = find_spec('PIL') is not None
+
+# Tamaño de las miniaturas: la tarjeta mide ~320-400 x 180 px, el doble cubre pantallas HiDPI
+THUMB_WIDTH = int(os.environ.get('THUMB_WIDTH', 640))
+THUMB_HEIGHT = int(os.environ.get('THUMB_HEIGHT', 360))
+THUMB_QUALITY = int(os.environ.get('THUMB_QUALITY', 80))
+
+# Límite de descarga de og:image remotas
+IMAGE_MAX_BYTES = int(os.environ.get('IMAGE_MAX_BYTES', 10 * 1024 * 1024))
+
+
+def content_hash(data, salt=b''):
+    return hashlib.sha256(salt + data).hexdigest()[:32]
+
+
+def _write_once(path, data):
+    """Escribe el fichero sólo si no existe (mismo nombre = mismo contenido)."""
+    if os.path.exists(path):
+        os.utime(path)  # vuelve a ser reciente: la recolección de huérfanos no lo tocará
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def store_upload(file_storage, static_folder, extension):
+    """Guarda una imagen subida por su hash. Devuelve la ruta relativa a static."""
+    data = file_storage.read()
+    relative = f"uploads/{content_hash(data)}.{extension.lower()}"
+    _write_once(os.path.join(static_folder, relative), data)
+    return relative
+
+
+def make_thumbnail(data):
+    """Redimensiona y recorta la imagen al tamaño de tarjeta y la codifica en WebP."""
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as img:
+        img = ImageOps.exif_transpose(img)
+        img = img.convert('RGBA' if img.mode in ('RGBA', 'LA', 'P') else 'RGB')
+        img = ImageOps.fit(img, (THUMB_WIDTH, THUMB_HEIGHT), Image.LANCZOS)
+        out = io.BytesIO()
+        img.save(out, 'WEBP', quality=THUMB_QUALITY, method=4)
+    return out.getvalue()
+
+
+def store_thumbnail(data, static_folder):
+    """
+    Genera (si no existe ya) la miniatura de `data`. El nombre depende del
+    contenido original y del tamaño, así que no hace falta recodificar una
+    imagen repetida. Devuelve la ruta relativa a static.
+    """
+    salt = f"{THUMB_WIDTH}x{THUMB_HEIGHT}q{THUMB_QUALITY}:".encode()
+    relative = f"thumbs/{content_hash(data, salt)}.webp"
+    path = os.path.join(static_folder, relative)
+    if not os.path.exists(path):
+        _write_once(path, make_thumbnail(data))
+    return relative
+
+
+def fetch_remote_image(url):
+    """Descarga una imagen remota respetando el límite por host. Lanza excepción si falla."""
+    import requests
+
+    host = urlparse(url).hostname or ''
+    host_limiter.acquire(host)
+    start, outcome = time.perf_counter(), 'error'
+    try:
+        with requests.get(url, headers={'User-Agent': USER_AGENT}, timeout=10, stream=True) as response:
+            response.raise_for_status()
+            content_type = response.headers.get('Content-Type', '')
+            if content_type and not content_type.startswith('image/'):
+                raise ValueError(f"tipo de contenido no soportado: {content_type}")
+            chunks, size = [], 0
+            for chunk in response.iter_content(64 * 1024):
+                size += len(chunk)
+                if size > IMAGE_MAX_BYTES:
+                    raise ValueError("imagen demasiado grande")
+                chunks.append(chunk)
+            outcome = 'ok'
+            return b''.join(chunks)
+    finally:
+        host_limiter.release(host)
+        observe_fetch('image', time.perf_counter() - start, outcome)
+
+
+def load_image_bytes(image_url, static_folder):
+    """Lee la imagen original de una entrada, local (uploads/) o remota (http)."""
+    if image_url.startswith('uploads/'):
+        with open(os.path.join(static_folder, image_url), 'rb') as f:
+            return f.read()
+    return fetch_remote_image(image_url)
+
+
+# --- Recolección de ficheros huérfanos ---
+IMAGE_DIRS = ('uploads', 'thumbs')
+
+
+def _referenced(db, paths):
+    """Subconjunto de `paths` que alguna entrada referencia (consultas por índice)."""
+    placeholders = ','.join('?' * len(paths))
+    rows = db.execute(f"""SELECT image_url FROM link_entries WHERE image_url IN ({placeholders})
+                          UNION SELECT thumbnail_url FROM link_entries WHERE thumbnail_url IN ({placeholders})""",
+                      list(paths) * 2)
+    return {row[0] for row in rows}
+
+
+def iter_image_files(static_folder):
+    """Recorre uploads/ y thumbs/ devolviendo (ruta relativa, DirEntry)."""
+    for directory in IMAGE_DIRS:
+        root = os.path.join(static_folder, directory)
+        if not os.path.isdir(root):
+            continue
+        with os.scandir(root) as it:
+            for entry in it:
+                if entry.is_file() and not entry.name.endswith('.tmp') and not entry.name.startswith('.'):
+                    yield f"{directory}/{entry.name}", entry
+
+
+def collect_orphans(db, static_folder, quarantine_dir=None, min_age=3600, batch_size=500, dry_run=False):
+    """
+    Borra (o mueve a `quarantine_dir`) los ficheros de uploads/ y thumbs/ que
+    ninguna entrada referencia. Las referencias se comprueban por lotes justo
+    antes de actuar y se ignoran los ficheros más recientes que `min_age`
+    segundos, que pueden pertenecer a una subida aún sin confirmar.
+
+    Devuelve {'scanned', 'orphans', 'bytes', 'errors'}.
+    """
+    report = {'scanned': 0, 'orphans': 0, 'bytes': 0, 'errors': 0}
+    cutoff = time.time() - min_age
+    batch = []
+
+    def flush():
+        referenced = _referenced(db, [path for path, _ in batch])
+        for path, size in batch:
+            if path in referenced:
+                continue
+            source = os.path.join(static_folder, path)
+            try:
+                if not dry_run:
+                    if quarantine_dir:
+                        target = os.path.join(quarantine_dir, path)
+                        os.makedirs(os.path.dirname(target), exist_ok=True)
+                        shutil.move(source, target)
+                    else:
+                        os.remove(source)
+            except OSError as e:
+                print(f"Error al eliminar imagen huérfana {path}: {e}")
+                report['errors'] += 1
+                continue
+            report['orphans'] += 1
+            report['bytes'] += size
+        batch.clear()
+
+    for path, entry in iter_image_files(static_folder):
+        report['scanned'] += 1
+        stat = entry.stat()
+        if stat.st_mtime > cutoff:
+            continue
+        batch.append((path, stat.st_size))
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    return report
@@ -0,0 +1,230 @@
+"""
+Importación masiva de marcadores.
+
+Formatos aceptados:
+    • HTML de marcadores de Netscape (exportación de Chrome/Firefox/Edge)
+    • JSON  – lista de {title, url, description, section} o el fichero
+              "Bookmarks" de Chrome ({"roots": {...}})
+    • CSV   – columnas section, title, url, description
+
+Cada marcador se convierte en una entrada con un único enlace externo. Las
+inserciones se agrupan en lotes con executemany, una transacción por lote.
+"""
+
+import csv
+import io
+import json
+from html.parser import HTMLParser
+
+from migrations import NEW_ENTRY_ORDER_KEY, NEW_SECTION_ORDER_KEY
+
+DEFAULT_SECTION = 'Importados'
+IMPORT_BATCH_SIZE = 500
+
+
+def _record(title, url, description='', section=None):
+    url = (url or '').strip()
+    if not url:
+        return None
+    return {
+        'title': (title or '').strip() or url,
+        'url': url,
+        'description': (description or '').strip(),
+        'section': (section or '').strip() or DEFAULT_SECTION,
+    }
+
+
+# --------------------------------------------------------------------------- #
+# Parsers
+# --------------------------------------------------------------------------- #
+class _NetscapeParser(HTMLParser):
+    """Recorre <DL>/<DT><H3>/<DT><A> manteniendo la pila de carpetas."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.records = []
+        self.folders = []
+        self._pending_folder = None
+        self._capture = None
+        self._text = []
+        self._href = None
+
+    def handle_starttag(self, tag, attrs):
+        # <DD> no tiene cierre: termina al empezar la siguiente etiqueta <DT>
+        if tag == 'dt' and self._capture == 'description':
+            self._finish_description()
+        if tag == 'h3':
+            self._capture, self._text = 'folder', []
+        elif tag == 'a':
+            self._capture, self._text = 'link', []
+            self._href = dict(attrs).get('href')
+        elif tag == 'dd' and self.records:
+            self._capture, self._text = 'description', []
+        elif tag == 'dl':
+            self.folders.append(self._pending_folder)
+            self._pending_folder = None
+
+    def handle_endtag(self, tag):
+        if tag == 'h3' and self._capture == 'folder':
+            self._pending_folder = ''.join(self._text).strip()
+            self._capture = None
+        elif tag == 'a' and self._capture == 'link':
+            section = next((f for f in reversed(self.folders) if f), None)
+            record = _record(''.join(self._text), self._href, section=section)
+            if record and record['url'].startswith(('http://', 'https://')):
+                self.records.append(record)
+            self._capture = None
+        elif tag == 'dl':
+            if self._capture == 'description':
+                self._finish_description()
+            if self.folders:
+                self.folders.pop()
+
+    def handle_data(self, data):
+        if self._capture:
+            self._text.append(data)
+
+    def _finish_description(self):
+        self.records[-1]['description'] = ''.join(self._text).strip()
+        self._capture = None
+
+
+def parse_netscape(text):
+    parser = _NetscapeParser()
+    parser.feed(text)
+    parser.close()
+    return parser.records
+
+
+def _walk_chrome(node, folder):
+    if node.get('type') == 'url':
+        record = _record(node.get('name'), node.get('url'), section=folder)
+        if record:
+            yield record
+    for child in node.get('children', []):
+        yield from _walk_chrome(child, node.get('name') if node.get('type') == 'folder' else folder)
+
+
+def parse_json(text):
+    """
+    Acepta una lista de marcadores, un objeto con esa lista en `bookmarks` o
+    `entries`, o el fichero Bookmarks de Chrome (`{"roots": {...}}`).
+    """
+    data = json.loads(text)
+    if isinstance(data, dict) and 'roots' in data:
+        if not isinstance(data['roots'], dict):
+            raise ValueError("'roots' debe ser un objeto")
+        records = []
+        for root in data['roots'].values():
+            if isinstance(root, dict):
+                records.extend(_walk_chrome(root, None))
+        return records
+    if isinstance(data, dict):
+        data = data.get('bookmarks') or data.get('entries') or []
+    if not isinstance(data, list):
+        raise ValueError("el JSON debe ser una lista de marcadores o un objeto con 'bookmarks', 'entries' o 'roots'")
+    records = []
+    for item in data:
+        if not isinstance(item, dict):
+            continue
+        record = _record(item.get('title') or item.get('name'), item.get('url') or item.get('href'),
+                         item.get('description', ''), item.get('section') or item.get('folder'))
+        if record:
+            records.append(record)
+    return records
+
+
+def parse_csv(text):
+    reader = csv.DictReader(io.StringIO(text))
+    records = []
+    for row in reader:
+        row = {(k or '').strip().lower(): v for k, v in row.items()}
+        record = _record(row.get('title') or row.get('name'), row.get('url') or row.get('link'),
+                         row.get('description', ''), row.get('section') or row.get('folder'))
+        if record:
+            records.append(record)
+    return records
+
+
+PARSERS = {'html': parse_netscape, 'json': parse_json, 'csv': parse_csv}
+
+
+def detect_format(filename, text):
+    ext = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    if ext in ('html', 'htm'):
+        return 'html'
+    if ext in PARSERS:
+        return ext
+    head = text.lstrip()[:200].lower()
+    if head.startswith(('{', '[')):
+        return 'json'
+    if '<!doctype netscape-bookmark' in head or '<dl' in head:
+        return 'html'
+    return 'csv'
+
+
+def parse_bookmarks(text, fmt):
+    if fmt not in PARSERS:
+        raise ValueError(f"Formato de importación no soportado: {fmt}")
+    return PARSERS[fmt](text)
+
+
+# --------------------------------------------------------------------------- #
+# Inserción por lotes
+# --------------------------------------------------------------------------- #
+def insert_sections(db, names):
+    """Crea las secciones que falten y devuelve {nombre: id}."""
+    db.executemany(f"INSERT OR IGNORE INTO sections (name, order_index) VALUES (?, {NEW_SECTION_ORDER_KEY})",
+                   [(n,) for n in sorted(set(names))])
+    return {row['name']: row['id'] for row in db.execute("SELECT id, name FROM sections")}
+
+
+class ImportInterrupted(Exception):
+    """Error a mitad de una importación. `created` son las entradas de los lotes ya confirmados."""
+
+    def __init__(self, error, created):
+        super().__init__(str(error))
+        self.error = error
+        self.created = created
+
+
+def import_records(db, records, section_override=None, batch_size=IMPORT_BATCH_SIZE, bump=None):
+    """
+    Inserta los marcadores en `link_entries`/`entry_urls` y devuelve la lista
+    de (entry_id, url) creadas, para obtener después sus metadatos. Cada lote
+    se confirma por separado; `bump(db)` se llama antes de cada commit (la
+    aplicación marca así los datos como modificados). Si un lote falla se lanza
+    ImportInterrupted con lo ya confirmado.
+    """
+    if section_override:
+        for record in records:
+            record['section'] = section_override
+
+    def commit():
+        if bump is not None:
+            bump(db)
+        db.commit()
+
+    created = []
+    try:
+        section_ids = insert_sections(db, [r['section'] for r in records])
+        commit()
+        for start in range(0, len(records), batch_size):
+            batch = records[start:start + batch_size]
+            db.executemany(
+                f"""INSERT INTO link_entries (title, description, section_id, metadata_status, order_index)
+                    VALUES (?, ?, ?, 'pending', {NEW_ENTRY_ORDER_KEY})""",
+                [(r['title'], r['description'], section_ids[r['section']], section_ids[r['section']]) for r in batch])
+            # Con AUTOINCREMENT y el bloqueo de escritura de la transacción,
+            # los ids del lote son consecutivos y terminan en last_insert_rowid()
+            last_id = db.execute("SELECT last_insert_rowid()").fetchone()[0]
+            entry_ids = range(last_id - len(batch) + 1, last_id + 1)
+            db.executemany(
+                "INSERT INTO entry_urls (link_entry_id, label, link_type, value) VALUES (?, '', 'external_url', ?)",
+                [(entry_id, r['url']) for entry_id, r in zip(entry_ids, batch)])
+            commit()
+            created.extend((entry_id, r['url']) for entry_id, r in zip(entry_ids, batch))
+    except Exception as e:
+        db.rollback()
+        raise ImportInterrupted(e, created) from e
+    return created
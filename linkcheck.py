@@ -0,0 +1,187 @@
+"""
+Comprobación de la salud de los enlaces (entry_urls).
+
+Cada enlace se resuelve a una o varias URLs objetivo: las externas tal cual,
+las `internal_app` contra cada dominio configurado (público, LAN, local) y los
+subdominios contra el dominio público. Las URLs repetidas se comprueban una
+sola vez con un HEAD (GET si el servidor no admite HEAD) desde un pool de
+hilos, con un límite de peticiones simultáneas por host y una sesión HTTP por
+hilo para reutilizar las conexiones; las sesiones se cierran al terminar cada
+comprobación.
+
+El último resultado de cada enlace y entorno se guarda en `link_status` y
+todos los resultados en el histórico `link_checks`.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from metadata import USER_AGENT, HostRateLimiter
+from metrics import observe_fetch
+
+LINKCHECK_WORKERS = int(os.environ.get('LINKCHECK_WORKERS', 32))
+LINKCHECK_TIMEOUT = float(os.environ.get('LINKCHECK_TIMEOUT', 5))
+LINKCHECK_HOST_CONCURRENCY = int(os.environ.get('LINKCHECK_HOST_CONCURRENCY', 8))
+LINKCHECK_HISTORY_DAYS = int(os.environ.get('LINKCHECK_HISTORY_DAYS', 30))
+
+# Códigos con los que se repite la comprobación con GET: servidores que no implementan HEAD
+_RETRY_WITH_GET = {403, 404, 405, 501}
+
+
+def _session(pool_size):
+    import requests  # diferido: sólo lo cargan los procesos que comprueban enlaces
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    session.headers['User-Agent'] = USER_AGENT
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def resolve_targets(link_type, value, domains):
+    """Devuelve [(entorno, url)] a comprobar para un enlace."""
+    value = (value or '').strip()
+    if not value:
+        return []
+    if link_type == 'external_url':
+        return [('external', value if value.startswith(('http://', 'https://')) else 'http://' + value)]
+    targets = []
+    for environment in ('public', 'lan', 'local'):
+        base = domains.get(environment)
+        if not base:
+            continue
+        parsed = urlparse(base)
+        if not parsed.hostname:
+            continue
+        if link_type == 'internal_app':
+            targets.append((environment, f"{parsed.scheme}://{parsed.hostname}:{value}"))
+        elif link_type == 'subdomain' and environment == 'public':
+            port = f":{parsed.port}" if parsed.port else ''
+            targets.append((environment, f"{parsed.scheme}://{value}.{parsed.hostname}{port}"))
+    return targets
+
+
+def probe(session, url, timeout=LINKCHECK_TIMEOUT):
+    """Comprueba una URL con `session`. Devuelve {'ok', 'status_code', 'latency_ms', 'error'}."""
+    import requests
+
+    start = time.perf_counter()
+    try:
+        response = session.head(url, timeout=timeout, allow_redirects=True)
+        if response.status_code in _RETRY_WITH_GET:
+            with session.get(url, timeout=timeout, allow_redirects=True, stream=True) as response:
+                pass
+        result = {'ok': response.status_code < 400, 'status_code': response.status_code,
+                  'latency_ms': (time.perf_counter() - start) * 1000, 'error': None}
+    except requests.RequestException as e:
+        result = {'ok': False, 'status_code': None,
+                  'latency_ms': (time.perf_counter() - start) * 1000, 'error': type(e).__name__}
+    observe_fetch('linkcheck', result['latency_ms'] / 1000, 'ok' if result['ok'] else 'error')
+    return result
+
+
+def check_urls(urls, workers=LINKCHECK_WORKERS, timeout=LINKCHECK_TIMEOUT, host_concurrency=LINKCHECK_HOST_CONCURRENCY):
+    """Comprueba en paralelo un conjunto de URLs (sin repetidas). Devuelve {url: resultado}."""
+    limiter = HostRateLimiter(concurrency=host_concurrency, interval=0)
+    local = threading.local()
+    sessions = []
+    sessions_lock = threading.Lock()
+
+    def init_worker():
+        local.session = _session(host_concurrency)
+        with sessions_lock:
+            sessions.append(local.session)
+
+    def run(url):
+        host = urlparse(url).hostname or ''
+        limiter.acquire(host)
+        try:
+            return url, probe(local.session, url, timeout)
+        finally:
+            limiter.release(host)
+
+    # Intercalar los hosts evita que todos los hilos esperen al mismo semáforo
+    by_host = {}
+    for url in urls:
+        by_host.setdefault(urlparse(url).hostname or '', []).append(url)
+    interleaved = [url for group in _round_robin(list(by_host.values())) for url in group]
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='linkcheck', initializer=init_worker) as pool:
+            return dict(pool.map(run, interleaved))
+    finally:
+        for session in sessions:
+            session.close()
+
+
+def _round_robin(groups):
+    while groups:
+        yield [group.pop() for group in groups]
+        groups = [group for group in groups if group]
+
+
+def run_link_check(db, domains, url_ids=None, **options):
+    """
+    Comprueba todos los enlaces (o sólo `url_ids`) y guarda los resultados.
+    Se borra el estado de los enlaces y entornos del mismo alcance que ya no
+    hay que comprobar (enlaces borrados o dominios quitados de la configuración).
+    Devuelve {'links', 'targets', 'ok', 'failed', 'seconds'}.
+    """
+    query = "SELECT id, link_type, value FROM entry_urls"
+    status_query = "SELECT url_id, environment FROM link_status"
+    params = []
+    if url_ids:
+        query += f" WHERE id IN ({','.join('?' * len(url_ids))})"
+        status_query += f" WHERE url_id IN ({','.join('?' * len(url_ids))})"
+        params = list(url_ids)
+    links = db.execute(query, params).fetchall()
+
+    start = time.perf_counter()
+    plan = [(row['id'], environment, target) for row in links
+            for environment, target in resolve_targets(row['link_type'], row['value'], domains)]
+    results = check_urls({target for _, _, target in plan}, **options)
+    checked_at = time.time()
+
+    rows = [(url_id, environment, target, int(results[target]['ok']), results[target]['status_code'],
+             results[target]['latency_ms'], results[target]['error'], checked_at)
+            for url_id, environment, target in plan]
+    db.executemany("""INSERT INTO link_checks (url_id, environment, target, ok, status_code, latency_ms, error, checked_at)
+                      VALUES (?, ?, ?, ?, ?, ?, ?, ?)""", rows)
+    db.executemany("""INSERT OR REPLACE INTO link_status (url_id, environment, target, ok, status_code, latency_ms, error, checked_at)
+                      VALUES (?, ?, ?, ?, ?, ?, ?, ?)""", rows)
+    planned = {(url_id, environment) for url_id, environment, _ in plan}
+    stale = [tuple(row) for row in db.execute(status_query, params) if tuple(row) not in planned]
+    db.executemany("DELETE FROM link_status WHERE url_id = ? AND environment = ?", stale)
+    # Como en el trigger de link_status: la tarjeta cambia al desaparecer el estado
+    db.executemany("""UPDATE link_entries SET version = -1
+                      WHERE id = (SELECT link_entry_id FROM entry_urls WHERE id = ?) AND version != -1""",
+                   {(url_id,) for url_id, _ in stale})
+    if LINKCHECK_HISTORY_DAYS:
+        db.execute("DELETE FROM link_checks WHERE checked_at < ?", (checked_at - LINKCHECK_HISTORY_DAYS * 86400,))
+
+    ok = sum(1 for result in results.values() if result['ok'])
+    return {'links': len(links), 'targets': len(results), 'ok': ok, 'failed': len(results) - ok,
+            'seconds': time.perf_counter() - start}
+
+
+def load_link_status(db, url_ids=None):
+    """Último estado de cada enlace: {url_id: {'state', 'checks'}}."""
+    query = "SELECT * FROM link_status"
+    params = []
+    if url_ids is not None:
+        if not url_ids:
+            return {}
+        query += f" WHERE url_id IN ({','.join('?' * len(url_ids))})"
+        params = list(url_ids)
+    health = {}
+    for row in db.execute(query, params):
+        health.setdefault(row['url_id'], {'checks': []})['checks'].append(dict(row))
+    for item in health.values():
+        up = sum(check['ok'] for check in item['checks'])
+        item['state'] = 'up' if up == len(item['checks']) else ('down' if not up else 'partial')
+    return health
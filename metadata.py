@@ -0,0 +1,370 @@
+"""
+Obtención de metadatos (título, descripción, og:image) de páginas externas
+con una caché persistente en SQLite indexada por la URL normalizada.
+
+La caché guarda ETag/Last-Modified para refrescar con peticiones condicionales
+y también los errores (caché negativa), de modo que las importaciones masivas
+no vuelvan a descargar ni a parsear la misma página una y otra vez.
+"""
+
+import codecs
+import os
+import re
+import threading
+import time
+from concurrent.futures import Future
+from html.parser import HTMLParser
+from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
+
+from metrics import observe_fetch
+
+# Tiempo de vida (segundos) de una entrada válida y de un error en la caché
+METADATA_CACHE_TTL = int(os.environ.get('METADATA_CACHE_TTL', 7 * 24 * 3600))
+METADATA_NEGATIVE_TTL = int(os.environ.get('METADATA_NEGATIVE_TTL', 15 * 60))
+
+# Máximo de bytes que se leen de una página buscando el final de <head>
+METADATA_MAX_BYTES = int(os.environ.get('METADATA_MAX_BYTES', 512 * 1024))
+METADATA_CHUNK_SIZE = 16 * 1024
+
+# Límites por host: peticiones simultáneas y separación mínima (segundos) entre ellas
+METADATA_HOST_CONCURRENCY = int(os.environ.get('METADATA_HOST_CONCURRENCY', 2))
+METADATA_HOST_INTERVAL = float(os.environ.get('METADATA_HOST_INTERVAL', 0.25))
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+# Candados de la caché de cada URL: sólo protegen su lectura y escritura, nunca
+# la descarga. Son un número fijo (la URL elige uno por su hash) para no
+# guardar uno por cada URL descargada durante la vida del proceso.
+URL_LOCK_STRIPES = 64
+_url_locks = [threading.Lock() for _ in range(URL_LOCK_STRIPES)]
+
+# Descargas en curso por URL normalizada: quien pide una URL que ya se está
+# descargando espera ese resultado en vez de lanzar otra petición.
+_in_flight = {}
+_in_flight_lock = threading.Lock()
+
+
+class HostRateLimiter:
+    """Limita la concurrencia y la frecuencia de peticiones a cada host."""
+
+    def __init__(self, concurrency=METADATA_HOST_CONCURRENCY, interval=METADATA_HOST_INTERVAL):
+        self.concurrency = concurrency
+        self.interval = interval
+        self._guard = threading.Lock()
+        self._semaphores = {}
+        self._next_slot = {}
+
+    def _semaphore(self, host):
+        with self._guard:
+            sem = self._semaphores.get(host)
+            if sem is None:
+                sem = self._semaphores[host] = threading.BoundedSemaphore(self.concurrency)
+            return sem
+
+    def acquire(self, host):
+        self._semaphore(host).acquire()
+        with self._guard:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, 0.0))
+            self._next_slot[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+    def release(self, host):
+        self._semaphore(host).release()
+
+
+host_limiter = HostRateLimiter()
+
+
+def normalize_url(url):
+    """Normaliza una URL para usarla como clave de caché."""
+    url = url.strip()
+    if not url.startswith(('http://', 'https://')):
+        url = 'http://' + url
+    parsed = urlparse(url)
+    scheme = parsed.scheme.lower()
+    host = (parsed.hostname or '').lower()
+    port = parsed.port
+    netloc = host
+    if port and not ((scheme == 'http' and port == 80) or (scheme == 'https' and port == 443)):
+        netloc = f"{host}:{port}"
+    query = urlencode(sorted(parse_qsl(parsed.query, keep_blank_values=True)))
+    return urlunparse((scheme, netloc, parsed.path or '/', '', query, ''))
+
+
+# Contenido que no cuenta como cabecera (p. ej. el <img> de seguimiento de un <noscript>)
+_IGNORED_CONTAINERS = {'noscript', 'template'}
+
+# Bytes del principio del documento en los que se busca la codificación, como
+# el preescaneo de HTML5: <meta charset> o <meta http-equiv="Content-Type">
+CHARSET_SNIFF_BYTES = 1024
+_META_CHARSET = re.compile(rb'<meta[^>]*?charset\s*=\s*["\']?\s*([A-Za-z0-9_.:-]+)', re.IGNORECASE)
+_BOMS = ((codecs.BOM_UTF8, 'utf-8-sig'), (codecs.BOM_UTF16_LE, 'utf-16'), (codecs.BOM_UTF16_BE, 'utf-16'))
+
+
+def sniff_encoding(head, declared=None):
+    """
+    Codificación de un documento a partir de sus primeros bytes: BOM, la
+    declarada en la cabecera HTTP (`declared`), la de <meta> y, si no hay
+    ninguna, UTF-8 o windows-1252 cuando los bytes no son UTF-8 válido.
+    """
+    for bom, encoding in _BOMS:
+        if head.startswith(bom):
+            return encoding
+    candidates = [declared]
+    match = _META_CHARSET.search(head[:CHARSET_SNIFF_BYTES])
+    if match:
+        candidates.append(match.group(1).decode('ascii'))
+    for candidate in candidates:
+        try:
+            if candidate:
+                return codecs.lookup(candidate).name
+        except LookupError:
+            pass
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(head)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return 'windows-1252'
+
+
+class _HeadMetaParser(HTMLParser):
+    """Recoge <title> y las etiquetas <meta> de la cabecera en una sola pasada."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.meta = {}
+        self.title = None
+        self.done = False
+        self._in_title = False
+        self._title_parts = []
+        self._ignored_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _IGNORED_CONTAINERS:
+            self._ignored_depth += 1
+        elif self._ignored_depth:
+            return
+        elif tag == 'body':
+            self.done = True
+        elif tag == 'title' and self.title is None:
+            self._in_title = True
+        elif tag == 'meta':
+            attrs = dict(attrs)
+            key = attrs.get('property') or attrs.get('name')
+            if key and attrs.get('content'):
+                self.meta.setdefault(key.lower(), attrs['content'])
+
+    def handle_endtag(self, tag):
+        if tag in _IGNORED_CONTAINERS:
+            self._ignored_depth = max(0, self._ignored_depth - 1)
+        elif tag == 'title' and self._in_title:
+            self._in_title = False
+            self.title = ''.join(self._title_parts)
+        elif tag == 'head':
+            self.done = True
+
+    def handle_data(self, data):
+        if self._in_title:
+            self._title_parts.append(data)
+
+
+def extract_metadata(chunks, page_url, fallback_title, max_bytes=None, encoding=None):
+    """
+    Lee los trozos de HTML (`bytes`) hasta encontrar </head> o <body> o
+    alcanzar `max_bytes` y devuelve el título, la descripción y la og:image.
+    `encoding` es la de la cabecera HTTP; si falta se busca en el propio
+    documento (sniff_encoding).
+    """
+    max_bytes = METADATA_MAX_BYTES if max_bytes is None else max_bytes
+    parser = _HeadMetaParser()
+    decoder = None
+    pending = b''
+    read = 0
+    for chunk in chunks:
+        if not chunk:
+            continue
+        chunk = chunk[:max_bytes - read]
+        read += len(chunk)
+        if decoder is None:
+            # Se acumulan los primeros bytes para decidir la codificación antes de decodificar
+            pending += chunk
+            if len(pending) < CHARSET_SNIFF_BYTES and read < max_bytes:
+                continue
+            chunk, pending = pending, b''
+            decoder = codecs.getincrementaldecoder(sniff_encoding(chunk, encoding))(errors='replace')
+        parser.feed(decoder.decode(chunk))
+        if parser.done or read >= max_bytes:
+            break
+    if decoder is None and pending:
+        decoder = codecs.getincrementaldecoder(sniff_encoding(pending, encoding))(errors='replace')
+        parser.feed(decoder.decode(pending, final=True))
+    if parser._in_title:
+        parser.title = ''.join(parser._title_parts)
+
+    meta = parser.meta
+    title = (meta.get('og:title') or '').strip() or (parser.title or '').strip() or fallback_title
+    description = (meta.get('og:description') or meta.get('description') or '').strip()
+    image_url = meta.get('og:image') or ''
+    if image_url and not urlparse(image_url).scheme:
+        parsed_original_url = urlparse(page_url)
+        img_path = image_url if image_url.startswith('/') else ('/' + image_url)
+        image_url = f"{parsed_original_url.scheme}://{parsed_original_url.netloc}{img_path}"
+    return {'title': title, 'description': description, 'image_url': image_url}
+
+
+def fetch_metadata(url_to_fetch, etag=None, last_modified=None):
+    """
+    Descarga la cabecera de la página y extrae sus metadatos. Si se pasan
+    `etag` o `last_modified` se hace una petición condicional; un 304 se
+    indica con `not_modified`. Los errores no se lanzan, se devuelven en `error`.
+    """
+    import requests  # diferido: sólo lo cargan los procesos que descargan páginas
+
+    metadata = {'title': url_to_fetch, 'description': '', 'image_url': ''}
+    try:
+        processed_url = url_to_fetch
+        if not processed_url.startswith(('http://', 'https://')):
+            processed_url = 'http://' + processed_url
+        headers = {'User-Agent': USER_AGENT}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        with requests.get(processed_url, headers=headers, timeout=10, allow_redirects=True, stream=True) as response:
+            response.raise_for_status()
+            metadata['etag'] = response.headers.get('ETag')
+            metadata['last_modified'] = response.headers.get('Last-Modified')
+            if response.status_code == 304:
+                metadata['not_modified'] = True
+                return metadata
+            content_type = response.headers.get('Content-Type', '')
+            encoding = response.encoding if 'charset=' in content_type.lower() else None
+            metadata.update(extract_metadata(response.iter_content(METADATA_CHUNK_SIZE), processed_url,
+                                             url_to_fetch, encoding=encoding))
+    except (requests.ConnectionError, requests.Timeout) as e:
+        print(f"Error en fetch_metadata para {url_to_fetch}: {e}")
+        metadata['error'] = str(e)
+        metadata['host_unreachable'] = True
+    except Exception as e:
+        print(f"Error en fetch_metadata para {url_to_fetch}: {e}")
+        metadata['error'] = str(e)
+    return metadata
+
+
+# --- Caché persistente ---
+def _row_to_metadata(row, url_to_fetch):
+    return {
+        'title': row['title'] or url_to_fetch,
+        'description': row['description'] or '',
+        'image_url': row['image_url'] or '',
+        'error': row['error'],
+        'cached': True,
+    }
+
+
+def _url_lock(key):
+    return _url_locks[hash(key) % URL_LOCK_STRIPES]
+
+
+def _cached_metadata(db, key, host, url_to_fetch, ttl, negative_ttl):
+    """
+    Lee la caché de `key`. Devuelve (fila, metadatos): metadatos es None si
+    hay que ir a la red, y la fila sirve entonces para la petición condicional.
+    """
+    now = time.time()
+    with _url_lock(key):
+        row = db.execute("SELECT * FROM metadata_cache WHERE url = ?", (key,)).fetchone()
+        if row:
+            max_age = negative_ttl if row['error'] else ttl
+            if now - row['fetched_at'] < max_age:
+                return row, _row_to_metadata(row, url_to_fetch)
+
+        # Caché negativa por host: no insistimos con servidores caídos
+        failed_host = db.execute(
+            "SELECT error FROM metadata_cache WHERE host = ? AND host_unreachable = 1 AND fetched_at > ? LIMIT 1",
+            (host, now - negative_ttl)).fetchone()
+    if failed_host:
+        return row, {'title': url_to_fetch, 'description': '', 'image_url': '',
+                     'error': failed_host['error'], 'cached': True}
+    return row, None
+
+
+def _refresh_metadata(db, key, host, url_to_fetch, row):
+    """Descarga la página (condicional si `row` tiene datos buenos) y guarda el resultado en la caché."""
+    use_conditional = row is not None and not row['error']
+    host_limiter.acquire(host)
+    start = time.perf_counter()
+    try:
+        metadata = fetch_metadata(url_to_fetch,
+                                  etag=row['etag'] if use_conditional else None,
+                                  last_modified=row['last_modified'] if use_conditional else None)
+    finally:
+        host_limiter.release(host)
+    observe_fetch('metadata', time.perf_counter() - start,
+                  'error' if metadata.get('error') else ('not_modified' if metadata.get('not_modified') else 'ok'))
+
+    now = time.time()
+    with _url_lock(key):
+        if metadata.get('not_modified'):
+            db.execute("UPDATE metadata_cache SET fetched_at = ?, etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified) WHERE url = ?",
+                       (now, metadata.get('etag'), metadata.get('last_modified'), key))
+            db.commit()
+            return _row_to_metadata(row, url_to_fetch)
+
+        if metadata.get('error') and row and not row['error']:
+            # Conservamos los datos buenos anteriores, pero anotamos el error
+            db.execute("UPDATE metadata_cache SET fetched_at = ?, error = ?, host_unreachable = ? WHERE url = ?",
+                       (now, metadata['error'], int(bool(metadata.get('host_unreachable'))), key))
+            db.commit()
+            return _row_to_metadata(row, url_to_fetch) | {'error': None}
+
+        db.execute("""INSERT OR REPLACE INTO metadata_cache
+                      (url, host, title, description, image_url, etag, last_modified, fetched_at, error, host_unreachable)
+                      VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                   (key, host, metadata['title'], metadata['description'], metadata['image_url'],
+                    metadata.get('etag'), metadata.get('last_modified'), now,
+                    metadata.get('error'), int(bool(metadata.get('host_unreachable')))))
+        db.commit()
+    return metadata
+
+
+def get_metadata(db, url_to_fetch, ttl=None, negative_ttl=None):
+    """
+    Devuelve los metadatos de `url_to_fetch` usando la tabla `metadata_cache`.
+    Sólo se sale a la red si la entrada no existe o ha caducado, y en ese caso
+    se refresca con una petición condicional cuando hay ETag/Last-Modified.
+    Las peticiones simultáneas de la misma URL comparten una sola descarga.
+    """
+    ttl = METADATA_CACHE_TTL if ttl is None else ttl
+    negative_ttl = METADATA_NEGATIVE_TTL if negative_ttl is None else negative_ttl
+    key = normalize_url(url_to_fetch)
+    host = urlparse(key).netloc
+
+    row, metadata = _cached_metadata(db, key, host, url_to_fetch, ttl, negative_ttl)
+    if metadata is not None:
+        return metadata
+
+    with _in_flight_lock:
+        pending = _in_flight.get(key)
+        leader = pending is None
+        if leader:
+            pending = _in_flight[key] = Future()
+    if not leader:
+        return dict(pending.result())
+
+    try:
+        # Otra descarga pudo terminar entre la lectura anterior y la reserva
+        row, metadata = _cached_metadata(db, key, host, url_to_fetch, ttl, negative_ttl)
+        if metadata is None:
+            metadata = _refresh_metadata(db, key, host, url_to_fetch, row)
+    except BaseException as e:
+        pending.set_exception(e)
+        raise
+    else:
+        pending.set_result(metadata)
+        return dict(metadata)
+    finally:
+        with _in_flight_lock:
+            del _in_flight[key]
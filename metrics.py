@@ -0,0 +1,297 @@
+"""
+Métricas de rendimiento: histogramas de duración de las rutas, las consultas
+SQL, las descargas externas y el renderizado de plantillas.
+
+Cada proceso acumula sus histogramas en memoria y los vuelca de vez en cuando
+a `<directorio>/<pid>.json`. El endpoint /metrics suma los ficheros de todos
+los procesos (los workers de gunicorn no comparten memoria), de modo que
+cualquier worker que atienda la petición devuelve el total. Cuando un worker
+termina, el maestro de gunicorn suma su fichero a `retired.json` y lo borra
+(Registry.retire): así los contadores nunca retroceden y el directorio no
+acumula un fichero por cada worker que ha existido.
+
+Además, cada petición lleva una traza por hilo con sus consultas, que se
+imprime si la petición supera SLOW_REQUEST_MS (desactivado por defecto).
+"""
+
+import atexit
+import bisect
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'
+METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', 5))
+SLOW_REQUEST_MS = float(os.environ.get('SLOW_REQUEST_MS', 0))  # 0 desactiva el registro de peticiones lentas
+
+# Límites superiores (segundos) de los buckets, como los de prometheus_client
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# Suma de los procesos terminados: {"pids": [...], "metrics": snapshot}
+RETIRED_FILE = 'retired.json'
+
+HELP = {
+    'linkmanager_http_request_duration_seconds': 'Duración de las peticiones HTTP por endpoint.',
+    'linkmanager_db_query_duration_seconds': 'Duración de las sentencias SQL por operación y tabla.',
+    'linkmanager_fetch_duration_seconds': 'Duración de las descargas externas (metadatos, imágenes, enlaces).',
+    'linkmanager_template_render_duration_seconds': 'Duración del renderizado de plantillas Jinja.',
+}
+
+
+class Registry:
+    """Histogramas {(nombre, etiquetas): [cuentas por bucket..., +Inf]} y sus sumas."""
+
+    def __init__(self, directory=None):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._counts = {}
+        self._sums = {}
+        self._last_flush = 0.0
+
+    def observe(self, name, seconds, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        index = bisect.bisect_left(BUCKETS, seconds)  # primer límite >= seconds; len(BUCKETS) = +Inf
+        with self._lock:
+            if self._pid != os.getpid():
+                self._reset()  # proceso bifurcado: lo heredado pertenece al padre
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0] * (len(BUCKETS) + 1)
+                self._sums[key] = 0.0
+            counts[index] += 1
+            self._sums[key] += seconds
+
+    def snapshot(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._reset()
+            return [[name, list(labels), list(self._counts[(name, labels)]), self._sums[(name, labels)]]
+                    for name, labels in self._counts]
+
+    def flush(self, force=False):
+        """Vuelca el snapshot del proceso a su fichero (como mucho cada METRICS_FLUSH_INTERVAL)."""
+        if not self.directory:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_flush < METRICS_FLUSH_INTERVAL:
+            return
+        self._last_flush = now
+        path = os.path.join(self.directory, f"{os.getpid()}.json")
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(f"{path}.tmp", 'w') as f:
+                json.dump(self.snapshot(), f)
+            os.replace(f"{path}.tmp", path)
+        except OSError as e:
+            print(f"Error al guardar las métricas en {path}: {e}")
+
+    def _load(self, name):
+        try:
+            with open(os.path.join(self.directory, name)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"Error al leer las métricas de {name}: {e}")
+            return None
+
+    def collect(self):
+        """Suma las métricas de todos los procesos. Devuelve {(nombre, etiquetas): (cuentas, suma)}."""
+        if not (self.directory and os.path.isdir(self.directory)):
+            return _merge([self.snapshot()])
+        self.flush(force=True)
+        snapshots = {}
+        for name in os.listdir(self.directory):
+            if name.endswith('.json'):
+                data = self._load(name)
+                if data is not None:
+                    snapshots[name] = data
+        # Un fichero leído justo antes de que retire() lo borre ya está sumado en retired.json
+        retired = snapshots.pop(RETIRED_FILE, None) or {'pids': [], 'metrics': []}
+        for pid in retired['pids']:
+            snapshots.pop(f"{pid}.json", None)
+        return _merge([retired['metrics'], *snapshots.values()])
+
+    def retire(self, pid):
+        """Suma el fichero del proceso terminado `pid` a retired.json y lo borra."""
+        if not self.directory:
+            return
+        name = f"{pid}.json"
+        snapshot = self._load(name)
+        if snapshot is None:
+            return
+        retired = self._load(RETIRED_FILE) or {'pids': [], 'metrics': []}
+        merged = _merge([retired['metrics'], snapshot])
+        # Sólo hace falta recordar los pids cuyo fichero aún no se ha borrado
+        pids = [p for p in retired['pids'] if os.path.exists(os.path.join(self.directory, f"{p}.json"))] + [pid]
+        path = os.path.join(self.directory, RETIRED_FILE)
+        try:
+            with open(f"{path}.tmp", 'w') as f:
+                json.dump({'pids': pids, 'metrics': [[name, list(labels), counts, total]
+                                                     for (name, labels), (counts, total) in merged.items()]}, f)
+            os.replace(f"{path}.tmp", path)
+            os.remove(os.path.join(self.directory, name))
+        except OSError as e:
+            print(f"Error al retirar las métricas del proceso {pid}: {e}")
+
+    def render(self):
+        """Formato de texto de Prometheus (version 0.0.4)."""
+        by_name = {}
+        for (name, labels), value in sorted(self.collect().items()):
+            by_name.setdefault(name, []).append((labels, value))
+        lines = []
+        for name, series in by_name.items():
+            lines.append(f"# HELP {name} {HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} histogram")
+            for labels, (counts, total) in series:
+                cumulative = 0
+                for bound, count in zip(BUCKETS + ('+Inf',), counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_labels(labels, le=bound)} {cumulative}")
+                lines.append(f"{name}_sum{_labels(labels)} {total}")
+                lines.append(f"{name}_count{_labels(labels)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+
+def _merge(snapshots):
+    merged = {}
+    for snapshot in snapshots:
+        for name, labels, counts, total in snapshot:
+            key = (name, tuple(tuple(pair) for pair in labels))
+            if len(counts) != len(BUCKETS) + 1:
+                continue  # fichero de una versión con otros buckets
+            current = merged.get(key)
+            if current is None:
+                merged[key] = (list(counts), total)
+            else:
+                merged[key] = ([a + b for a, b in zip(current[0], counts)], current[1] + total)
+    return merged
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels, **extra):
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+
+
+registry = Registry()  # la aplicación le asigna el directorio compartido
+atexit.register(registry.flush, force=True)
+
+
+# --- Traza de la petición en curso ---
+_local = threading.local()
+
+
+def start_trace():
+    _local.trace = {'queries': {}, 'sql': 0.0, 'fetch': 0.0, 'template': 0.0}
+
+
+def end_trace():
+    trace = getattr(_local, 'trace', None)
+    _local.trace = None
+    return trace
+
+
+def _trace():
+    return getattr(_local, 'trace', None)
+
+
+def observe(name, seconds, trace_key=None, **labels):
+    if not METRICS_ENABLED:
+        return
+    registry.observe(name, seconds, **labels)
+    trace = _trace()
+    if trace is not None and trace_key:
+        trace[trace_key] += seconds
+
+
+def observe_fetch(kind, seconds, outcome):
+    """Descarga externa: `kind` es 'metadata', 'image' o 'linkcheck'; `outcome`, 'ok', 'not_modified' o 'error'."""
+    observe('linkmanager_fetch_duration_seconds', seconds, 'fetch', kind=kind, outcome=outcome)
+
+
+# --- Consultas SQL ---
+_STATEMENT_RE = re.compile(r"^\s*(?:WITH\b.*?\)\s*)?(\w+)(?:.*?\b(?:FROM|INTO|UPDATE|TABLE|INDEX\s+\w+\s+ON)\s+(\w+))?",
+                           re.IGNORECASE | re.DOTALL)
+
+
+@lru_cache(maxsize=1024)
+def statement_label(sql):
+    """Etiqueta de baja cardinalidad: operación y tabla principal ('SELECT link_entries')."""
+    match = _STATEMENT_RE.match(sql)
+    if not match:
+        return 'OTHER'
+    operation = match.group(1).upper()
+    if operation == 'UPDATE':
+        table = re.match(r"\s*UPDATE\s+(\w+)", sql, re.IGNORECASE)
+        return f"UPDATE {table.group(1)}" if table else operation
+    return f"{operation} {match.group(2)}" if match.group(2) else operation
+
+
+def _record_query(sql, seconds):
+    registry.observe('linkmanager_db_query_duration_seconds', seconds, statement=statement_label(sql))
+    trace = _trace()
+    if trace is not None:
+        trace['sql'] += seconds
+        entry = trace['queries'].get(sql)
+        if entry is None:
+            trace['queries'][sql] = [1, seconds]
+        else:
+            entry[0] += 1
+            entry[1] += seconds
+
+
+def _timed(method, label=None):
+    def wrapper(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            sql = args[0] if args else kwargs.get('sql', kwargs.get('sql_script', ''))
+            _record_query(label or sql, time.perf_counter() - start)
+    return wrapper
+
+
+class TimedCursor(sqlite3.Cursor):
+    execute = _timed(sqlite3.Cursor.execute)
+    executemany = _timed(sqlite3.Cursor.executemany)
+    executescript = _timed(sqlite3.Cursor.executescript, 'SCRIPT')
+
+
+class TimedConnection(sqlite3.Connection):
+    """Conexión que mide cada sentencia (hasta el primer resultado), también las de sus cursores."""
+
+    execute = _timed(sqlite3.Connection.execute)
+    executemany = _timed(sqlite3.Connection.executemany)
+    executescript = _timed(sqlite3.Connection.executescript, 'SCRIPT')
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+
+def connection_factory():
+    return TimedConnection if METRICS_ENABLED else sqlite3.Connection
+
+
+def format_slow_request(method, path, status, seconds, trace, top=10):
+    queries = sorted(trace['queries'].items(), key=lambda item: item[1][1], reverse=True)
+    count = sum(n for n, _ in trace['queries'].values())
+    lines = [f"Petición lenta: {method} {path} → {status} en {seconds * 1000:.1f} ms "
+             f"(SQL {trace['sql'] * 1000:.1f} ms en {count} consultas, "
+             f"plantillas {trace['template'] * 1000:.1f} ms, descargas {trace['fetch'] * 1000:.1f} ms)"]
+    for sql, (n, total) in queries[:top]:
+        lines.append(f"    {total * 1000:8.1f} ms  x{n:<4} {' '.join(sql.split())[:160]}")
+    return "\n".join(lines)
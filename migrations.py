@@ -0,0 +1,319 @@
+"""
+Migraciones versionadas del esquema.
+
+Las bases de datos nuevas se crean con schema.sql y quedan marcadas con la
+última versión. Las existentes se actualizan aplicando, en orden y cada una
+en su propia transacción, las migraciones con número mayor que su
+`PRAGMA user_version`. Nunca se borran tablas ni datos.
+
+Para añadir un cambio de esquema: modificar schema.sql (bases nuevas) y
+añadir aquí una función `_mNNNN_...` registrada en MIGRATIONS (bases
+existentes).
+"""
+
+import ast
+import re
+import sqlite3
+from pathlib import Path
+
+
+def _columns(db, table):
+    return {row[1] for row in db.execute(f"PRAGMA table_info({table})")}
+
+
+def _add_column(db, table, definition):
+    if definition.split()[0] not in _columns(db, table):
+        db.execute(f"ALTER TABLE {table} ADD COLUMN {definition}")
+
+
+def _table_exists(db, name):
+    return db.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (name,)).fetchone() is not None
+
+
+# Claves order_index dispersas (ver «Ordenación» en app.py). Las altas reciben
+# ya una clave separada ORDER_GAP de sus vecinas: las entradas nuevas van
+# delante en su sección (el parámetro es section_id) y las secciones, al final.
+ORDER_GAP = 1024
+NEW_ENTRY_ORDER_KEY = (f"(SELECT COALESCE(MIN(order_index) - {ORDER_GAP}, {ORDER_GAP}) "
+                       "FROM link_entries WHERE section_id = ?)")
+NEW_SECTION_ORDER_KEY = f"(SELECT COALESCE(MAX(order_index) + {ORDER_GAP}, {ORDER_GAP}) FROM sections)"
+
+
+# --------------------------------------------------------------------------- #
+# Migraciones
+# --------------------------------------------------------------------------- #
+_SEARCH_URLS = """(SELECT COALESCE(group_concat(label || ' ' || value, ' '), '')
+                   FROM entry_urls WHERE link_entry_id = {ref}.link_entry_id)"""
+
+
+def _m0001_metadata_cache_state_search(db):
+    """Estado de metadatos, caché de metadatos, data_version y búsqueda FTS5."""
+    _add_column(db, 'link_entries', "metadata_status TEXT NOT NULL DEFAULT 'none'")
+    _add_column(db, 'link_entries', "metadata_error TEXT")
+    _add_column(db, 'link_entries', "metadata_updated_at TIMESTAMP")
+
+    db.execute("""CREATE TABLE IF NOT EXISTS metadata_cache (
+                      url TEXT PRIMARY KEY,
+                      host TEXT NOT NULL,
+                      title TEXT,
+                      description TEXT,
+                      image_url TEXT,
+                      etag TEXT,
+                      last_modified TEXT,
+                      fetched_at REAL NOT NULL,
+                      error TEXT,
+                      host_unreachable INTEGER NOT NULL DEFAULT 0)""")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_metadata_cache_host ON metadata_cache (host, fetched_at)")
+
+    db.execute("CREATE TABLE IF NOT EXISTS app_state (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+    db.execute("INSERT OR IGNORE INTO app_state (key, value) VALUES ('data_version', 0)")
+
+    db.execute("CREATE INDEX IF NOT EXISTS idx_entry_urls_link_entry_id ON entry_urls (link_entry_id)")
+
+    if not _table_exists(db, 'link_search'):
+        db.execute("""CREATE VIRTUAL TABLE link_search USING fts5(
+                          title, description, urls,
+                          tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')""")
+        db.execute("""INSERT INTO link_search (rowid, title, description, urls)
+                      SELECT e.id, e.title, COALESCE(e.description, ''),
+                             (SELECT COALESCE(group_concat(u.label || ' ' || u.value, ' '), '')
+                              FROM entry_urls u WHERE u.link_entry_id = e.id)
+                      FROM link_entries e""")
+    db.execute("""CREATE TRIGGER IF NOT EXISTS link_entries_search_ai AFTER INSERT ON link_entries BEGIN
+                      INSERT INTO link_search (rowid, title, description, urls)
+                      VALUES (new.id, new.title, COALESCE(new.description, ''), '');
+                  END""")
+    db.execute("""CREATE TRIGGER IF NOT EXISTS link_entries_search_au AFTER UPDATE OF title, description ON link_entries BEGIN
+                      UPDATE link_search SET title = new.title, description = COALESCE(new.description, '') WHERE rowid = new.id;
+                  END""")
+    db.execute("""CREATE TRIGGER IF NOT EXISTS link_entries_search_ad AFTER DELETE ON link_entries BEGIN
+                      DELETE FROM link_search WHERE rowid = old.id;
+                  END""")
+    db.execute(f"""CREATE TRIGGER IF NOT EXISTS entry_urls_search_ai AFTER INSERT ON entry_urls BEGIN
+                       UPDATE link_search SET urls = {_SEARCH_URLS.format(ref='new')} WHERE rowid = new.link_entry_id;
+                   END""")
+    db.execute(f"""CREATE TRIGGER IF NOT EXISTS entry_urls_search_au AFTER UPDATE ON entry_urls BEGIN
+                       UPDATE link_search SET urls = {_SEARCH_URLS.format(ref='old')} WHERE rowid = old.link_entry_id;
+                       UPDATE link_search SET urls = {_SEARCH_URLS.format(ref='new')} WHERE rowid = new.link_entry_id;
+                   END""")
+    db.execute(f"""CREATE TRIGGER IF NOT EXISTS entry_urls_search_ad AFTER DELETE ON entry_urls BEGIN
+                       UPDATE link_search SET urls = {_SEARCH_URLS.format(ref='old')} WHERE rowid = old.link_entry_id;
+                   END""")
+
+
+def _m0002_access_path_indexes(db):
+    """Índices para los accesos por FK y los ORDER BY del panel."""
+    db.execute("CREATE INDEX IF NOT EXISTS idx_sections_order ON sections (order_index, name)")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_link_entries_section_order ON link_entries (section_id, order_index, id DESC)")
+
+
+def _m0003_thumbnails(db):
+    """Miniaturas WebP e índices para comprobar referencias a imágenes compartidas."""
+    _add_column(db, 'link_entries', "thumbnail_url TEXT")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_link_entries_image_url ON link_entries (image_url)")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_link_entries_thumbnail_url ON link_entries (thumbnail_url)")
+
+
+def _m0004_link_health(db):
+    """Estado e histórico de la comprobación de enlaces."""
+    db.execute("""CREATE TABLE IF NOT EXISTS link_status (
+                      url_id INTEGER NOT NULL,
+                      environment TEXT NOT NULL,
+                      target TEXT NOT NULL,
+                      ok INTEGER NOT NULL,
+                      status_code INTEGER,
+                      latency_ms REAL,
+                      error TEXT,
+                      checked_at REAL NOT NULL,
+                      PRIMARY KEY (url_id, environment),
+                      FOREIGN KEY (url_id) REFERENCES entry_urls (id) ON DELETE CASCADE)""")
+    db.execute("""CREATE TABLE IF NOT EXISTS link_checks (
+                      id INTEGER PRIMARY KEY AUTOINCREMENT,
+                      url_id INTEGER NOT NULL,
+                      environment TEXT NOT NULL,
+                      target TEXT NOT NULL,
+                      ok INTEGER NOT NULL,
+                      status_code INTEGER,
+                      latency_ms REAL,
+                      error TEXT,
+                      checked_at REAL NOT NULL,
+                      FOREIGN KEY (url_id) REFERENCES entry_urls (id) ON DELETE CASCADE)""")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_link_checks_url ON link_checks (url_id, checked_at)")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_link_checks_checked_at ON link_checks (checked_at)")
+
+
+# Triggers del feed de cambios: marcan con version = -1 lo modificado y
+# bump_data_version() le asigna la nueva data_version al confirmar la mutación.
+CHANGE_TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS sections_changes_au AFTER UPDATE OF name, order_index ON sections BEGIN
+           UPDATE sections SET version = -1 WHERE id = new.id AND version != -1;
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS sections_changes_ad AFTER DELETE ON sections BEGIN
+           INSERT OR REPLACE INTO tombstones (kind, item_id, version, deleted_at) VALUES ('section', old.id, -1, strftime('%s', 'now'));
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS link_entries_changes_au
+       AFTER UPDATE OF title, description, image_url, thumbnail_url, section_id, order_index, metadata_status ON link_entries BEGIN
+           UPDATE link_entries SET version = -1 WHERE id = new.id AND version != -1;
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS link_entries_changes_ad AFTER DELETE ON link_entries BEGIN
+           INSERT OR REPLACE INTO tombstones (kind, item_id, version, deleted_at) VALUES ('entry', old.id, -1, strftime('%s', 'now'));
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS entry_urls_changes_ai AFTER INSERT ON entry_urls BEGIN
+           UPDATE link_entries SET version = -1 WHERE id = new.link_entry_id AND version != -1;
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS entry_urls_changes_au AFTER UPDATE ON entry_urls BEGIN
+           UPDATE link_entries SET version = -1 WHERE id IN (old.link_entry_id, new.link_entry_id) AND version != -1;
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS entry_urls_changes_ad AFTER DELETE ON entry_urls BEGIN
+           UPDATE link_entries SET version = -1 WHERE id = old.link_entry_id AND version != -1;
+       END""",
+    # Sólo cuenta como cambio de la tarjeta que un enlace pase a funcionar o a fallar
+    """CREATE TRIGGER IF NOT EXISTS link_status_changes_bi BEFORE INSERT ON link_status
+       WHEN NOT EXISTS (SELECT 1 FROM link_status WHERE url_id = new.url_id AND environment = new.environment AND ok = new.ok)
+       BEGIN
+           UPDATE link_entries SET version = -1
+           WHERE id = (SELECT link_entry_id FROM entry_urls WHERE id = new.url_id) AND version != -1;
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS settings_changes_ai AFTER INSERT ON settings BEGIN
+           UPDATE app_state SET value = -1 WHERE key = 'settings_version';
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS settings_changes_au AFTER UPDATE ON settings BEGIN
+           UPDATE app_state SET value = -1 WHERE key = 'settings_version';
+       END""",
+]
+
+
+def _m0005_change_feed(db):
+    """Versión por fila y lápidas de borrado para el feed /changes."""
+    # Las filas nuevas nacen marcadas (-1); las existentes, con versión 0
+    for table in ('sections', 'link_entries'):
+        if 'version' not in _columns(db, table):
+            db.execute(f"ALTER TABLE {table} ADD COLUMN version INTEGER NOT NULL DEFAULT -1")
+            db.execute(f"UPDATE {table} SET version = 0")
+    db.execute("""CREATE TABLE IF NOT EXISTS tombstones (
+                      kind TEXT NOT NULL,
+                      item_id INTEGER NOT NULL,
+                      version INTEGER NOT NULL DEFAULT -1,
+                      deleted_at REAL NOT NULL,
+                      PRIMARY KEY (kind, item_id))""")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_sections_version ON sections (version)")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_link_entries_version ON link_entries (version)")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_tombstones_version ON tombstones (version)")
+    db.execute("INSERT OR IGNORE INTO app_state (key, value) VALUES ('settings_version', 0)")
+    db.execute("INSERT OR IGNORE INTO app_state (key, value) VALUES ('changes_floor', 0)")
+    for trigger in CHANGE_TRIGGERS:
+        db.execute(trigger)
+
+
+def _m0006_sparse_order_keys(db):
+    """Claves de orden dispersas en las filas existentes, conservando el orden actual."""
+    db.execute(f"""UPDATE sections SET order_index = ranked.key
+                   FROM (SELECT id, ROW_NUMBER() OVER (ORDER BY order_index, name) * {ORDER_GAP} AS key
+                         FROM sections) AS ranked
+                   WHERE sections.id = ranked.id AND sections.order_index != ranked.key""")
+    db.execute(f"""UPDATE link_entries SET order_index = ranked.key
+                   FROM (SELECT id, ROW_NUMBER() OVER (PARTITION BY section_id ORDER BY order_index, id DESC) * {ORDER_GAP} AS key
+                         FROM link_entries) AS ranked
+                   WHERE link_entries.id = ranked.id AND link_entries.order_index != ranked.key""")
+
+
+MIGRATIONS = [
+    (1, _m0001_metadata_cache_state_search),
+    (2, _m0002_access_path_indexes),
+    (3, _m0003_thumbnails),
+    (4, _m0004_link_health),
+    (5, _m0005_change_feed),
+    (6, _m0006_sparse_order_keys),
+]
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(db):
+    return db.execute("PRAGMA user_version").fetchone()[0]
+
+
+def set_schema_version(db, version):
+    db.execute(f"PRAGMA user_version = {int(version)}")
+
+
+def migrate(db):
+    """Aplica las migraciones pendientes. Devuelve la lista de versiones aplicadas."""
+    applied = []
+    for version, migration in MIGRATIONS:
+        if version <= get_schema_version(db):
+            continue
+        try:
+            db.execute("BEGIN")
+            migration(db)
+            set_schema_version(db, version)
+            db.commit()
+        except sqlite3.Error:
+            db.rollback()
+            raise
+        print(f"Migración {version:04d} aplicada: {migration.__doc__}")
+        applied.append(version)
+    return applied
+
+
+# --------------------------------------------------------------------------- #
+# Auditoría de planes de consulta
+# --------------------------------------------------------------------------- #
+_SQL_START = re.compile(r'^\s*(SELECT|UPDATE|DELETE|INSERT|WITH)\s+\S', re.IGNORECASE)
+
+
+def collect_queries(paths, expansions=None):
+    """
+    Extrae las cadenas SQL de los módulos indicados. Las f-strings se devuelven
+    como plantillas con cada valor interpolado sustituido por `?` (p. ej. los
+    `IN ({placeholders})`) y marcadas con `template=True`. `expansions`
+    ({nombre de función: [sql, ...]}) sustituye las f-strings de esas funciones,
+    que interpolan tablas u operadores, por las consultas que construyen.
+    """
+    expansions = expansions or {}
+    queries = []
+    for path in paths:
+        tree = ast.parse(Path(path).read_text(encoding='utf-8'))
+        fstring_parts = {id(part) for node in ast.walk(tree) if isinstance(node, ast.JoinedStr) for part in node.values}
+        for node in ast.walk(tree):
+            if isinstance(node, ast.FunctionDef) and node.name in expansions:
+                fstring_parts.update(id(inner) for inner in ast.walk(node) if isinstance(inner, ast.JoinedStr))
+                queries.extend((f"{Path(path).name}:{node.lineno} {node.name}", sql, False)
+                               for sql in expansions[node.name])
+        for node in ast.walk(tree):
+            if id(node) in fstring_parts:
+                continue
+            if isinstance(node, ast.Constant) and isinstance(node.value, str):
+                sql, template = node.value, False
+            elif isinstance(node, ast.JoinedStr):
+                sql = ''.join(part.value if isinstance(part, ast.Constant) else '?' for part in node.values)
+                template = True
+            else:
+                continue
+            if _SQL_START.match(sql):
+                queries.append((f"{Path(path).name}:{node.lineno}", sql, template))
+    return queries
+
+
+def check_query_plans(db, queries):
+    """
+    Ejecuta EXPLAIN QUERY PLAN sobre cada consulta y devuelve las que recorren
+    una tabla completa y además ordenan con un B-tree temporal, junto con las
+    plantillas que no se han podido planificar porque lo interpolado no es un
+    valor (nombres de tabla, columnas u operadores).
+    """
+    failures, skipped = [], []
+    for location, sql, template in queries:
+        params = [None] * sql.count('?')
+        try:
+            plan = [row[3] for row in db.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+        except sqlite3.Error as e:
+            if template:
+                skipped.append((location, sql, str(e)))
+            else:
+                failures.append((location, sql, [f"error: {e}"]))
+            continue
+        full_scan = any(re.match(r'SCAN \w+$', detail) for detail in plan)
+        temp_sort = any('USE TEMP B-TREE FOR' in detail and 'ORDER BY' in detail for detail in plan)
+        if full_scan and temp_sort:
+            failures.append((location, sql, plan))
+    return failures, skipped
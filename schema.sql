@@ -1,8 +1,14 @@
 -- Elimina las tablas si ya existen para permitir una reinicialización limpia.
+DROP TABLE IF EXISTS link_search;
+DROP TABLE IF EXISTS tombstones;
+DROP TABLE IF EXISTS link_checks;
+DROP TABLE IF EXISTS link_status;
 DROP TABLE IF EXISTS entry_urls;
 DROP TABLE IF EXISTS link_entries;
 DROP TABLE IF EXISTS sections;
 DROP TABLE IF EXISTS settings;
+DROP TABLE IF EXISTS metadata_cache;
+DROP TABLE IF EXISTS app_state;
 
 -- Tabla para almacenar la configuración de la aplicación, como los dominios.
 CREATE TABLE settings (
@@ -15,7 +21,8 @@ CREATE TABLE sections (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     name TEXT NOT NULL UNIQUE,
     order_index INTEGER NOT NULL DEFAULT 0,
-    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    version INTEGER NOT NULL DEFAULT -1 -- data_version del último cambio (-1: pendiente de asignar)
 );
 
 -- Tabla para las entradas individuales (las tarjetas con imagen, título, etc.).
@@ -25,8 +32,13 @@ CREATE TABLE link_entries (
     title TEXT NOT NULL,
     description TEXT,
     image_url TEXT,
+    thumbnail_url TEXT, -- miniatura WebP local (thumbs/<hash>.webp); image_url queda como respaldo
     order_index INTEGER NOT NULL DEFAULT 0,
     created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    metadata_status TEXT NOT NULL DEFAULT 'none', -- 'none', 'pending', 'done' o 'error'
+    metadata_error TEXT,
+    metadata_updated_at TIMESTAMP,
+    version INTEGER NOT NULL DEFAULT -1, -- data_version del último cambio (-1: pendiente de asignar)
     FOREIGN KEY (section_id) REFERENCES sections (id) ON DELETE CASCADE
 );
 
@@ -40,8 +52,185 @@ CREATE TABLE entry_urls (
     FOREIGN KEY (link_entry_id) REFERENCES link_entries (id) ON DELETE CASCADE
 );
 
+-- Índices para los accesos por clave foránea (JOIN del panel, detalles de una
+-- entrada, ON DELETE CASCADE y triggers de búsqueda) y para los ORDER BY.
+CREATE INDEX idx_entry_urls_link_entry_id ON entry_urls (link_entry_id);
+CREATE INDEX idx_link_entries_section_order ON link_entries (section_id, order_index, id DESC);
+CREATE INDEX idx_sections_order ON sections (order_index, name);
+-- Las imágenes se comparten por contenido: antes de borrar un fichero se
+-- comprueba que ninguna otra entrada lo usa.
+CREATE INDEX idx_link_entries_image_url ON link_entries (image_url);
+CREATE INDEX idx_link_entries_thumbnail_url ON link_entries (thumbnail_url);
+
+-- Índice de búsqueda de texto completo. Una fila por entrada (rowid = id de
+-- link_entries) con su título, descripción y las etiquetas/valores de sus
+-- enlaces concatenados. Los triggers lo mantienen sincronizado.
+CREATE VIRTUAL TABLE link_search USING fts5(
+    title,
+    description,
+    urls,
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3'
+);
+
+CREATE TRIGGER link_entries_search_ai AFTER INSERT ON link_entries BEGIN
+    INSERT INTO link_search (rowid, title, description, urls)
+    VALUES (new.id, new.title, COALESCE(new.description, ''), '');
+END;
+
+CREATE TRIGGER link_entries_search_au AFTER UPDATE OF title, description ON link_entries BEGIN
+    UPDATE link_search SET title = new.title, description = COALESCE(new.description, '') WHERE rowid = new.id;
+END;
+
+CREATE TRIGGER link_entries_search_ad AFTER DELETE ON link_entries BEGIN
+    DELETE FROM link_search WHERE rowid = old.id;
+END;
+
+CREATE TRIGGER entry_urls_search_ai AFTER INSERT ON entry_urls BEGIN
+    UPDATE link_search SET urls = (SELECT COALESCE(group_concat(label || ' ' || value, ' '), '')
+                                   FROM entry_urls WHERE link_entry_id = new.link_entry_id)
+    WHERE rowid = new.link_entry_id;
+END;
+
+CREATE TRIGGER entry_urls_search_au AFTER UPDATE ON entry_urls BEGIN
+    UPDATE link_search SET urls = (SELECT COALESCE(group_concat(label || ' ' || value, ' '), '')
+                                   FROM entry_urls WHERE link_entry_id = old.link_entry_id)
+    WHERE rowid = old.link_entry_id;
+    UPDATE link_search SET urls = (SELECT COALESCE(group_concat(label || ' ' || value, ' '), '')
+                                   FROM entry_urls WHERE link_entry_id = new.link_entry_id)
+    WHERE rowid = new.link_entry_id;
+END;
+
+CREATE TRIGGER entry_urls_search_ad AFTER DELETE ON entry_urls BEGIN
+    UPDATE link_search SET urls = (SELECT COALESCE(group_concat(label || ' ' || value, ' '), '')
+                                   FROM entry_urls WHERE link_entry_id = old.link_entry_id)
+    WHERE rowid = old.link_entry_id;
+END;
+
+-- Estado interno de la aplicación. `data_version` se incrementa en cada
+-- modificación y sirve para invalidar la caché del panel en todos los workers.
+CREATE TABLE app_state (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT INTO app_state (key, value) VALUES ('data_version', 0);
+INSERT INTO app_state (key, value) VALUES ('settings_version', 0);
+INSERT INTO app_state (key, value) VALUES ('changes_floor', 0);
+
+-- Feed de cambios (/changes?since=N). Los triggers marcan con version = -1
+-- las secciones y entradas modificadas (una entrada cambia también si cambian
+-- sus enlaces o si uno de ellos pasa a funcionar o a fallar) y dejan una
+-- lápida por cada borrado; bump_data_version() sustituye el -1 por la nueva
+-- data_version en la misma transacción.
+CREATE TABLE tombstones (
+    kind TEXT NOT NULL, -- 'section' o 'entry'
+    item_id INTEGER NOT NULL,
+    version INTEGER NOT NULL DEFAULT -1,
+    deleted_at REAL NOT NULL,
+    PRIMARY KEY (kind, item_id)
+);
+CREATE INDEX idx_sections_version ON sections (version);
+CREATE INDEX idx_link_entries_version ON link_entries (version);
+CREATE INDEX idx_tombstones_version ON tombstones (version);
+
+CREATE TRIGGER sections_changes_au AFTER UPDATE OF name, order_index ON sections BEGIN
+    UPDATE sections SET version = -1 WHERE id = new.id AND version != -1;
+END;
+
+CREATE TRIGGER sections_changes_ad AFTER DELETE ON sections BEGIN
+    INSERT OR REPLACE INTO tombstones (kind, item_id, version, deleted_at) VALUES ('section', old.id, -1, strftime('%s', 'now'));
+END;
+
+CREATE TRIGGER link_entries_changes_au
+AFTER UPDATE OF title, description, image_url, thumbnail_url, section_id, order_index, metadata_status ON link_entries BEGIN
+    UPDATE link_entries SET version = -1 WHERE id = new.id AND version != -1;
+END;
+
+CREATE TRIGGER link_entries_changes_ad AFTER DELETE ON link_entries BEGIN
+    INSERT OR REPLACE INTO tombstones (kind, item_id, version, deleted_at) VALUES ('entry', old.id, -1, strftime('%s', 'now'));
+END;
+
+CREATE TRIGGER entry_urls_changes_ai AFTER INSERT ON entry_urls BEGIN
+    UPDATE link_entries SET version = -1 WHERE id = new.link_entry_id AND version != -1;
+END;
+
+CREATE TRIGGER entry_urls_changes_au AFTER UPDATE ON entry_urls BEGIN
+    UPDATE link_entries SET version = -1 WHERE id IN (old.link_entry_id, new.link_entry_id) AND version != -1;
+END;
+
+CREATE TRIGGER entry_urls_changes_ad AFTER DELETE ON entry_urls BEGIN
+    UPDATE link_entries SET version = -1 WHERE id = old.link_entry_id AND version != -1;
+END;
+
+-- Caché de metadatos de páginas externas, indexada por la URL normalizada.
+-- Guarda también los errores (caché negativa) y los validadores HTTP para
+-- refrescar con peticiones condicionales.
+CREATE TABLE metadata_cache (
+    url TEXT PRIMARY KEY,
+    host TEXT NOT NULL,
+    title TEXT,
+    description TEXT,
+    image_url TEXT,
+    etag TEXT,
+    last_modified TEXT,
+    fetched_at REAL NOT NULL, -- segundos desde epoch
+    error TEXT,
+    host_unreachable INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX idx_metadata_cache_host ON metadata_cache (host, fetched_at);
+
+-- Salud de los enlaces. `link_status` guarda el último resultado de cada
+-- enlace y entorno ('external', 'public', 'lan' o 'local'); `link_checks`
+-- guarda el histórico de comprobaciones.
+CREATE TABLE link_status (
+    url_id INTEGER NOT NULL,
+    environment TEXT NOT NULL,
+    target TEXT NOT NULL,
+    ok INTEGER NOT NULL,
+    status_code INTEGER,
+    latency_ms REAL,
+    error TEXT,
+    checked_at REAL NOT NULL, -- segundos desde epoch
+    PRIMARY KEY (url_id, environment),
+    FOREIGN KEY (url_id) REFERENCES entry_urls (id) ON DELETE CASCADE
+);
+
+CREATE TABLE link_checks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    url_id INTEGER NOT NULL,
+    environment TEXT NOT NULL,
+    target TEXT NOT NULL,
+    ok INTEGER NOT NULL,
+    status_code INTEGER,
+    latency_ms REAL,
+    error TEXT,
+    checked_at REAL NOT NULL,
+    FOREIGN KEY (url_id) REFERENCES entry_urls (id) ON DELETE CASCADE
+);
+CREATE INDEX idx_link_checks_url ON link_checks (url_id, checked_at);
+CREATE INDEX idx_link_checks_checked_at ON link_checks (checked_at);
+
+-- Sólo cuenta como cambio de la tarjeta que un enlace pase a funcionar o a fallar
+CREATE TRIGGER link_status_changes_bi BEFORE INSERT ON link_status
+WHEN NOT EXISTS (SELECT 1 FROM link_status WHERE url_id = new.url_id AND environment = new.environment AND ok = new.ok)
+BEGIN
+    UPDATE link_entries SET version = -1
+    WHERE id = (SELECT link_entry_id FROM entry_urls WHERE id = new.url_id) AND version != -1;
+END;
+
+CREATE TRIGGER settings_changes_ai AFTER INSERT ON settings BEGIN
+    UPDATE app_state SET value = -1 WHERE key = 'settings_version';
+END;
+
+CREATE TRIGGER settings_changes_au AFTER UPDATE ON settings BEGIN
+    UPDATE app_state SET value = -1 WHERE key = 'settings_version';
+END;
+
 -- Inserta valores de configuración por defecto si se desea.
 INSERT INTO settings (setting_key, setting_value) VALUES 
 ('domain_public', 'http://example.com'),
 ('domain_lan', 'http://192.168.1.100'),
-('domain_local', 'http://localhost');
\ No newline at end of file
+('domain_local', 'http://localhost');
+
+-- Los valores por defecto no son un cambio para el feed
+UPDATE app_state SET value = 0 WHERE key = 'settings_version';
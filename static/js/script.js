@@ -28,37 +28,48 @@ document.addEventListener('DOMContentLoaded', function() {
                 ghostClass: 'sortable-ghost',
                 disabled: true,
                 onEnd: function (evt) {
-                    const order = Array.from(evt.to.children).map(el => el.dataset.id).filter(id => id);
-                    sendOrderUpdate('sections', order);
+                    if (evt.oldIndex === evt.newIndex) return;
+                    sendMove('sections', evt.item, '.section-block');
                 },
             });
         }
 
-        document.querySelectorAll('.link-entries-grid').forEach(grid => {
-            const s = new Sortable(grid, {
-                group: 'shared',
-                animation: 150,
-                ghostClass: 'sortable-ghost',
-                disabled: true,
-                onEnd: function (evt) {
-                    const entryId = evt.item.dataset.id;
-                    const toSectionId = evt.to.dataset.sectionId;
-                    const toOrder = Array.from(evt.to.children).map(el => el.dataset.id);
-                    sendOrderUpdate('entries', toOrder, toSectionId, entryId);
-                    if (evt.from !== evt.to) {
-                        const fromOrder = Array.from(evt.from.children).map(el => el.dataset.id);
-                        sendOrderUpdate('entries', fromOrder, evt.from.dataset.sectionId);
-                    }
-                },
-            });
-            sortableGrids.push(s);
+        document.querySelectorAll('.link-entries-grid').forEach(initGridSortable);
+    }
+
+    function initGridSortable(grid) {
+        const s = new Sortable(grid, {
+            group: 'shared',
+            animation: 150,
+            ghostClass: 'sortable-ghost',
+            disabled: !document.body.classList.contains('edit-mode'),
+            onEnd: function (evt) {
+                if (evt.from === evt.to && evt.oldIndex === evt.newIndex) return;
+                sendMove('entries', evt.item, '.link-entry-card', evt.to.dataset.sectionId);
+            },
         });
+        sortableGrids.push(s);
     }
 
-    function sendOrderUpdate(type, order, sectionId = null, entryId = null) {
-        const payload = { type, order };
+    // Vecino más cercano del mismo tipo (el contenedor de secciones también tiene modales)
+    function siblingId(el, selector, forward) {
+        let node = forward ? el.nextElementSibling : el.previousElementSibling;
+        while (node && !node.matches(selector)) {
+            node = forward ? node.nextElementSibling : node.previousElementSibling;
+        }
+        return node ? node.dataset.id : null;
+    }
+
+    // Envía sólo el movimiento: el elemento y su nuevo vecino
+    function sendMove(type, item, selector, sectionId = null) {
+        const payload = { type, item_id: item.dataset.id };
+        const afterId = siblingId(item, selector, false);
+        if (afterId) payload.after_id = afterId;
+        else {
+            const beforeId = siblingId(item, selector, true);
+            if (beforeId) payload.before_id = beforeId;
+        }
         if (sectionId) payload.section_id = sectionId;
-        if (entryId) payload.entry_id = entryId;
 
         fetch('/update_order', {
             method: 'POST',
@@ -254,7 +265,7 @@ document.addEventListener('DOMContentLoaded', function() {
         const promptDisplay = imageSrc ? 'style="display: none;"' : '';
         const deleteImageCheckbox = data.image_url ? `<div class="form-group form-check"><input type="checkbox" class="form-check-input" name="delete_current_image" id="delete_current_image"><label class="form-check-label" for="delete_current_image">Eliminar imagen actual</label></div>` : '';
         return `
-            <form id="editLinkForm" action="/edit_link_entry/${data.id}" method="post" enctype="multipart/form-data">
+            <form id="editLinkForm" class="ajax-form" action="/edit_link_entry/${data.id}" method="post" enctype="multipart/form-data">
                 <div class="modal-header"><h5 class="modal-title">Editar Entrada: ${data.title}</h5><button type="button" class="close" data-dismiss="modal">×</button></div>
                 <div class="modal-body">
                     <div class="form-group"><label>Título</label><input type="text" class="form-control" name="link_title" value="${data.title || ''}" required></div>
@@ -298,6 +309,260 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     });
 
+    // --- LÓGICA CARGA PEREZOSA DE TARJETAS ---
+    function loadSectionPage(sentinel, observer) {
+        if (sentinel.dataset.loading === '1') return;
+        sentinel.dataset.loading = '1';
+        const sectionId = sentinel.dataset.sectionId;
+        const cursor = sentinel.dataset.cursor;
+        const params = new URLSearchParams({ format: 'html' });
+        if (cursor) params.set('cursor', cursor);
+
+        fetch(`/api/sections/${sectionId}/entries?${params}`)
+            .then(response => response.json())
+            .then(data => {
+                if (data.error) { console.error('Error al cargar entradas:', data.error); return; }
+                document.getElementById(`grid-section-${sectionId}`).insertAdjacentHTML('beforeend', data.html);
+                if (environmentSelector) updateLinkHrefs(environmentSelector.value);
+                if (data.next_cursor) {
+                    sentinel.dataset.cursor = data.next_cursor;
+                    // Si el centinela sigue visible, pedimos la siguiente página
+                    observer.unobserve(sentinel);
+                    observer.observe(sentinel);
+                } else {
+                    observer.unobserve(sentinel);
+                    sentinel.remove();
+                }
+            })
+            .catch(error => console.error('Error de red al cargar entradas:', error))
+            .finally(() => { sentinel.dataset.loading = '0'; });
+    }
+
+    const lazySentinels = document.querySelectorAll('.lazy-sentinel');
+    if (lazySentinels.length > 0) {
+        const lazyObserver = new IntersectionObserver(entries => {
+            entries.forEach(entry => { if (entry.isIntersecting) loadSectionPage(entry.target, lazyObserver); });
+        }, { rootMargin: '400px 0px' });
+        lazySentinels.forEach(sentinel => lazyObserver.observe(sentinel));
+    }
+
+    // --- LÓGICA ACTUALIZACIÓN SIN RECARGA ---
+    // Los formularios .ajax-form se envían con fetch; la respuesta trae sólo lo
+    // que cambió desde nuestra versión (data-version del <body>) ya renderizado.
+    // El mismo formato lo sirve /changes?since=, que consultamos periódicamente
+    // para ver los cambios hechos desde otras pestañas.
+    let dataVersion = parseInt(document.body.dataset.version || '0', 10);
+    let syncing = false;
+    const CHANGES_POLL_MS = 15000;
+
+    function showMessage(message, category) {
+        let container = document.querySelector('.flash-messages-container');
+        if (!container) {
+            container = document.createElement('div');
+            container.className = 'flash-messages-container';
+            document.getElementById('sections-container').prepend(container);
+        }
+        const alert = document.createElement('div');
+        alert.className = `alert alert-${category} alert-dismissible fade show`;
+        alert.setAttribute('role', 'alert');
+        alert.innerHTML = `${escapeHtml(message)}<button type="button" class="close" data-dismiss="alert" aria-label="Close">×</button>`;
+        container.appendChild(alert);
+        setTimeout(() => $(alert).alert('close'), 4000);
+    }
+
+    function parseFragment(html) {
+        const template = document.createElement('template');
+        template.innerHTML = html.trim();
+        return Array.from(template.content.children);
+    }
+
+    // Inserta `el` antes del primer hermano que vaya detrás según `after`.
+    // Devuelve false si no lo hay y no hay `fallback` (posición aún no cargada).
+    function insertInOrder(container, el, selector, after, fallback) {
+        const next = Array.from(container.querySelectorAll(`:scope > ${selector}`)).find(node => node !== el && after(node));
+        if (next) container.insertBefore(el, next);
+        else if (fallback === undefined) container.appendChild(el);
+        else if (fallback) container.insertBefore(el, fallback);
+        else return false;
+        return true;
+    }
+
+    function sectionAfter(order, name) {
+        return node => {
+            const nodeOrder = parseInt(node.dataset.order, 10);
+            return nodeOrder > order || (nodeOrder === order && node.dataset.name.localeCompare(name) > 0);
+        };
+    }
+
+    function entryAfter(order, id) {
+        return node => {
+            const nodeOrder = parseInt(node.dataset.order, 10);
+            return nodeOrder > order || (nodeOrder === order && parseInt(node.dataset.id, 10) < id);
+        };
+    }
+
+    function applySection(section) {
+        const container = document.getElementById('sections-container');
+        const [block, modal] = parseFragment(section.html);
+        const current = container.querySelector(`.section-block[data-id="${section.id}"]`);
+        let target = block;
+        if (current) {
+            // Conservamos las tarjetas ya cargadas: sólo cambian cabecera, atributos y modal
+            current.querySelector('.section-header').replaceWith(block.querySelector('.section-header'));
+            current.dataset.order = block.dataset.order;
+            current.dataset.name = block.dataset.name;
+            const oldModal = document.getElementById(`editSectionModal-${section.id}`);
+            if (oldModal) oldModal.replaceWith(modal);
+            target = current;
+        } else {
+            const grid = block.querySelector('.link-entries-grid');
+            initGridSortable(grid);
+            container.appendChild(modal);
+        }
+        insertInOrder(container, target, '.section-block', sectionAfter(section.order_index, section.name),
+            container.querySelector('.environment-selector-container'));
+        const emptyState = container.querySelector('.empty-state');
+        if (emptyState) emptyState.remove();
+    }
+
+    function applyEntry(entry) {
+        const current = document.querySelector(`.link-entry-card[data-id="${entry.id}"]`);
+        const grid = document.getElementById(`grid-section-${entry.section_id}`);
+        if (current) current.remove();
+        if (!grid) return;
+        const [card] = parseFragment(entry.html);
+        // En una sección perezosa aún sin cargar del todo, lo que va tras la
+        // última tarjeta cargada llegará con su página
+        const sentinel = grid.parentElement.querySelector('.lazy-sentinel');
+        insertInOrder(grid, card, '.link-entry-card', entryAfter(entry.order_index, entry.id), sentinel ? null : undefined);
+    }
+
+    function refreshSectionSelect() {
+        const select = document.querySelector('#addLinkForm select[name="section_id"]');
+        if (!select) return;
+        const selected = select.value;
+        select.innerHTML = Array.from(document.querySelectorAll('#sections-container > .section-block'))
+            .map(block => `<option value="${block.dataset.id}">${escapeHtml(block.dataset.name)}</option>`).join('');
+        if (select.querySelector(`option[value="${selected}"]`)) select.value = selected;
+    }
+
+    function applyChanges(data) {
+        if (data.reset) { window.location.reload(); return; }
+        if (data.version === undefined) return;
+        data.deleted.sections.forEach(id => {
+            const block = document.querySelector(`.section-block[data-id="${id}"]`);
+            if (block) block.remove();
+            const modal = document.getElementById(`editSectionModal-${id}`);
+            if (modal) modal.remove();
+        });
+        data.deleted.entries.forEach(id => {
+            const card = document.querySelector(`.link-entry-card[data-id="${id}"]`);
+            if (card) card.remove();
+        });
+        data.sections.forEach(applySection);
+        data.entries.forEach(applyEntry);
+        if (data.app_domains) Object.assign(APP_DOMAINS, data.app_domains);
+        if (data.sections.length || data.deleted.sections.length) refreshSectionSelect();
+        if (environmentSelector) updateLinkHrefs(environmentSelector.value);
+        dataVersion = Math.max(dataVersion, data.version);
+        document.body.dataset.version = dataVersion;
+    }
+
+    document.addEventListener('submit', function(e) {
+        const form = e.target;
+        if (!form.classList.contains('ajax-form') || !window.fetch) return;
+        e.preventDefault();
+        const submitButton = form.querySelector('[type="submit"]');
+        if (submitButton) submitButton.disabled = true;
+        fetch(form.action, {
+            method: 'POST',
+            headers: { 'Accept': 'application/json', 'X-Data-Version': dataVersion },
+            body: new FormData(form),
+        })
+        .then(response => response.json())
+        .then(data => {
+            showMessage(data.message, data.category);
+            if (data.status !== 'success') return;
+            const modal = form.closest('.modal');
+            if (modal) $(modal).modal('hide');
+            if (form.id === 'addLinkForm' || form.action.endsWith('/add_section')) form.reset();
+            applyChanges(data);
+        })
+        .catch(error => {
+            console.error('Error de red al guardar, se envía el formulario sin JavaScript:', error);
+            form.classList.remove('ajax-form');
+            form.submit();
+        })
+        .finally(() => { if (submitButton) submitButton.disabled = false; });
+    });
+
+    function pollChanges() {
+        if (syncing || document.visibilityState !== 'visible') return;
+        syncing = true;
+        fetch(`/changes?since=${dataVersion}`, { headers: { 'Accept': 'application/json' } })
+            .then(response => response.json())
+            .then(applyChanges)
+            .catch(error => console.error('Error al consultar cambios:', error))
+            .finally(() => { syncing = false; });
+    }
+
+    setInterval(pollChanges, CHANGES_POLL_MS);
+    document.addEventListener('visibilitychange', pollChanges);
+
+    // --- LÓGICA BÚSQUEDA ---
+    const searchInput = document.getElementById('search-input');
+    const searchResults = document.getElementById('search-results');
+    let searchTimer = null;
+
+    function escapeHtml(text) {
+        const div = document.createElement('div');
+        div.textContent = text || '';
+        return div.innerHTML;
+    }
+
+    function renderSearchResults(data) {
+        if (!data.results || data.results.length === 0) {
+            searchResults.innerHTML = '<div class="search-empty">Sin resultados</div>';
+        } else {
+            searchResults.innerHTML = data.results.map(r => `
+                <a class="search-result" data-entry-id="${r.id}">
+                    <div class="search-result-title">${escapeHtml(r.title)}</div>
+                    <div class="search-result-section">${escapeHtml(r.section_name)}</div>
+                </a>`).join('');
+        }
+        searchResults.classList.add('show');
+    }
+
+    if (searchInput && searchResults) {
+        searchInput.addEventListener('input', () => {
+            clearTimeout(searchTimer);
+            const q = searchInput.value.trim();
+            if (!q) { searchResults.classList.remove('show'); return; }
+            searchTimer = setTimeout(() => {
+                fetch(`/search?q=${encodeURIComponent(q)}&per_page=20`)
+                    .then(response => response.json())
+                    .then(renderSearchResults)
+                    .catch(error => console.error('Error en la búsqueda:', error));
+            }, 200);
+        });
+
+        searchResults.addEventListener('click', e => {
+            const result = e.target.closest('.search-result');
+            if (!result) return;
+            searchResults.classList.remove('show');
+            const card = document.querySelector(`.link-entry-card[data-id="${result.dataset.entryId}"]`);
+            if (card) {
+                card.scrollIntoView({ behavior: 'smooth', block: 'center' });
+                card.classList.add('search-highlight');
+                setTimeout(() => card.classList.remove('search-highlight'), 2000);
+            }
+        });
+
+        document.addEventListener('click', e => {
+            if (!e.target.closest('.search-container')) searchResults.classList.remove('show');
+        });
+    }
+
     initDragAndDrop();
     setupImageDropZone('add');
 });
\ No newline at end of file
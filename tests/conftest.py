@@ -0,0 +1,36 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+@pytest.fixture(scope="session")
+def appmod(tmp_path_factory):
+    """El módulo app con la BD y las métricas en un directorio temporal."""
+    tmp = tmp_path_factory.mktemp("app")
+    os.environ.setdefault("LINKMANAGER_DATABASE", str(tmp / "database.db"))
+    os.environ.setdefault("METRICS_DIR", "")
+    import app
+    app.app.config["TESTING"] = True
+    return app
+
+
+@pytest.fixture
+def db(appmod, tmp_path, monkeypatch):
+    """Una BD nueva por prueba (creada con schema.sql, como check_and_create_db)."""
+    appmod.db_pool.close_all()
+    monkeypatch.setattr(appmod, "DATABASE", str(tmp_path / "database.db"))
+    appmod.init_db()
+    connection = appmod.connect_db()
+    yield connection
+    connection.close()
+    appmod.db_pool.close_all()
+
+
+@pytest.fixture
+def client(appmod, db):
+    return appmod.app.test_client()
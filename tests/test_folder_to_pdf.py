@@ -0,0 +1,65 @@
+"""
+Volcados de folderToPDF escritos dentro de la propia carpeta que se recorre:
+la salida y sus ficheros auxiliares no deben acabar dentro del volcado.
+
+    python -m pytest tests
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import folderToPDF  # noqa: E402
+
+
+@pytest.fixture
+def project(tmp_path):
+    base = tmp_path / "proyecto"
+    (base / "src").mkdir(parents=True)
+    (base / "README.md").write_text("# Proyecto\n", encoding="utf-8")
+    (base / "src" / "main.py").write_text("print('hola')\n", encoding="utf-8")
+    (base / "src" / "util.py").write_text("def suma(a, b):\n    return a + b\n", encoding="utf-8")
+    return base
+
+
+@pytest.mark.parametrize("fmt", sorted(folderToPDF.INCREMENTAL_FORMATS))
+def test_incremental_output_inside_project_is_stable(project, fmt):
+    output = project / f"dump.{fmt}"
+    folderToPDF.export(project, output, fmt, incremental=True)
+    first = output.read_bytes()
+    folderToPDF.export(project, output, fmt, incremental=True)
+
+    assert output.read_bytes() == first
+    assert f"dump.{fmt}".encode() not in first
+    assert b"main.py" in first
+
+
+def test_plain_output_inside_project_is_stable(project):
+    output = project / "dump.txt"
+    folderToPDF.export(project, output, "txt")
+    first = output.read_bytes()
+    folderToPDF.export(project, output, "txt")
+
+    assert output.read_bytes() == first
+    assert b"dump.txt" not in first
+
+
+def test_sqlite_index_inside_project_skips_itself(project):
+    output = project / "dump.sqlite"
+    folderToPDF.export(project, output, "sqlite")
+    stats = folderToPDF.export(project, output, "sqlite")
+
+    assert stats["indexed"] == 0 and stats["removed"] == 0
+    assert {path for path, _, _ in folderToPDF.search_index(output, "hola")} == {"src/main.py"}
+
+
+def test_include_directory_pattern_keeps_its_files(project):
+    (project / "src" / "pkg").mkdir()
+    (project / "src" / "pkg" / "mod.py").write_text("x = 1\n", encoding="utf-8")
+    _, paths = folderToPDF.walk_project(project, folderToPDF.IgnoreRules([]), folderToPDF.IgnoreRules(["src/"]))
+
+    assert [p.as_posix() for p in paths] == ["src/main.py", "src/util.py", "src/pkg/mod.py"]
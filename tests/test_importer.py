@@ -0,0 +1,33 @@
+"""
+Importación de marcadores en JSON: las formas no soportadas son un error de
+formato (ValueError), no un fallo interno.
+"""
+
+import io
+
+import pytest
+
+from importer import parse_json
+
+
+@pytest.mark.parametrize("text", ['5', '"texto"', 'null', '{"bookmarks": 3}', '{"roots": []}'])
+def test_unsupported_top_level_raises_value_error(text):
+    with pytest.raises(ValueError):
+        parse_json(text)
+
+
+def test_supported_shapes():
+    item = '{"title": "A", "url": "http://a.test"}'
+    assert len(parse_json(f'[{item}]')) == 1
+    assert len(parse_json(f'{{"entries": [{item}]}}')) == 1
+    assert parse_json('{}') == []
+    chrome = '{"roots": {"bookmark_bar": {"type": "folder", "name": "Barra", "children": [{"type": "url", "name": "A", "url": "http://a.test"}]}}}'
+    assert parse_json(chrome)[0]['section'] == 'Barra'
+
+
+def test_import_route_flashes_error_for_scalar_json(client, db):
+    response = client.post("/import", data={"bookmarks_file": (io.BytesIO(b"5"), "marcadores.json")},
+                           content_type="multipart/form-data")
+    assert response.status_code == 302
+    with client.session_transaction() as session:
+        assert session["_flashes"][0][0] == "error"
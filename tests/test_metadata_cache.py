@@ -0,0 +1,74 @@
+"""
+Caché de metadatos: el candado de cada URL sólo cubre la caché, no la
+descarga, y las peticiones simultáneas de una misma URL se comparten.
+"""
+
+import threading
+
+import metadata
+
+
+def _run(appmod, urls):
+    results = {}
+
+    def worker(i, url):
+        db = appmod.connect_db()
+        try:
+            results[i] = metadata.get_metadata(db, url)
+        finally:
+            db.close()
+
+    threads = [threading.Thread(target=worker, args=item) for item in enumerate(urls)]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+
+def test_concurrent_requests_share_one_fetch(appmod, db, monkeypatch):
+    release = threading.Event()
+    calls = []
+
+    def fake_fetch(url, etag=None, last_modified=None):
+        calls.append(url)
+        release.wait(5)
+        return {'title': 'T', 'description': 'D', 'image_url': ''}
+
+    monkeypatch.setattr(metadata, "fetch_metadata", fake_fetch)
+    monkeypatch.setattr(metadata, "host_limiter", metadata.HostRateLimiter(concurrency=8, interval=0))
+    threads, results = _run(appmod, ["http://uno.test/a"] * 4)
+    while not calls:
+        threading.Event().wait(0.01)
+    threading.Event().wait(0.1)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert calls == ["http://uno.test/a"]
+    assert [r['title'] for r in results.values()] == ['T'] * 4
+
+
+def test_stripe_lock_is_not_held_during_fetch(appmod, db, monkeypatch):
+    monkeypatch.setattr(metadata, "URL_LOCK_STRIPES", 1)  # todas las URL en el mismo candado
+    monkeypatch.setattr(metadata, "_url_locks", [threading.Lock()])
+    monkeypatch.setattr(metadata, "host_limiter", metadata.HostRateLimiter(concurrency=8, interval=0))
+    slow_started, release = threading.Event(), threading.Event()
+
+    def fake_fetch(url, etag=None, last_modified=None):
+        if "lento" in url:
+            slow_started.set()
+            release.wait(5)
+        return {'title': url, 'description': '', 'image_url': ''}
+
+    monkeypatch.setattr(metadata, "fetch_metadata", fake_fetch)
+    slow, _ = _run(appmod, ["http://lento.test/"])
+    assert slow_started.wait(5)
+
+    fast, results = _run(appmod, ["http://rapido.test/"])
+    fast[0].join(2)
+    finished = not fast[0].is_alive()
+    release.set()
+    slow[0].join(5)
+    fast[0].join(5)
+
+    assert finished
+    assert results[0]['title'] == "http://rapido.test/"
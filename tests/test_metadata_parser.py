@@ -0,0 +1,36 @@
+"""
+Lectura de la cabecera HTML de los enlaces: codificación declarada en el
+propio documento y etiquetas de <noscript> dentro de <head>.
+"""
+
+from metadata import extract_metadata
+
+
+def _chunks(data, size=64):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def test_meta_charset_decides_encoding():
+    html = ('<html><head><meta http-equiv="Content-Type" content="text/html; charset=iso-8859-1">'
+            '<title>Canción de otoño</title>'
+            '<meta name="description" content="Añoranza">'
+            '</head><body></body></html>').encode('latin-1')
+    metadata = extract_metadata(_chunks(html), 'http://ejemplo.test/', 'fallback')
+    assert metadata['title'] == 'Canción de otoño'
+    assert metadata['description'] == 'Añoranza'
+
+
+def test_undeclared_latin1_does_not_decode_as_utf8():
+    html = '<html><head><title>Niño</title></head></html>'.encode('latin-1')
+    assert extract_metadata([html], 'http://ejemplo.test/', 'fallback')['title'] == 'Niño'
+
+
+def test_noscript_in_head_does_not_stop_parsing():
+    html = (b'<html><head><title>T</title>'
+            b'<noscript><img src="https://tracker.test/pixel.gif"></noscript>'
+            b'<meta property="og:description" content="desc">'
+            b'<meta property="og:image" content="/cover.png">'
+            b'</head><body><meta name="description" content="cuerpo"></body></html>')
+    metadata = extract_metadata(_chunks(html), 'http://ejemplo.test/post', 'fallback')
+    assert metadata['description'] == 'desc'
+    assert metadata['image_url'] == 'http://ejemplo.test/cover.png'
@@ -0,0 +1,26 @@
+"""
+Las entradas que quedan en 'pending' (la cola de metadatos se pierde al
+reiniciar el worker) se vuelven a encolar desde las tareas periódicas.
+"""
+
+
+def test_requeue_stale_pending_entries(appmod, db, monkeypatch):
+    queued = []
+    monkeypatch.setattr(appmod, "schedule_metadata_fetch", lambda entry_id, url: queued.append((entry_id, url)))
+    db.execute("INSERT INTO sections (name) VALUES ('S')")
+    db.executemany("""INSERT INTO link_entries (title, section_id, metadata_status, created_at)
+                      VALUES (?, 1, ?, datetime('now', ?))""",
+                   [("viejo", "pending", "-1 hour"), ("reciente", "pending", "-1 minute"),
+                    ("hecho", "done", "-1 hour"), ("sin enlace", "pending", "-1 hour")])
+    db.executemany("INSERT INTO entry_urls (link_entry_id, label, link_type, value) VALUES (?, '', ?, ?)",
+                   [(1, "external_url", "http://viejo.test"), (2, "external_url", "http://reciente.test"),
+                    (3, "external_url", "http://hecho.test"), (4, "internal_app", "8080")])
+    db.commit()
+
+    assert appmod.requeue_pending_metadata(db, timeout=600) == 1
+    assert queued == [(1, "http://viejo.test")]
+    assert db.execute("SELECT metadata_status FROM link_entries WHERE id = 4").fetchone()[0] == "none"
+
+    # Ya encolada: no se repite hasta que vuelva a pasar el plazo
+    assert appmod.requeue_pending_metadata(db, timeout=600) == 0
+    assert len(queued) == 1
@@ -0,0 +1,53 @@
+"""
+Claves de orden dispersas: las altas nacen separadas ORDER_GAP, así que
+mover un elemento justo después de crearlo sólo reescribe su fila.
+"""
+
+from importer import import_records
+
+
+def _entries(db, section_id):
+    return [row["id"] for row in db.execute(
+        "SELECT id FROM link_entries WHERE section_id = ? ORDER BY order_index, id DESC", (section_id,))]
+
+
+def test_move_after_route_inserts_updates_one_row(client, db):
+    client.post("/add_section", data={"section_name": "S"})
+    section_id = db.execute("SELECT id FROM sections WHERE name = 'S'").fetchone()["id"]
+    for i in range(6):
+        client.post("/add_link_entry", data={"link_title": f"t{i}", "section_id": section_id,
+                                             "urls[0][type]": "internal_app", "urls[0][value]": str(8000 + i)})
+    ids = _entries(db, section_id)
+    assert ids == sorted(ids, reverse=True)  # las nuevas, delante
+
+    response = client.post("/update_order", json={"type": "entries", "item_id": ids[0], "after_id": ids[3]})
+    assert response.json == {"status": "success", "updated": 1}
+    assert _entries(db, section_id) == ids[1:4] + ids[:1] + ids[4:]
+
+
+def test_move_after_import_and_batch_updates_one_row(client, db):
+    import_records(db, [{"section": "Importados", "title": f"t{i}", "description": "", "url": f"http://e{i}.test"}
+                        for i in range(5)])
+    client.post("/api/batch", json={"operations": [{"op": "create", "type": "section", "name": "B"},
+                                                   {"op": "create", "type": "section", "name": "C"}]})
+    section_id = db.execute("SELECT id FROM sections WHERE name = 'Importados'").fetchone()["id"]
+    ids = _entries(db, section_id)
+
+    response = client.post("/update_order", json={"type": "entries", "item_id": ids[-1], "before_id": ids[1]})
+    assert response.json["updated"] == 1
+    sections = [row["name"] for row in db.execute("SELECT name FROM sections ORDER BY order_index, name")]
+    assert sections[-2:] == ["B", "C"]
+    section_ids = {row["name"]: row["id"] for row in db.execute("SELECT id, name FROM sections")}
+    response = client.post("/update_order", json={"type": "sections", "item_id": section_ids["C"],
+                                                  "before_id": section_ids["B"]})
+    assert response.json["updated"] == 1
+
+
+def test_full_order_writes_sparse_keys(client, db):
+    for name in ("a", "b", "c"):
+        client.post("/add_section", data={"section_name": name})
+    ids = {row["name"]: row["id"] for row in db.execute("SELECT id, name FROM sections")}
+    client.post("/update_order", json={"type": "sections", "order": [ids["c"], ids["a"], ids["b"]]})
+
+    response = client.post("/update_order", json={"type": "sections", "item_id": ids["b"], "after_id": ids["c"]})
+    assert response.json["updated"] == 1
@@ -0,0 +1,19 @@
+"""
+Auditoría de planes de consulta (flask check-query-plans) contra schema.sql.
+"""
+
+
+def test_no_full_scan_with_temp_sort(appmod):
+    queries, failures, _ = appmod.audit_query_plans()
+
+    assert queries
+    assert [(location, plan) for location, _, plan in failures] == []
+
+
+def test_ordering_queries_are_planned(appmod):
+    queries, _, skipped = appmod.audit_query_plans()
+    planned = {sql for _, sql, _ in queries}
+
+    for cfg in appmod.ORDERING.values():
+        assert set(cfg["sql"].values()) <= planned
+    assert not [location for location, _, _ in skipped if "_ordering_queries" in location]
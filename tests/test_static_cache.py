@@ -0,0 +1,24 @@
+"""
+Las subidas se guardan por hash de contenido, así que se sirven con caché
+inmutable igual que las miniaturas; el resto de estáticos no.
+"""
+
+import os
+
+
+def test_content_addressed_upload_is_immutable(appmod, client, tmp_path, monkeypatch):
+    monkeypatch.setattr(appmod.app, "static_folder", str(tmp_path))
+    os.makedirs(tmp_path / "uploads")
+    name = "0123456789abcdef0123456789abcdef.png"
+    (tmp_path / "uploads" / name).write_bytes(b"\x89PNG")
+    (tmp_path / "uploads" / "foto.png").write_bytes(b"\x89PNG")
+
+    response = client.get(f"/static/uploads/{name}")
+    assert response.status_code == 200
+    assert response.headers["Cache-Control"] == "public, max-age=31536000, immutable"
+    response.close()
+
+    response = client.get("/static/uploads/foto.png")
+    assert response.status_code == 200
+    assert "immutable" not in response.headers.get("Cache-Control", "")
+    response.close()